@@ -0,0 +1,337 @@
+# Advisor.py
+# プレイヤーのターンに、モンテカルロ木探索 (MCTS) で次の行動を提案するモジュール
+# 探索は Battle.snapshot() / restore() で同じ局面から何度もバトルを進め直して行う
+# 制限時間内に見つかった最善手を返す (anytime)。ワーカープロセスを使う場合は各プロセスが独立に探索し、結果を合算する (ルート並列化)
+
+import math
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+
+from RandomStream import RandomStream
+from simulate import choose_switch_target, execute_action, greedy_skill
+
+DEFAULT_BUDGET_MS = 200 # 1回の提案にかける時間
+DEFAULT_MAX_TURNS = 30 # 探索・ロールアウトで進める最大ターン数 (これを超えた局面は _evaluate で評価する)
+EXPLORATION = 1.4 # UCB1 の探索係数
+# 決着ごとの報酬 (勝利とスカウト成功を同じ「成功」として扱う)
+DEFAULT_REWARDS = {'win': 1.0, 'scout_success': 1.0, 'escape': 0.3, 'lose': 0.0}
+ACTION_LABELS = {'attack': 'こうげき', 'guard': 'ぼうぎょ', 'scout': 'スカウト', 'escape': 'にげる'}
+
+# ==================================
+# 1. 行動
+# ==================================
+# 探索木では行動を pickle 可能なキーで表す
+# ('attack',) / ('skill', スキル名) / ('guard',) / ('scout',) / ('switch', パーティ内の番号) / ('escape',)
+
+def legal_actions(battle):
+    """
+    現在の局面で選べる行動のキーのリスト (player_turn_gui のコマンドと同じ)
+    """
+    actions = [('attack',)]
+    actions.extend(('skill', skill.name) for skill in battle.get_available_active_skills())
+    actions.append(('guard',))
+    actions.append(('scout',))
+    current = battle.current_monster
+    actions.extend(('switch', index) for index, monster in enumerate(battle.player.monsters)
+                   if monster.is_alive and monster is not current)
+    actions.append(('escape',))
+    return actions
+
+def to_action(battle, key):
+    """
+    行動のキーを simulate.execute_action に渡す行動のタプルに変換する
+    """
+    kind = key[0]
+    if kind == 'skill':
+        skill = next(skill for skill in battle.current_monster.active_skills if skill.name == key[1])
+        return ('skill', skill)
+    if kind == 'switch':
+        return ('switch', battle.player.monsters[key[1]])
+    return key
+
+def action_label(battle, key):
+    """
+    行動のキーを画面表示用の文字列にする
+    """
+    kind = key[0]
+    if kind == 'skill':
+        return f"スキル「{key[1]}」"
+    if kind == 'switch':
+        return f"いれかえ ({battle.player.monsters[key[1]].name})"
+    return ACTION_LABELS[kind]
+
+def advance(battle, action):
+    """
+    プレイヤーの行動から、敵のターン・ターン終了効果・強制交代までを1ターン分進める
+    (simulate.play_battle と同じ流れ)
+    :return: バトル結果 (None ならバトル継続)
+    """
+    result = execute_action(battle, action)
+    while True:
+        if result is None:
+            _, result = battle.process_enemy_turn()
+            if result is None:
+                _, result = battle.process_turn_end_effects()
+        if result != 'switch_needed':
+            return result
+        new_monster = choose_switch_target(battle)
+        if new_monster is None:
+            return 'lose'
+        # 交代はターンを消費し、敵が行動する
+        battle.process_switch(new_monster)
+        result = None
+
+def _evaluate(battle):
+    """
+    決着しなかった局面の評価値 (0〜1)。味方の残りHP割合が高く、敵の残りHP割合が低いほど高い
+    """
+    monsters = battle.player.monsters
+    party_ratio = sum(m.current_hp for m in monsters) / max(1, sum(m.max_hp for m in monsters))
+    enemy = battle.enemy
+    enemy_ratio = enemy.current_hp / max(1, enemy.max_hp)
+    return 0.5 + 0.5 * (party_ratio - enemy_ratio)
+
+# ==================================
+# 2. 探索
+# ==================================
+
+class _Node:
+    __slots__ = ('visits', 'total', 'children', 'outcomes')
+
+    def __init__(self):
+        self.visits = 0
+        self.total = 0.0 # 報酬の合計
+        self.children = {} # 行動のキー -> _Node
+        self.outcomes = {} # バトル結果 -> 回数 ('timeout' は最大ターン数に達した場合)
+
+def _search(battle, budget, seed, exploration=EXPLORATION, max_turns=DEFAULT_MAX_TURNS,
+            rollout_policy=greedy_skill, rewards=None, max_iterations=None):
+    """
+    battle の現在の局面から budget 秒だけ MCTS を行い、ルートの行動ごとの集計を返す
+    battle は探索用の複製であること (探索後の状態は元に戻さない)
+    木のノードは行動の列に対応し、乱数による分岐は区別しない (open-loop MCTS)
+    :return: ({行動のキー: (訪問回数, 報酬の合計, {バトル結果: 回数})}, 反復回数)
+    """
+    deadline = time.perf_counter() + budget
+    rewards = rewards or DEFAULT_REWARDS
+    # snapshot() は乱数列の状態も含むため、探索用の乱数列は別に用意し、復元のたびに差し替える
+    # (復元先の root_rng は探索中には使わない。グローバルな random モジュールの状態も変更しない)
+    root_rng = battle.rng = RandomStream(seed, 'advisor-root')
+    search_rng = RandomStream(seed, 'advisor')
+    random = search_rng.random
+    root_snapshot = battle.snapshot()
+    root = _Node()
+    log = math.log
+    sqrt = math.sqrt
+    perf_counter = time.perf_counter
+
+    iterations = 0
+    while not iterations or perf_counter() < deadline:
+        if max_iterations is not None and iterations >= max_iterations:
+            break
+        battle.rng = root_rng
+        battle.restore(root_snapshot)
+        battle.rng = search_rng
+
+        # 1. 選択と展開: 未訪問の行動があればそれを1つ展開し、なければ UCB1 で選ぶ
+        node = root
+        path = [root]
+        result = None
+        turns = 0
+        while result is None and turns < max_turns:
+            keys = legal_actions(battle)
+            children = node.children
+            unvisited = [key for key in keys if key not in children]
+            if unvisited:
+                key = unvisited[int(random() * len(unvisited))]
+                child = children[key] = _Node()
+            else:
+                log_visits = log(node.visits)
+                key = max(keys, key=lambda k: children[k].total / children[k].visits
+                          + exploration * sqrt(log_visits / children[k].visits))
+                child = children[key]
+            result = advance(battle, to_action(battle, key))
+            turns += 1
+            path.append(child)
+            node = child
+            if unvisited:
+                break
+
+        # 2. ロールアウト: 決着するか最大ターン数まで rollout_policy で進める
+        while result is None and turns < max_turns:
+            result = advance(battle, rollout_policy(battle))
+            turns += 1
+        if result is None:
+            result = 'timeout'
+            value = _evaluate(battle)
+        else:
+            value = rewards.get(result, 0.0)
+
+        # 3. 逆伝播
+        for node in path:
+            node.visits += 1
+            node.total += value
+        if len(path) > 1:
+            outcomes = path[1].outcomes
+            outcomes[result] = outcomes.get(result, 0) + 1
+        iterations += 1
+
+    stats = {key: (child.visits, child.total, child.outcomes) for key, child in root.children.items()}
+    return stats, iterations
+
+def _search_worker(battle, budget, seed, options):
+    # ワーカープロセスで実行される探索 (battle は pickle で渡された複製)
+    return _search(battle, budget, seed, **options)
+
+# ==================================
+# 3. 提案
+# ==================================
+
+@dataclass
+class ActionStats:
+    action: tuple       # 行動のキー
+    label: str          # 画面表示用の名前
+    visits: int         # この行動から始めた探索の回数
+    value: float        # 平均報酬
+    outcomes: dict      # バトル結果 -> 回数
+
+    def probability(self, result):
+        return self.outcomes.get(result, 0) / self.visits if self.visits else 0.0
+
+    @property
+    def win_probability(self):
+        return self.probability('win')
+
+    @property
+    def scout_probability(self):
+        return self.probability('scout_success')
+
+    @property
+    def lose_probability(self):
+        return self.probability('lose')
+
+@dataclass
+class Advice:
+    best: ActionStats
+    actions: list = field(default_factory=list) # ActionStats (訪問回数の多い順)
+    iterations: int = 0
+    elapsed_ms: float = 0.0
+
+    def action(self, battle):
+        """
+        提案された行動を simulate.execute_action に渡せる形で返す
+        """
+        return to_action(battle, self.best.action)
+
+class MCTSAdvisor:
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, budget_ms=DEFAULT_BUDGET_MS, workers=0, exploration=EXPLORATION,
+                 max_turns=DEFAULT_MAX_TURNS, rollout_policy=greedy_skill, rewards=None, seed=None):
+        """
+        時間制限付きの MCTS で次の行動を提案するクラス
+        :param budget_ms: 1回の提案にかける時間 (ミリ秒)
+        :param workers: 探索に使うワーカープロセス数 (0 なら現在のプロセスのみ)。プールは初回の提案時に作成し、以降は使い回す
+        :param rollout_policy: ロールアウトで使うポリシー (ワーカーを使う場合は pickle 可能であること)
+        :param rewards: バトル結果ごとの報酬 (省略時は DEFAULT_REWARDS)
+        :param seed: 探索の乱数のシード (省略時は OS の乱数から決める)
+        """
+        self.budget_ms = budget_ms
+        self.workers = workers
+        self.options = {
+            'exploration': exploration,
+            'max_turns': max_turns,
+            'rollout_policy': rollout_policy,
+            'rewards': rewards,
+        }
+        self.seed_stream = RandomStream(seed, 'advisor-seeds')
+        self._executor = None
+
+    @classmethod
+    def shared(cls):
+        """
+        アプリ全体で共有する MCTSAdvisor (ワーカープロセスは CPU 数 - 1、最大4)
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls(workers=min(4, (os.cpu_count() or 1) - 1))
+        return cls._shared
+
+    def _pool(self):
+        if self._executor is None:
+            # Streamlit のサーバーはマルチスレッドのため、fork ではなく spawn でワーカーを起動する
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def close(self):
+        """
+        ワーカープロセスのプールを終了する
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def advise(self, battle, budget_ms=None):
+        """
+        現在の局面での最善の行動を提案する (battle は変更しない)
+        制限時間内に間に合わなかったワーカーの結果は使わない
+        :param budget_ms: 省略時はコンストラクタで指定した時間
+        :return: Advice
+        """
+        start = time.perf_counter()
+        budget = (budget_ms if budget_ms is not None else self.budget_ms) / 1000
+        seed = self.seed_stream.randint(0, 2**63 - 1)
+
+        futures = []
+        if self.workers > 0:
+            pool = self._pool()
+            # 受け渡しにかかる時間の分だけ、ワーカーの探索時間を短くする
+            worker_budget = budget * 0.8
+            try:
+                futures = [pool.submit(_search_worker, battle, worker_budget, (seed, worker), self.options)
+                           for worker in range(self.workers)]
+            except BrokenProcessPool:
+                # ワーカーが異常終了した場合は今回は現在のプロセスだけで探索し、次回プールを作り直す
+                self.close()
+                futures = []
+
+        # 現在のプロセスでも探索する (探索は複製に対して行う)
+        search_battle = _copy_battle(battle)
+        totals, iterations = _search(search_battle, budget, (seed, 'main'), **self.options)
+
+        if futures:
+            done, not_done = wait(futures, timeout=max(0.0, start + budget * 1.1 - time.perf_counter()))
+            for future in not_done:
+                future.cancel()
+            for future in done:
+                if future.cancelled() or future.exception() is not None:
+                    continue
+                stats, count = future.result()
+                iterations += count
+                for key, (visits, total, outcomes) in stats.items():
+                    merged = totals.get(key)
+                    if merged is None:
+                        totals[key] = (visits, total, dict(outcomes))
+                    else:
+                        for result, times in outcomes.items():
+                            merged[2][result] = merged[2].get(result, 0) + times
+                        totals[key] = (merged[0] + visits, merged[1] + total, merged[2])
+
+        actions = [ActionStats(key, action_label(battle, key), visits, total / visits if visits else 0.0, outcomes)
+                   for key, (visits, total, outcomes) in totals.items()]
+        actions.sort(key=lambda stats: (stats.visits, stats.value), reverse=True)
+        return Advice(actions[0], actions, iterations, (time.perf_counter() - start) * 1000)
+
+def _copy_battle(battle):
+    """
+    探索用にバトルを複製する (Player・モンスター・乱数列を含めて元のバトルから切り離す)
+    """
+    return pickle.loads(pickle.dumps(battle, pickle.HIGHEST_PROTOCOL))
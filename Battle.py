@@ -1,164 +1,116 @@
 import random
-import json # <- これを追加
-import os # <- これを追加 (ファイルの読み込みに必要)
-import sys # <- これを追加 (エラーハンドリングに必要)
+from typing import NamedTuple
+from RuleSet import RuleSet
+from BattleLog import Confused, Damage, Dodge, Escape, Guard, Scout, SkillUsed, Stunned, Switched
+from SkillEffects import AFTER_ACTION, AFTER_DAMAGE_DEALT, ON_BATTLE_START
+from StatusEffects import CONFUSION, STUN
+
+class BattleSnapshot(NamedTuple):
+    """
+    Battle.snapshot() が返すバトル中の可変な状態 (モンスターは player.monsters の順番で指定する)
+    不変なタプルとして扱い、restore() は何度でも同じスナップショットから復元できる
+    """
+    current_index: int          # 戦闘中のモンスターの番号
+    participated: tuple         # 戦闘に参加したモンスターの番号
+    rng_state: object           # バトルの乱数列の状態
+    party: tuple                # 味方モンスターごとの Monster.combat_state()
+    enemy: tuple                # 敵モンスターの Monster.combat_state()
 
 class Battle:
-    def __init__(self, player, enemy_monster):
+    rng = random # 乱数列 (コンストラクタで RandomStream などを渡すとインスタンスごとに上書きされる)
+
+    def __init__(self, player, enemy_monster, rules=None, rng=None):
+        """
+        :param rules: 使用するRuleSet（省略時は全バトル共有のRuleSet）
+        :param rng: バトル中の判定に使う乱数列 (RandomStream など、省略時はグローバルな random モジュール)
+        """
         self.player = player
+        if rng is not None:
+            self.rng = rng
         self.current_monster = player.monsters[0] # 戦闘に出す最初のモンスター
         self.enemy = enemy_monster
         self.participated_monsters = {self.current_monster} # 戦闘に参加したモンスターのセット
 
-        self.config = self._load_config()
+        self.rules = rules if rules is not None else RuleSet.shared()
+        self.config = self.rules.config
 
+        self.opening_logs = [] # バトル開始時に発生したイベント (リーダーシップなど)
+        self.clear_battle_effects() # 前のバトルの継続効果を持ち越さない
         self._apply_passive_start_of_battle_effects() # 戦闘開始時のパッシブスキル効果を適用
 
-    def _load_config(self):
+    def clear_battle_effects(self):
         """
-        battle_config.jsonから設定をロードする
+        味方全員 (控えを含む) と敵の継続効果を解除する (バトルの開始時と、終了して画面を戻すときに呼ぶ)
+        控えのモンスターの継続効果はターン終了時に期限が進まないため、バトルをまたいで残さない
         """
-        base_path = os.path.dirname(os.path.abspath(__file__))
-        data_path = os.path.join(base_path, 'data', 'battle_config.json')
-        
-        try:
-            with open(data_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            print(f"Error: JSONファイル {data_path} が見つかりません。")
-            sys.exit(1)
-        except json.JSONDecodeError:
-            print(f"Error: JSONファイル {data_path} のフォーマットが不正です。")
-            sys.exit(1)
+        for monster in self.player.monsters:
+            monster.clear_status_effects()
+        self.enemy.clear_status_effects()
 
-    def apply_skill_effect(self, user, skill):
+    def snapshot(self):
         """
-        アクティブスキルの効果を適用し、ログメッセージのリストを返す
+        バトル中の可変な状態 (HP・MP・継続効果・ぼうぎょ・戦闘中のモンスター・乱数列の状態) を保存する
+        Player やスキルツリーなどの変化しないオブジェクトは含めないため、deepcopy より軽い (探索・試算用)
+        :return: BattleSnapshot
         """
-        target = self.enemy
-        logs = []
-        effect = skill.effect
-        
-        # スキル効果を適用
-        if 'heal' in skill.effect:
-            heal_amount = skill.effect.get('heal', 0)
-            user.current_hp = min(user.max_hp, user.current_hp + heal_amount)
-            logs.append(f"💚 {user.name}はHPを{heal_amount}回復した！") # 🔥 print()からlogs.append()に修正
-            
-        if 'damage_multiplier' in effect:
-            multiplier = effect.get('damage_multiplier', 1.0)
-            hits = effect.get('hits', 1)
-            
-            # 物理・魔法攻撃のどちらを参照するか決定
-            damage_type = effect.get('damage_type')
-            if damage_type == 'physical':
-                base_attack = user.physical_attack
-                enemy_defense = target.physical_defense
-            elif damage_type == 'magic':
-                base_attack = user.magic_attack
-                enemy_defense = target.magic_defense
-            else: # damage_typeの指定がない場合は物理をデフォルトとする
-                base_attack = user.physical_attack
-                enemy_defense = target.physical_defense
-            
-            total_damage_dealt = 0
-            
-            for i in range(hits):
-                # ダメージ = (モンスター攻撃力 * 倍率) - 敵の防御力
-                raw_damage = int(base_attack * multiplier) 
-                
-                # 防御力減算
-                damage = max(1, raw_damage - enemy_defense)
-                
-                # 敵にダメージを適用
-                target.current_hp = max(0, target.current_hp - damage)
-                
-                # ログ生成
-                if hits > 1:
-                    logs.append(f"💥 {target.name} に {damage} のダメージを与えた！ ({i+1}/{hits}ヒット)")
-                else:
-                    logs.append(f"💥 {target.name} に {damage} のダメージを与えた！")
-                    
-                total_damage_dealt += damage
-                
-                # 連続攻撃で敵が倒れたら中断
-                if not target.is_alive:
-                    break
-            
-            if hits > 1 and total_damage_dealt > 0 and target.is_alive:
-                logs.append(f" (合計 {total_damage_dealt} ダメージ)") # 🔥 print()からlogs.append()に修正
+        monsters = self.player.monsters
+        return BattleSnapshot(
+            monsters.index(self.current_monster),
+            tuple(index for index, monster in enumerate(monsters) if monster in self.participated_monsters),
+            self.rng.getstate(),
+            tuple(monster.combat_state() for monster in monsters),
+            self.enemy.combat_state(),
+        )
 
-            # パッシブスキル: 吸血 (ライフスティール)
-            for passive_skill in user.get_passive_skills():
-                if passive_skill.name == '吸血':
-                    life_steal_ratio = passive_skill.effect.get('life_steal', 0.0)
-                    life_steal_amount = int(total_damage_dealt * life_steal_ratio)
-                    if life_steal_amount > 0:
-                        user.current_hp = min(user.max_hp, user.current_hp + life_steal_amount)
-                        logs.append(f"💉 {user.name}は{life_steal_amount}のHPを吸収して回復した！") # 🔥 print()からlogs.append()に修正
-                    break 
+    def restore(self, snapshot):
+        """
+        snapshot() で保存した状態にバトルを戻す (パーティの構成は保存時と同じであること)
+        """
+        monsters = self.player.monsters
+        self.current_monster = monsters[snapshot.current_index]
+        self.participated_monsters = {monsters[index] for index in snapshot.participated}
+        self.rng.setstate(snapshot.rng_state)
+        for monster, state in zip(monsters, snapshot.party):
+            monster.restore_combat_state(state)
+        self.enemy.restore_combat_state(snapshot.enemy)
 
-        # その他の効果 (自傷、バフ/デバフ)
-        if 'self_damage' in skill.effect:
-            user.current_hp -= skill.effect['self_damage']
-            logs.append(f"💔 {user.name}は {skill.effect['self_damage']} の反動ダメージを受けた！")
+    def apply_skill_effect(self, user, skill):
+        """
+        アクティブスキルの効果を適用し、バトルイベントのリストを返す
+        効果は Skill の読み込み時に op の列へ変換済みなので、ここでは順に実行するだけ
+        """
+        logs = []
+        target = self.enemy
+        for op in skill.ops:
+            op(self, user, target, logs)
+        return logs
 
-        if 'type' in skill.effect:
-            
-            if skill.effect.get('type') == 'buff':
-                user.apply_buff_effect(skill.effect)
-                logs.append(f"⬆️ {user.name}に強化効果がかかった！") 
+    def after_damage_dealt(self, user, damage, logs):
+        """
+        敵にダメージを与えた後に発動するパッシブスキル (例: 吸血) を処理する
+        """
+        for hook in user.passive_hooks.get(AFTER_DAMAGE_DEALT, ()):
+            hook(self, user, logs, damage)
 
-            elif skill.effect.get('type') == 'debuff':
-                target.apply_debuff_effect(skill.effect) 
-                logs.append(f"⬇️ {target.name}に弱体効果がかかった！")
-                
-            elif skill.effect.get('type') == 'ailment':
-                target.apply_ailment_effect(skill.effect)
-                logs.append(f"⚠️ {target.name}に状態異常が付与された！")
-            
-        return logs
-    
     def _apply_passive_start_of_battle_effects(self):
         """
         バトル開始時に発動するパッシブスキルを処理する (例: リーダーシップ)
+        発生したイベントは opening_logs に記録される
         """
         for monster in self.player.monsters:
-            for skill in monster.get_passive_skills():
-                if skill.name == 'リーダーシップ':
-                    self._apply_leadership_buff(monster, skill)
-                    
-    def _apply_leadership_buff(self, leader_monster, leadership_skill):
+            for hook in monster.passive_hooks.get(ON_BATTLE_START, ()):
+                hook(self, monster, self.opening_logs)
+
+    def _process_passive_after_action(self, attacker, logs):
         """
-        リーダーシップスキルを発動し、味方にバフをかける
+        連携攻撃などの、行動後に発動するパッシブスキルを処理する
+        :return: バトル結果 (パッシブで敵が倒れた場合は 'win')
         """
-        effect = leadership_skill.effect
-        if effect.get("buff") == "ally":
-            print(f"🚩 {leader_monster.name}のリーダーシップが発動！")
-            
-            # 全ての生存している味方（リーダー自身を含む）にバフを適用
-            for ally in self.player.monsters:
-                if ally.is_alive:
-                    # Monster.pyの既存のメソッドを呼び出す
-                    ally.apply_buff_effect(effect)
-
-    def _process_passive_extra_attack(self, attacker):
-        """
-        連携攻撃などのパッシブスキルによる追加攻撃を処理する
-        """
-        for skill in attacker.get_passive_skills():
-            if skill.name == '連携攻撃':
-                chance = skill.effect.get("extra_attack_chance", 0.0)
-                if random.random() < chance:
-                    # 追加攻撃の発動
-                    print(f"🔄 {attacker.name}の連携攻撃が発動！")
-                    # シンプルな物理攻撃を再実行
-                    extra_damage = max(1, attacker.physical_attack - self.enemy.physical_defense)
-                    self.enemy.take_damage(extra_damage)
-                    # 追加攻撃で敵が倒れたかチェック
-                    if self.enemy.is_fainted():
-                        return "enemy_fainted" # 敵が倒れたことを示す
-                    return "extra_attack_used" # 追加攻撃を実行したことを示す
+        for hook in attacker.passive_hooks.get(AFTER_ACTION, ()):
+            hook(self, attacker, logs)
+            if self.enemy.current_hp <= 0:
+                break
+        return self.check_battle_status()
 
     def process_attack(self):
         """
@@ -168,15 +120,16 @@ class Battle:
         enemy = self.enemy
         logs = []
 
-        damage = max(1, current.physical_attack - enemy.physical_defense // 2)
+        damage = self.rules.damage(current.physical_attack, enemy.physical_defense)
         
         # 敵の回避判定
-        if random.random() < enemy.dodge_rate:
-            logs.append(f"💨 {enemy.name}は {current.name} の攻撃を華麗に避けた！")
+        if self.rng.random() < enemy.dodge_rate:
+            logs.append(Dodge(current.name, enemy.name))
         else:
             enemy.current_hp = max(0, enemy.current_hp - damage)
-            logs.append(f"💥 {current.name}は {enemy.name} に {damage} のダメージを与えた！")
+            logs.append(Damage(current.name, enemy.name, damage))
 
+        # 吸血・連携攻撃などのパッシブスキルはスキル使用後にだけ発動する (通常攻撃では発動しない)
         return logs, self.check_battle_status() # ログとバトルの結果を返す
 
     def process_guard(self):
@@ -184,17 +137,17 @@ class Battle:
         「ぼうぎょ」コマンドを実行する (防御フラグを立てる)
         """
         self.current_monster.is_guarding = True # Monsterクラスにこの属性が必要です
-        return [f"🛡️ {self.current_monster.name}は身構えた。次のターンの被ダメージが減少する。"]
+        return [Guard(self.current_monster.name)]
 
     def process_escape(self):
         """
         「にげる」コマンドを実行する
         """
-        escape_rate = 0.5 # 逃走成功率
-        if random.random() < escape_rate:
-            return ["🏃‍♂️ 戦闘から離脱しました。"], "escape"
+        escape_rate = self.rules.escape_chance(self.current_monster, self.enemy) # 逃走成功率
+        if self.rng.random() < escape_rate:
+            return [Escape(True)], "escape"
         else:
-            return ["🛑 逃走に失敗した！"], None
+            return [Escape(False)], None
         
 # --- ターンの進行とチェック ---
 
@@ -210,39 +163,41 @@ class Battle:
         
         # 状態異常の継続ターンを減少させる処理は、ターン開始時に別で実行されていることを想定
         
+        ailments = enemy.status_effects.ailment_mask # かかっている状態異常のビットフラグ
+        
         # 💥 Stun (麻痺・行動不能) チェック
-        if 'stun' in enemy.status_effects:
-            logs.append(f"🥶 {enemy.name} は**麻痺**で体が動かない！")
+        if ailments & STUN:
+            logs.append(Stunned(enemy.name))
             # Stun 状態異常はターン終了時に持続ターンが減るため、ここでは行動をスキップするのみ
             return logs, self.check_battle_status() # 行動をスキップしてターン終了
             
         # 😵 Confusion (混乱) チェック
-        if 'confusion' in enemy.status_effects:
-            # 混乱による自傷判定 (例: 50%の確率で自傷)
-            if random.random() < 0.5: 
-                damage = max(1, enemy.physical_attack // 3) # 自傷ダメージは弱めに設定
+        if ailments & CONFUSION:
+            # 混乱による自傷判定 (CONFUSION_SELF_HIT_CHANCE の確率で自傷)
+            if self.rng.random() < self.rules.confusion_self_hit_chance: 
+                damage = self.rules.confusion_damage(enemy.physical_attack) # 自傷ダメージは弱めに設定
                 enemy.current_hp = max(0, enemy.current_hp - damage)
-                logs.append(f"😵 {enemy.name} は**混乱**し、自身に {damage} のダメージを与えてしまった！")
+                logs.append(Confused(enemy.name, damage))
                 return logs, self.check_battle_status() # 行動終了
-            logs.append(f"🤯 {enemy.name} は**混乱**しているが、なんとか正気を取り戻した...")
+            logs.append(Confused(enemy.name))
             # 混乱状態で正気を取り戻した場合は、通常の行動に進む
 
         # --- 2. 通常の攻撃ロジック ---
         
         # 敵の攻撃ロジック
-        damage = max(1, enemy.physical_attack - current.physical_defense // 2)
+        damage = self.rules.damage(enemy.physical_attack, current.physical_defense)
         
         # 防御状態の確認
         if current.is_guarding:
-            damage = max(1, damage // 2)
+            damage = self.rules.guard_damage(damage)
             current.is_guarding = False # 防御状態を解除
             
         # プレイヤーモンスターの回避判定
-        if random.random() < current.dodge_rate:
-            logs.append(f"💨 {current.name} は {enemy.name} の攻撃を華麗に避けた！")
+        if self.rng.random() < current.dodge_rate:
+            logs.append(Dodge(enemy.name, current.name))
         else:
             current.current_hp = max(0, current.current_hp - damage)
-            logs.append(f"💥 {enemy.name} は {current.name} に {damage} のダメージを与えた！")
+            logs.append(Damage(enemy.name, current.name, damage))
 
         return logs, self.check_battle_status()
     
@@ -251,11 +206,14 @@ class Battle:
         バトルの勝敗をチェックする
         """
         if self.enemy.current_hp <= 0:
+            self.enemy.is_alive = False
             return "win"
         
         # プレイヤー側の全滅判定（ここではcurrent_monsterのみチェック）
         # 厳密にはplayer.monsters全体をチェックすべきだが、一旦current_monsterのみで
         if self.current_monster.current_hp <= 0:
+            # 倒れたモンスターが交代先の候補に残らないように戦闘不能フラグを立てる
+            self.current_monster.is_alive = False
             # 交代可能なモンスターがいるかチェック
             if any(m.is_alive and m != self.current_monster for m in self.player.monsters):
                 return "switch_needed"
@@ -268,60 +226,48 @@ class Battle:
         """
         戦闘中のモンスターを新しいモンスターに交代させる
         :param new_monster: 交代させる新しいMonsterオブジェクト
-        :return: ログメッセージのリスト
+        :return: バトルイベントのリスト
         """
-        logs = []
         old_monster = self.current_monster
         
         # 既にapp.py側でチェックされているはずだが、念のため生存チェック
         if not new_monster.is_alive:
-            return ["💀 そのモンスターは戦闘不能です。交代できません。"]
+            return [Switched('', new_monster.name)]
             
         # 交代の実行
         self.current_monster = new_monster
         self.participated_monsters.add(new_monster)
         
-        # ログメッセージ
-        logs.append(f"🔄 {old_monster.name}を引っ込めた！")
-        logs.append(f"🔥 {new_monster.name}が戦闘に飛び出した！")
-        
-        return logs
+        return [Switched(old_monster.name, new_monster.name)]
     
     def process_scout(self):
         """
         スカウトコマンドを実行し、成否を判定する。
-        :return: ログメッセージのリスト, バトル結果 ('scout_success' または None)
+        :return: バトルイベントのリスト, バトル結果 ('scout_success' または None)
         """
         logs = []
         enemy = self.enemy
         
         # 1. 成功率の計算
-        # 敵のHPが低いほど成功率が上がる (例: (max_hp - current_hp) / max_hp)
-        hp_ratio = (enemy.max_hp - enemy.current_hp) / enemy.max_hp
-        
-        # 基礎スカウト率とHP補正を組み合わせる
+        # 敵のHPが低いほど成功率が上がる (HP補正の重みは SCOUT_HP_BONUS_WEIGHT)
         # (enemy.scout_rateは0.05〜0.2を想定)
-        final_rate = enemy.scout_rate * (1 + hp_ratio * 1.5) # HP補正は最大で1.5倍まで影響
-        final_rate = min(1.0, final_rate) # 最大100%
+        final_rate = self.rules.scout_chance(enemy) # 最大100%
 
         # 2. 判定
-        if random.random() < final_rate:
+        if self.rng.random() < final_rate:
             # 成功
-            logs.append(f"🎉 スカウト成功！野生の**{enemy.name}**は仲間になりたそうにこちらを見ている！")
+            logs.append(Scout(enemy.name, True))
             return logs, "scout_success"
         else:
             # 失敗
-            logs.append(f"💔 スカウト失敗... {enemy.name}は警戒しているようだ。")
+            logs.append(Scout(enemy.name, False))
             return logs, None
         
     def get_available_active_skills(self):
         """
-        現在使用可能なアクティブスキルと消費MPをリストで返す
+        現在使用可能なアクティブスキルをリストで返す (消費MPの昇順)
         """
-        return [
-            skill for skill in self.current_monster.get_active_skills()
-            if self.current_monster.current_mp >= skill.mp_cost
-        ]
+        return self.current_monster.get_usable_active_skills(self.current_monster.current_mp)
 
     def process_skill_use(self, selected_skill):
         """
@@ -331,12 +277,12 @@ class Battle:
         logs = []
         
         if current.current_mp < selected_skill.mp_cost:
-            logs.append(f"❌ MPが足りません。（必要MP: {selected_skill.mp_cost}）")
+            logs.append(SkillUsed('', selected_skill.name, selected_skill.mp_cost))
             return logs, None # ターンを消費しない
 
         # MP消費と初期ログ
         current.current_mp -= selected_skill.mp_cost
-        logs.append(f"✨ {current.name}は {selected_skill.name} を使った！ (MP-{selected_skill.mp_cost})")
+        logs.append(SkillUsed(current.name, selected_skill.name, selected_skill.mp_cost))
 
         # スキル効果の適用とログの取得
         effect_logs = self.apply_skill_effect(current, selected_skill)
@@ -344,11 +290,9 @@ class Battle:
         
         result = self.check_battle_status() 
         
-        # 連携攻撃などのパッシブスキルチェック (スキル使用後)
-        if result != 'win':
-            passive_result = self._process_passive_extra_attack(current)
-            if passive_result == "enemy_fainted":
-                result = 'win' # パッシブで敵が倒れた場合
+        # 連携攻撃などのパッシブスキルチェック (スキル使用後、バトルが続いている場合のみ)
+        if result is None:
+            result = self._process_passive_after_action(current, logs)
         
         return logs, result
     
@@ -356,7 +300,7 @@ class Battle:
         """
         ターン終了時、プレイヤーと敵の継続効果を処理する。
         継続ダメージによる勝敗判定を行う。
-        :return: ログメッセージのリスト, バトル結果 ('win', 'lose', 'switch_needed', or None)
+        :return: バトルイベントのリスト, バトル結果 ('win', 'lose', 'switch_needed', or None)
         """
         logs = []
         
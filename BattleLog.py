@@ -0,0 +1,246 @@
+# BattleLog.py
+# バトル中の出来事を型付きのイベントとして記録し、表示するときにだけ文章に変換する
+
+from collections import deque
+from typing import NamedTuple
+
+DEFAULT_LOG_SIZE = 50 # セッションに保持するイベント数の上限 (画面に表示するのは直近の10件)
+
+# ==================================
+# 1. イベントの定義
+# ==================================
+# 各イベントは名前と数値だけを持つ軽量なタプルで、render() で初めて文章を組み立てる
+
+class Message(NamedTuple):
+    """UI側で追加する任意のメッセージ"""
+    text: str
+
+    def render(self):
+        return self.text
+
+class Damage(NamedTuple):
+    """攻撃によるダメージ (hits が 2 以上の場合は連続攻撃の何ヒット目か)"""
+    attacker: str
+    target: str
+    amount: int
+    hit: int = 1
+    hits: int = 1
+
+    def render(self):
+        if self.hits > 1:
+            return f"💥 {self.target} に {self.amount} のダメージを与えた！ ({self.hit}/{self.hits}ヒット)"
+        if not self.attacker:
+            return f"💥 {self.target} に {self.amount} のダメージを与えた！"
+        return f"💥 {self.attacker}は {self.target} に {self.amount} のダメージを与えた！"
+
+class DamageTotal(NamedTuple):
+    """連続攻撃の合計ダメージ"""
+    target: str
+    amount: int
+
+    def render(self):
+        return f" (合計 {self.amount} ダメージ)"
+
+class Dodge(NamedTuple):
+    attacker: str
+    target: str
+
+    def render(self):
+        return f"💨 {self.target}は {self.attacker} の攻撃を華麗に避けた！"
+
+class Heal(NamedTuple):
+    """HP回復 (source が 'life_steal' の場合は吸血による回復)"""
+    target: str
+    amount: int
+    source: str = 'skill'
+
+    def render(self):
+        if self.source == 'life_steal':
+            return f"💉 {self.target}は{self.amount}のHPを吸収して回復した！"
+        return f"💚 {self.target}はHPを{self.amount}回復した！"
+
+class SelfDamage(NamedTuple):
+    target: str
+    amount: int
+
+    def render(self):
+        return f"💔 {self.target}は {self.amount} の反動ダメージを受けた！"
+
+class Buff(NamedTuple):
+    target: str
+
+    def render(self):
+        return f"⬆️ {self.target}に強化効果がかかった！"
+
+class Debuff(NamedTuple):
+    target: str
+
+    def render(self):
+        return f"⬇️ {self.target}に弱体効果がかかった！"
+
+class AilmentApplied(NamedTuple):
+    target: str
+
+    def render(self):
+        return f"⚠️ {self.target}に状態異常が付与された！"
+
+class Guard(NamedTuple):
+    target: str
+
+    def render(self):
+        return f"🛡️ {self.target}は身構えた。次のターンの被ダメージが減少する。"
+
+class NoEffect(NamedTuple):
+    """バトルにまだ仕組みがない効果 (SkillEffects.UNSUPPORTED_KEYS) だけを持つスキルを使った"""
+    skill: str
+
+    def render(self):
+        return f"❔ しかし {self.skill} は何も起こらなかった。"
+
+class Escape(NamedTuple):
+    success: bool
+
+    def render(self):
+        return "🏃‍♂️ 戦闘から離脱しました。" if self.success else "🛑 逃走に失敗した！"
+
+class Stunned(NamedTuple):
+    target: str
+
+    def render(self):
+        return f"🥶 {self.target} は**麻痺**で体が動かない！"
+
+class Confused(NamedTuple):
+    """混乱の判定結果 (damage が 0 の場合は正気を取り戻した)"""
+    target: str
+    damage: int = 0
+
+    def render(self):
+        if self.damage:
+            return f"😵 {self.target} は**混乱**し、自身に {self.damage} のダメージを与えてしまった！"
+        return f"🤯 {self.target} は**混乱**しているが、なんとか正気を取り戻した..."
+
+class PassiveActivated(NamedTuple):
+    """パッシブスキルの発動 (リーダーシップ、連携攻撃など)"""
+    user: str
+    skill: str
+
+    def render(self):
+        return f"🔄 {self.user}の{self.skill}が発動！"
+
+class Switched(NamedTuple):
+    """モンスターの交代 (old が空文字の場合は交代できなかった)"""
+    old: str
+    new: str
+
+    def render(self):
+        if not self.old:
+            return "💀 そのモンスターは戦闘不能です。交代できません。"
+        return f"🔄 {self.old}を引っ込めた！\n🔥 {self.new}が戦闘に飛び出した！"
+
+class Scout(NamedTuple):
+    target: str
+    success: bool
+
+    def render(self):
+        if self.success:
+            return f"🎉 スカウト成功！野生の**{self.target}**は仲間になりたそうにこちらを見ている！"
+        return f"💔 スカウト失敗... {self.target}は警戒しているようだ。"
+
+class SkillUsed(NamedTuple):
+    """スキルの使用 (user が空文字の場合はMP不足で使えなかった)"""
+    user: str
+    skill: str
+    mp_cost: int
+
+    def render(self):
+        if not self.user:
+            return f"❌ MPが足りません。（必要MP: {self.mp_cost}）"
+        return f"✨ {self.user}は {self.skill} を使った！ (MP-{self.mp_cost})"
+
+class DamageOverTime(NamedTuple):
+    """毒・火傷などの継続ダメージ"""
+    target: str
+    ailment: str
+    amount: int
+
+    def render(self):
+        if self.ailment == 'poison':
+            return f"💀 {self.target}は毒に侵され、{self.amount} のダメージを受けた！"
+        if self.ailment == 'burn':
+            return f"🔥 {self.target}は火傷で、{self.amount} のダメージを受けた！"
+        return f"💀 {self.target}は{self.ailment}で {self.amount} のダメージを受けた！"
+
+class Fainted(NamedTuple):
+    """継続ダメージによる戦闘不能"""
+    target: str
+
+    def render(self):
+        return f"💥 {self.target}は継続ダメージにより力尽きた..."
+
+class Expired(NamedTuple):
+    """効果の解除 (kind は 'buff' / 'debuff' / 'ailment')"""
+    target: str
+    key: str
+    kind: str
+
+    def render(self):
+        if self.kind == 'buff':
+            return f"⬇️ {self.target}の**{self.key}**上昇効果が切れた。"
+        if self.kind == 'debuff':
+            return f"⬆️ {self.target}の**{self.key}**低下効果が治った。"
+        return f"✨ {self.target}の**{self.key}**状態が治った！"
+
+# ==================================
+# 2. リングバッファ
+# ==================================
+
+class BattleLog:
+    def __init__(self, maxlen=DEFAULT_LOG_SIZE, events=()):
+        """
+        バトルログを固定長のリングバッファで保持するクラス
+        古いイベントは maxlen を超えると自動的に捨てられる
+        :param maxlen: 保持するイベント数の上限
+        """
+        self._events = deque(events, maxlen=maxlen)
+
+    def append(self, event):
+        """
+        イベントを追加する (文字列の場合は Message として追加する)
+        """
+        if isinstance(event, str):
+            event = Message(event)
+        self._events.append(event)
+
+    def extend(self, events):
+        for event in events:
+            self.append(event)
+
+    def clear(self):
+        self._events.clear()
+
+    def tail(self, count):
+        """
+        直近 count 件のイベントを古い順に返す
+        """
+        events = self._events
+        start = max(0, len(events) - count)
+        return [events[i] for i in range(start, len(events))]
+
+    def render_tail(self, count):
+        """
+        直近 count 件のイベントを文章に変換して返す (表示する分だけを変換する)
+        """
+        return [event.render() for event in self.tail(count)]
+
+    @property
+    def maxlen(self):
+        """
+        保持するイベント数の上限
+        """
+        return self._events.maxlen
+
+    def __len__(self):
+        return len(self._events)
+
+    def __iter__(self):
+        return iter(self._events)
@@ -0,0 +1,250 @@
+# EncounterGenerator.py
+# フィールドで出現する敵モンスターを、encounter_tables.json の重み付き出現テーブルから生成するモジュール
+# 種族の抽選はエイリアス法で O(1)、生成済みの敵はバックグラウンドのスレッドが補充するプールから取り出す
+
+import json
+import os
+import sys
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+from MonsterCatalog import STAT_KEYS, MonsterCatalog
+from RandomStream import RandomStream
+
+DEFAULT_TABLE = 'field'
+DEFAULT_POOL_SIZE = 8 # プールに用意しておく敵の数
+
+class AliasTable:
+    __slots__ = ('probability', 'alias')
+
+    def __init__(self, weights):
+        """
+        重み付きの抽選を乱数1回・O(1) で行うためのエイリアス表 (Vose の方法で作成する)
+        :param weights: 各要素の重み (0以上、合計は正)
+        """
+        count = len(weights)
+        total = sum(weights)
+        scaled = [weight * count / total for weight in weights]
+        probability = [0.0] * count
+        alias = list(range(count))
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            probability[less] = scaled[less]
+            alias[less] = more
+            scaled[more] += scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+        # 残りは誤差を除いて確率1
+        for i in small + large:
+            probability[i] = 1.0
+        self.probability = tuple(probability)
+        self.alias = tuple(alias)
+
+    def sample(self, rng):
+        """
+        要素の番号を1つ抽選する (rng.random() を1回だけ使う)
+        """
+        position = rng.random() * len(self.probability)
+        index = int(position)
+        return index if position - index < self.probability[index] else self.alias[index]
+
+@dataclass(frozen=True)
+class EncounterTable:
+    """
+    encounter_tables.json の1テーブル分を検証済みの不変データとして保持するクラス
+    """
+    name: str
+    species: tuple          # 出現する種族名
+    alias: AliasTable       # species の番号を重みどおりに抽選するエイリアス表
+    level_range: tuple      # (最低レベル, 最高レベル)
+    stat_jitter: tuple      # 能力値に掛ける倍率の範囲 (下限, 上限)
+    reward_per_level: float # レベル1あたりの経験値・ゴールドの増加率
+    scout_penalty_per_level: float # レベル1あたりのスカウト率の減少率
+
+    @classmethod
+    def from_dict(cls, name, data, catalog):
+        """
+        JSONの1テーブルを検証して EncounterTable を作成する
+        :param catalog: 種族名の確認に使う MonsterCatalog
+        """
+        if not isinstance(data, dict):
+            raise ValueError(f"Error: 出現テーブル {name} が辞書形式ではありません。")
+        enemies = data.get('enemies')
+        if not isinstance(enemies, list) or not enemies:
+            raise ValueError(f"Error: 出現テーブル {name} の enemies が不正です。")
+        known = set(catalog.names())
+        species = []
+        weights = []
+        for entry in enemies:
+            species_name = entry.get('species') if isinstance(entry, dict) else None
+            if species_name not in known:
+                raise ValueError(f"Error: 出現テーブル {name} の種族 {species_name!r} がモンスターデータにありません。")
+            weight = entry.get('weight', 1)
+            if not isinstance(weight, (int, float)) or isinstance(weight, bool) or weight < 0:
+                raise ValueError(f"Error: 出現テーブル {name} の {species_name} の weight が不正です。（値: {weight!r}）")
+            species.append(species_name)
+            weights.append(weight)
+        if sum(weights) <= 0:
+            raise ValueError(f"Error: 出現テーブル {name} の weight の合計が0です。")
+
+        level_range = data.get('level', [1, 1])
+        if (not isinstance(level_range, list) or len(level_range) != 2
+                or not all(isinstance(level, int) and not isinstance(level, bool) for level in level_range)
+                or not 1 <= level_range[0] <= level_range[1]):
+            raise ValueError(f"Error: 出現テーブル {name} の level が不正です。（値: {level_range!r}）")
+        jitter = data.get('stat_jitter', [1.0, 1.0])
+        if (not isinstance(jitter, list) or len(jitter) != 2
+                or not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in jitter)
+                or not 0 < jitter[0] <= jitter[1]):
+            raise ValueError(f"Error: 出現テーブル {name} の stat_jitter が不正です。（値: {jitter!r}）")
+        rates = {}
+        for key in ('reward_per_level', 'scout_penalty_per_level'):
+            value = data.get(key, 0.0)
+            if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+                raise ValueError(f"Error: 出現テーブル {name} の {key} が不正です。（値: {value!r}）")
+            rates[key] = float(value)
+
+        return cls(
+            name=name,
+            species=tuple(species),
+            alias=AliasTable(weights),
+            level_range=tuple(level_range),
+            stat_jitter=(float(jitter[0]), float(jitter[1])),
+            **rates
+        )
+
+class EncounterGenerator:
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, table=DEFAULT_TABLE, catalog=None, data_path=None, pool_size=DEFAULT_POOL_SIZE, seed=None):
+        """
+        出現テーブルから敵モンスターを生成するクラス
+        take() はバックグラウンドのスレッドが補充するプールから生成済みの敵を取り出し、
+        プールが空の場合だけその場で生成する。
+        :param table: 使用する出現テーブル名
+        :param catalog: 種族データの取得元 (省略時は共有カタログ)
+        :param data_path: encounter_tables.json のパス (省略時はプロジェクトの data ディレクトリ)
+        :param pool_size: プールに用意しておく敵の数 (0 ならプールを使わない)
+        :param seed: プールの敵の生成に使う乱数のシード
+        """
+        self.catalog = catalog if catalog is not None else MonsterCatalog.shared()
+        if data_path is None:
+            base_path = os.path.dirname(os.path.abspath(__file__))
+            data_path = os.path.join(base_path, 'data', 'encounter_tables.json')
+        self.data_path = data_path
+        self.table = self._load_table(table)
+        self.pool_size = pool_size
+        self.rng = RandomStream(seed, 'encounters')
+
+        self._pool = deque() # 生成済みの (カタログの世代, 敵) (カタログの再読み込み前に作った敵は使わない)
+        self._lock = threading.Lock() # self.rng を使った生成を1スレッドずつにする
+        self._refill = threading.Event()
+        self._worker = None
+
+    @classmethod
+    def shared(cls):
+        """
+        プロセス全体で共有される EncounterGenerator を返す (初回呼び出し時に作成)
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    def _load_table(self, name):
+        try:
+            with open(self.data_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            print(f"Error: JSONファイル {self.data_path} が見つかりません。")
+            sys.exit(1)
+        except json.JSONDecodeError:
+            print(f"Error: JSONファイル {self.data_path} のフォーマットが不正です。")
+            sys.exit(1)
+        if not isinstance(data, dict) or name not in data:
+            raise ValueError(f"Error: 出現テーブル {name} が {self.data_path} に見つかりません。")
+        return EncounterTable.from_dict(name, data[name], self.catalog)
+
+    # --- 生成 ---
+    def generate_one(self, rng):
+        """
+        敵モンスターを1体生成する
+        種族の抽選 → 能力値のばらつき → レベル → 報酬・スカウト率の調整 の順に rng を使う
+        :param rng: 生成に使う乱数列 (RandomStream)。モンスター自身には rng.substream('enemy') を持たせる
+        """
+        table = self.table
+        species = table.species[table.alias.sample(rng)]
+        monster = self.catalog.spawn(species, rng.substream('enemy'))
+
+        # 能力値のばらつきはベース値に対して設定する (派生ステータスは次の参照時に再計算される)
+        low, high = table.stat_jitter
+        uniform = rng.uniform
+        for stat in STAT_KEYS:
+            monster.set_base_stat(stat, int(getattr(monster, f'base_{stat}') * uniform(low, high)))
+        monster.current_hp = monster.max_hp
+        monster.current_mp = monster.max_mp
+
+        level = monster.level = rng.randint(*table.level_range)
+        reward_scale = 1 + level * table.reward_per_level
+        monster.enemy_exp = int(monster.enemy_exp * reward_scale)
+        monster.enemy_gold = int(monster.enemy_gold * reward_scale)
+        monster.scout_rate = monster.scout_rate * (1 - level * table.scout_penalty_per_level)
+        return monster
+
+    def generate(self, n, rng=None):
+        """
+        敵モンスターを n 体まとめて生成する (各モンスターは rng から派生させた独立した乱数列を使う)
+        :param rng: 親の乱数列 (省略時はこのジェネレーターの乱数列)
+        """
+        if rng is None:
+            with self._lock:
+                return [self.generate_one(self.rng.spawn()) for _ in range(n)]
+        return [self.generate_one(rng.spawn()) for _ in range(n)]
+
+    # --- プール ---
+    def take(self):
+        """
+        生成済みの敵モンスターを1体取り出す (プールが空ならその場で生成する)
+        取り出した後、バックグラウンドのスレッドにプールの補充を依頼する
+        プールの敵は共有の乱数列で作られるため再現性はない (バトルを再現したい場合は generate_one() を使う)
+        """
+        if self.pool_size <= 0:
+            return self.generate(1)[0]
+        self.start()
+        self.catalog.refresh()
+        generation = self.catalog.generation
+        while True:
+            try:
+                made_in, monster = self._pool.popleft()
+            except IndexError:
+                monster = self.generate(1)[0]
+                break
+            if made_in == generation:
+                break
+        self._refill.set()
+        return monster
+
+    def start(self):
+        """
+        プールを補充するバックグラウンドのスレッドを起動する (take() の初回呼び出し時にも起動される)
+        """
+        if self.pool_size > 0 and self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._fill_loop, name='EncounterGenerator', daemon=True)
+                    self._worker.start()
+                    self._refill.set()
+
+    def _fill_loop(self):
+        while True:
+            self._refill.wait()
+            self._refill.clear()
+            while len(self._pool) < self.pool_size:
+                # 生成の前に世代を読む (生成中に再読み込みされた場合は古い世代として捨てられる)
+                generation = self.catalog.generation
+                self._pool.append((generation, self.generate(1)[0]))
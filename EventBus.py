@@ -0,0 +1,207 @@
+# EventBus.py
+# ゲームエンジン (Monster・SkillTree) からの通知を型付きのイベントとして配信するモジュール
+# エンジンは print() せずに EVENTS.publish() し、表示・ログ出力・集計は購読したシンクが行う
+# 購読者がいないときは、呼び出し側の `if EVENTS.active:` の判定だけで済み、イベントも作成されない
+
+import logging
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import NamedTuple
+
+# ==================================
+# 1. イベントの定義
+# ==================================
+# BattleLog のイベントと同じく、名前と数値だけを持つ軽量なタプルで、render() で初めて文章を組み立てる
+
+class DamageTaken(NamedTuple):
+    target: str
+    amount: int
+
+    def render(self):
+        return f"{self.target}は{self.amount}のダメージを受けた！"
+
+class ExpGained(NamedTuple):
+    target: str
+    amount: int
+
+    def render(self):
+        return f"{self.target}は{self.amount}の経験値を得た！"
+
+class LeveledUp(NamedTuple):
+    """レベルアップ (stats はレベルアップ後の HP, MP, 物理攻撃, 物理防御, 魔法攻撃, 魔法防御, すばやさ)"""
+    target: str
+    level: int
+    stats: tuple
+
+    def render(self):
+        max_hp, max_mp, physical_attack, physical_defense, magic_attack, magic_defense, speed = self.stats
+        return (f"{self.target}はレベル{self.level}に上がった！\n"
+                f"HP: {max_hp}, MP: {max_mp}, 物理攻撃: {physical_attack}, 物理防御: {physical_defense}, "
+                f"魔法攻撃: {magic_attack}, 魔法防御: {magic_defense}, すばやさ: {speed}")
+
+class SkillPointsGained(NamedTuple):
+    target: str
+    amount: int
+    total: int
+
+    def render(self):
+        return f"スキルポイントを{self.amount}獲得した！ (合計: {self.total})"
+
+class StatBoosted(NamedTuple):
+    """スキル効果の辞書から直接かけたバフ (Monster.apply_buff_effect)"""
+    target: str
+    duration: int
+
+    def render(self):
+        return f"🔰 {self.target}のステータスが{self.duration}ターン上昇した！"
+
+class SkillLearned(NamedTuple):
+    skill: str
+
+    def render(self):
+        return f"Info: {self.skill} を習得しました！"
+
+class SkillLearnFailed(NamedTuple):
+    """
+    スキル習得の失敗 (reason は 'unknown' / 'learned' / 'points' / 'prerequisite')
+    reason が 'unknown' の場合、owner にはスキルツリーを探したモンスターの名前が入る (ツリー単体で探した場合は空文字)
+    """
+    skill: str
+    reason: str
+    required: int = 0
+    current: int = 0
+    owner: str = ''
+
+    def render(self):
+        if self.reason == 'unknown':
+            if self.owner:
+                return f"Error: {self.skill} は{self.owner}のスキルツリーに存在しません。"
+            return f"Error: {self.skill} はこのツリーに存在しません。"
+        if self.reason == 'learned':
+            return f"Warning: {self.skill} は既に習得済みです。"
+        if self.reason == 'points':
+            return f"Error: スキルポイントが{self.required}必要です。（現在: {self.current}）"
+        return f"Error: {self.skill} の前提スキルがまだ習得されていません。"
+
+# ==================================
+# 2. シンク
+# ==================================
+# シンクは sink(event) の形で呼び出される
+
+class NullSink:
+    """何もしないシンク (配信コストの計測用)"""
+    __slots__ = ()
+
+    def __call__(self, event):
+        pass
+
+class PrintSink:
+    """イベントを標準出力 (または file) に表示するシンク (コンソール用)"""
+    __slots__ = ('file',)
+
+    def __init__(self, file=None):
+        self.file = file
+
+    def __call__(self, event):
+        print(event.render(), file=self.file)
+
+class BufferSink:
+    """
+    イベントを固定長のバッファに溜めるシンク (UI で後からまとめて表示する用)
+    thread を指定した場合は、そのスレッドで発行されたイベントだけを受け取る (Streamlit のセッションごとの実行用)
+    """
+    __slots__ = ('events', 'thread')
+
+    def __init__(self, maxlen=None, thread=None):
+        self.events = deque(maxlen=maxlen)
+        self.thread = thread
+
+    def __call__(self, event):
+        if self.thread is None or self.thread == threading.get_ident():
+            self.events.append(event)
+
+    def drain(self):
+        """
+        溜まったイベントを古い順に返し、バッファを空にする
+        """
+        events = list(self.events)
+        self.events.clear()
+        return events
+
+class LoggingSink:
+    """イベントを logging のロガーに出力するシンク (サーバーログ用)"""
+    __slots__ = ('logger', 'level')
+
+    def __init__(self, logger='monster_game', level=logging.INFO):
+        self.logger = logging.getLogger(logger) if isinstance(logger, str) else logger
+        self.level = level
+
+    def __call__(self, event):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, event.render())
+
+class MetricsSink:
+    """イベントの種類ごとの件数を数えるシンク"""
+    __slots__ = ('counts',)
+
+    def __init__(self):
+        self.counts = Counter() # イベントのクラス名 -> 件数
+
+    def __call__(self, event):
+        self.counts[type(event).__name__] += 1
+
+    def reset(self):
+        self.counts.clear()
+
+# ==================================
+# 3. イベントバス
+# ==================================
+
+class EventBus:
+    __slots__ = ('active', '_subscriptions')
+
+    def __init__(self):
+        """
+        イベントを購読中のシンクに配信するクラス
+        発行側は `if bus.active:` で購読者の有無を確認してからイベントを作成・発行する。
+        """
+        self.active = False # 購読者が1つ以上いるか
+        self._subscriptions = () # ((シンク, 受け取るイベントのクラスのタプル または None), ...)
+
+    def subscribe(self, sink, kinds=None):
+        """
+        シンクを登録する
+        :param sink: sink(event) の形で呼び出せるオブジェクト
+        :param kinds: 受け取るイベントのクラス (単体またはタプル、省略時は全て)
+        :return: 登録したシンク (unsubscribe に渡す)
+        """
+        if kinds is not None and not isinstance(kinds, tuple):
+            kinds = (kinds,)
+        # 配信中に購読が変わっても影響しないよう、タプルを作り直して差し替える
+        self._subscriptions = self._subscriptions + ((sink, kinds),)
+        self.active = True
+        return sink
+
+    def unsubscribe(self, sink):
+        self._subscriptions = tuple(entry for entry in self._subscriptions if entry[0] is not sink)
+        self.active = bool(self._subscriptions)
+
+    def publish(self, event):
+        for sink, kinds in self._subscriptions:
+            if kinds is None or isinstance(event, kinds):
+                sink(event)
+
+    @contextmanager
+    def capture(self, *kinds):
+        """
+        with ブロック内で現在のスレッドが発行したイベントを集める
+        例: with EVENTS.capture(SkillLearnFailed) as sink: ... sink.drain()
+        """
+        sink = self.subscribe(BufferSink(thread=threading.get_ident()), kinds or None)
+        try:
+            yield sink
+        finally:
+            self.unsubscribe(sink)
+
+EVENTS = EventBus() # エンジン全体で共有するイベントバス
@@ -0,0 +1,329 @@
+# MarkovSolver.py
+# 1対1のバトルを、Battle のルールどおりのマルコフ連鎖として厳密に解くモジュール
+# 状態は (味方HP, 敵HP, ぼうぎょ中か, 継続効果の残りターン数) で、勝利・敗北・スカウト成功・逃走の確率と
+# 決着までの期待ターン数を、状態ごとのメモ化で計算する (モンテカルロ法のような誤差がない)
+#
+# 扱う行動は こうげき / ぼうぎょ / スカウト / にげる (MP を消費するスキルは状態に MP が加わるため対象外)
+# 回避・ぼうぎょ・混乱の自傷・麻痺・毒/火傷は Battle と同じ式で計算する
+# (吸血・追加攻撃などのパッシブスキルはスキル使用後にだけ発動するため、これらの行動には影響しない)
+
+import math
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import NamedTuple
+
+from RuleSet import RuleSet
+
+OUTCOMES = ('win', 'lose', 'scout_success', 'escape')
+ACTIONS = ('attack', 'guard', 'scout', 'escape')
+OPTIMAL = 'optimal' # 状態ごとに目的関数 (rewards) を最大にする行動を選ぶ方針
+DEFAULT_REWARDS = {'win': 1.0, 'scout_success': 1.0} # OPTIMAL の目的関数 (勝利とスカウト成功の確率の和)
+STALL_EPSILON = 1e-12 # これ以上の確率で同じ状態に留まり続ける行動は決着しないものとして扱う
+TIE_EPSILON = 1e-12 # OPTIMAL で目的関数の差がこれ以下の行動は同じ評価とみなす
+
+class SolverState(NamedTuple):
+    """
+    マルコフ連鎖の状態 (方針の関数にもこの形で渡される)
+    timers は MatchupModel.effects と同じ順の残りターン数 (0 なら解除済み)
+    """
+    player_hp: int
+    enemy_hp: int
+    guarding: bool
+    timers: tuple
+
+@dataclass
+class MatchupResult:
+    win: float
+    lose: float
+    scout: float
+    escape: float
+    expected_turns: float   # 決着までのプレイヤーの行動回数の期待値 (決着しない場合は inf)
+    action: str             # 初期状態で選ばれた行動
+    states: int             # 計算した状態の数
+
+    @property
+    def unresolved(self):
+        """
+        決着しない確率 (両者が攻撃を回避し続けるなど)
+        """
+        return max(0.0, 1.0 - self.win - self.lose - self.scout - self.escape)
+
+class _Stats(NamedTuple):
+    # 継続効果の有無の組み合わせごとの派生ステータス
+    physical_attack: int
+    physical_defense: int
+    dodge_rate: float
+    max_hp: int
+    speed: int
+
+def _stats(monster):
+    return _Stats(monster.physical_attack, monster.physical_defense, min(1.0, max(0.0, monster.dodge_rate)),
+                  monster.max_hp, monster.speed)
+
+class MatchupModel:
+    def __init__(self, player, enemy, rules=None):
+        """
+        味方1体と敵1体のステータス・継続効果・パッシブスキルから、状態遷移に必要な値を取り出すクラス
+        モンスターは変更しない (継続効果の有無ごとのステータスは複製したモンスターで計算する)
+        :param player: 味方のモンスター (Battle.current_monster)
+        :param enemy: 敵のモンスター
+        :param rules: 使用する RuleSet (省略時は共有の RuleSet)
+        """
+        self.rules = rules if rules is not None else RuleSet.shared()
+        self.player = player
+        self.enemy = enemy
+
+        # 継続効果: (持ち主 'player' / 'enemy', 効果名, 効果の辞書)
+        effects = []
+        timers = []
+        for owner, monster in (('player', player), ('enemy', enemy)):
+            for key, effect in monster.status_effects.items():
+                effects.append((owner, key, effect))
+                timers.append(monster.status_effects.remaining(key))
+        self.effects = tuple(effects)
+        self.initial_state = SolverState(player.current_hp, enemy.current_hp, bool(player.is_guarding), tuple(timers))
+        self._stats = {} # 継続効果の有無 (bool のタプル) -> (味方の _Stats, 敵の _Stats)
+
+        # モデルの内容を表すキー (同じキーのモデルは同じ解になる)
+        initial_stats = self.stats(tuple(timer > 0 for timer in timers))
+        self.key = (
+            initial_stats, self.initial_state,
+            tuple((owner, key, tuple(sorted((k, repr(v)) for k, v in effect.items() if k != 'expires_at')))
+                  for owner, key, effect in effects),
+            player.level, enemy.level, enemy.scout_rate,
+            tuple(sorted((k, repr(v)) for k, v in self.rules.config.items())),
+        )
+
+    def stats(self, active):
+        """
+        継続効果の有無 active (bool のタプル) に対する (味方, 敵) の派生ステータス
+        """
+        cached = self._stats.get(active)
+        if cached is None:
+            player = self.player.clone()
+            enemy = self.enemy.clone()
+            for (owner, key, effect), is_active in zip(self.effects, active):
+                if not is_active and effect['type'] != 'ailment':
+                    (player if owner == 'player' else enemy).remove_modifier(effect['stat'], key)
+            cached = self._stats[active] = (_stats(player), _stats(enemy))
+        return cached
+
+    def transitions(self, state, action):
+        """
+        状態 state で action を選んだときの遷移先の確率分布
+        :return: {次の SolverState またはバトル結果の文字列: 確率}
+        """
+        rules = self.rules
+        active = tuple(timer > 0 for timer in state.timers)
+        player_stats, enemy_stats = self.stats(active)
+        outcomes = {}
+
+        # --- 1. プレイヤーの行動 --- (確率, 味方HP, 敵HP, ぼうぎょ中か) の分岐を作る
+        branches = []
+        if action == 'attack':
+            damage = rules.damage(player_stats.physical_attack, enemy_stats.physical_defense)
+            dodge = enemy_stats.dodge_rate
+            if dodge > 0:
+                branches.append((dodge, state.player_hp, state.enemy_hp))
+            if dodge < 1:
+                branches.append((1 - dodge, state.player_hp, max(0, state.enemy_hp - damage)))
+            hits = branches
+            branches = []
+            for probability, player_hp, enemy_hp in hits:
+                if enemy_hp <= 0:
+                    _add(outcomes, 'win', probability)
+                else:
+                    branches.append((probability, player_hp, enemy_hp, state.guarding))
+        elif action == 'guard':
+            branches.append((1.0, state.player_hp, state.enemy_hp, True))
+        elif action == 'scout':
+            enemy_view = SimpleNamespace(max_hp=enemy_stats.max_hp, current_hp=state.enemy_hp, scout_rate=self.enemy.scout_rate)
+            chance = min(1.0, max(0.0, rules.scout_chance(enemy_view)))
+            _add(outcomes, 'scout_success', chance)
+            if chance < 1:
+                branches.append((1 - chance, state.player_hp, state.enemy_hp, state.guarding))
+        elif action == 'escape':
+            runner = SimpleNamespace(level=self.player.level, speed=player_stats.speed)
+            enemy_view = SimpleNamespace(level=self.enemy.level, speed=enemy_stats.speed)
+            chance = min(1.0, max(0.0, rules.escape_chance(runner, enemy_view)))
+            _add(outcomes, 'escape', chance)
+            if chance < 1:
+                branches.append((1 - chance, state.player_hp, state.enemy_hp, state.guarding))
+        else:
+            raise ValueError(f"Error: 不明な行動です。（{action!r}）")
+
+        # --- 2. 敵のターン ---
+        enemy_ailments = {key for (owner, key, effect), is_active in zip(self.effects, active)
+                          if is_active and owner == 'enemy' and effect['type'] == 'ailment'}
+        after_enemy = []
+        for probability, player_hp, enemy_hp, guarding in branches:
+            if 'stun' in enemy_ailments:
+                after_enemy.append((probability, player_hp, enemy_hp, guarding))
+                continue
+            if 'confusion' in enemy_ailments:
+                self_hit = min(1.0, max(0.0, rules.confusion_self_hit_chance))
+                if self_hit > 0:
+                    hurt_hp = max(0, enemy_hp - rules.confusion_damage(enemy_stats.physical_attack))
+                    if hurt_hp <= 0:
+                        _add(outcomes, 'win', probability * self_hit)
+                    else:
+                        after_enemy.append((probability * self_hit, player_hp, hurt_hp, guarding))
+                probability *= 1 - self_hit
+                if probability <= 0:
+                    continue
+            damage = rules.damage(enemy_stats.physical_attack, player_stats.physical_defense)
+            if guarding:
+                damage = rules.guard_damage(damage)
+            dodge = player_stats.dodge_rate
+            # ぼうぎょは回避した場合も解除される
+            if dodge > 0:
+                after_enemy.append((probability * dodge, player_hp, enemy_hp, False))
+            if dodge < 1:
+                hit_hp = max(0, player_hp - damage)
+                if hit_hp <= 0:
+                    _add(outcomes, 'lose', probability * (1 - dodge))
+                else:
+                    after_enemy.append((probability * (1 - dodge), hit_hp, enemy_hp, False))
+
+        # --- 3. ターン終了時の継続ダメージと効果の解除 (敵 → 味方の順) ---
+        enemy_dot = self._dot('enemy', active, enemy_stats)
+        player_dot = self._dot('player', active, player_stats)
+        timers = tuple(max(0, timer - 1) for timer in state.timers)
+        for probability, player_hp, enemy_hp, guarding in after_enemy:
+            if enemy_dot:
+                enemy_hp = max(0, enemy_hp - enemy_dot)
+                if enemy_hp <= 0:
+                    _add(outcomes, 'win', probability)
+                    continue
+            if player_dot:
+                player_hp = max(0, player_hp - player_dot)
+                if player_hp <= 0:
+                    _add(outcomes, 'lose', probability)
+                    continue
+            _add(outcomes, SolverState(player_hp, enemy_hp, guarding, timers), probability)
+        return outcomes
+
+    def _dot(self, owner, active, stats):
+        # 持ち主 owner にかかっている毒・火傷の1ターン分のダメージの合計 (StatusEffects.tick と同じ式)
+        total = 0
+        for (effect_owner, key, effect), is_active in zip(self.effects, active):
+            if not is_active or effect_owner != owner or effect['type'] != 'ailment':
+                continue
+            data = effect.get('data') or {}
+            if key == 'poison':
+                total += max(1, int(stats.max_hp * data.get('damage_percent', 0.1)))
+            elif key == 'burn':
+                total += data.get('damage', 5)
+        return total
+
+def _add(outcomes, key, probability):
+    if probability > 0:
+        outcomes[key] = outcomes.get(key, 0.0) + probability
+
+class MarkovSolver:
+    def __init__(self, policy='attack', rewards=None, cache_size=1024):
+        """
+        MatchupModel のマルコフ連鎖を解くクラス。解いた結果はモデルのキーごとにキャッシュする
+        :param policy: 行動の方針。'attack' などの行動名 (常にその行動)、SolverState を受け取って行動名を返す関数、
+                       または OPTIMAL (状態ごとに rewards の期待値を最大にする行動を選ぶ)
+        :param rewards: OPTIMAL の目的関数 (バトル結果ごとの重み、省略時は勝利とスカウト成功の確率の和)
+        :param cache_size: 結果をキャッシュするモデルの数
+        """
+        if isinstance(policy, str) and policy != OPTIMAL and policy not in ACTIONS:
+            raise ValueError(f"Error: 不明な方針です。（{policy!r}） 候補: {', '.join(ACTIONS + (OPTIMAL,))}")
+        self.policy = policy
+        self.rewards = rewards or DEFAULT_REWARDS
+        self.cache_size = cache_size
+        self._cache = {} # モデルのキー -> MatchupResult
+        self.hits = 0
+        self.misses = 0
+
+    def solve(self, player, enemy, rules=None):
+        """
+        味方 player と敵 enemy の現在の状態から1対1のバトルを解く
+        (バトル開始時のパッシブスキルは適用済みのものとして扱う)
+        :return: MatchupResult
+        """
+        return self.solve_model(MatchupModel(player, enemy, rules))
+
+    def solve_battle(self, battle):
+        """
+        進行中のバトルの、戦闘中のモンスターと敵の1対1として解く (控えのモンスターは考慮しない)
+        """
+        return self.solve(battle.current_monster, battle.enemy, battle.rules)
+
+    def solve_model(self, model):
+        cached = self._cache.get(model.key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        result = self._solve(model)
+        if len(self._cache) >= self.cache_size:
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[model.key] = result
+        return result
+
+    def _candidate_actions(self, state):
+        policy = self.policy
+        if policy == OPTIMAL:
+            return ACTIONS
+        if isinstance(policy, str):
+            return (policy,)
+        return (policy(state),)
+
+    def _solve(self, model):
+        # 状態 -> (各バトル結果の確率のタプル, 期待ターン数, 選んだ行動)
+        # HP は増えない (吸血は敵HPの減少と同時) ・残りターン数は減る一方のため、同じ状態への自己ループ以外に閉路はない
+        # 自己ループの確率 p は、残りの遷移を 1 / (1 - p) 倍することで解く
+        memo = {}
+        pending = {} # 計算中の状態 -> {行動: 遷移先の確率分布}
+        rewards = self.rewards
+        reward_vector = tuple(rewards.get(outcome, 0.0) for outcome in OUTCOMES)
+        outcome_index = {outcome: i for i, outcome in enumerate(OUTCOMES)}
+        stack = [model.initial_state]
+        while stack:
+            state = stack[-1]
+            if state in memo:
+                stack.pop()
+                continue
+            choices = pending.get(state)
+            if choices is None:
+                choices = pending[state] = {action: model.transitions(state, action) for action in self._candidate_actions(state)}
+                unsolved = [target for outcomes in choices.values() for target in outcomes
+                            if not isinstance(target, str) and target != state and target not in memo]
+                if unsolved:
+                    stack.extend(unsolved)
+                    continue
+            stack.pop()
+            del pending[state]
+
+            best = None
+            for action, outcomes in choices.items():
+                stay = outcomes.get(state, 0.0)
+                probabilities = [0.0] * len(OUTCOMES)
+                turns = 1.0
+                if stay < 1 - STALL_EPSILON:
+                    for target, probability in outcomes.items():
+                        if isinstance(target, str):
+                            probabilities[outcome_index[target]] += probability
+                        elif target != state:
+                            target_probabilities, target_turns, _ = memo[target]
+                            for i, value in enumerate(target_probabilities):
+                                probabilities[i] += probability * value
+                            turns += probability * target_turns
+                    scale = 1 / (1 - stay)
+                    probabilities = tuple(value * scale for value in probabilities)
+                    turns *= scale
+                else:
+                    probabilities = tuple(probabilities)
+                    turns = math.inf
+                # 目的関数が (丸め誤差を除いて) 同じなら、早く決着する行動を選ぶ
+                score = sum(weight * value for weight, value in zip(reward_vector, probabilities))
+                if (best is None or score > best[0] + TIE_EPSILON
+                        or (score >= best[0] - TIE_EPSILON and turns < best[2])):
+                    best = (score, probabilities, turns, action)
+            memo[state] = best[1:]
+
+        probabilities, turns, action = memo[model.initial_state]
+        return MatchupResult(*probabilities, expected_turns=turns, action=action, states=len(memo))
@@ -1,8 +1,80 @@
 import random
 import importlib
-import os
-import sys
-import json
+from bisect import bisect_right
+from types import MappingProxyType
+from EventBus import EVENTS, DamageTaken, ExpGained, LeveledUp, SkillLearnFailed, SkillPointsGained, StatBoosted
+from SkillEffects import STAT_KEYS
+from StatusEffects import StatusEffects
+
+# 派生ステータス (ベース値 + 補正) として計算されるステータス
+STAT_NAMES = frozenset(('max_hp', 'max_mp', 'physical_attack', 'physical_defense', 'magic_attack', 'magic_defense', 'speed', 'dodge_rate'))
+# 個体ごとに上書きできるが、通常は種族の値を使う報酬関連の属性
+SPECIES_DEFAULTS = frozenset(('enemy_exp', 'enemy_gold', 'scout_rate'))
+# パッシブスキルで常時上昇するステータスと表示名
+PASSIVE_STAT_LABELS = (
+    ('physical_attack', '物理攻撃力'),
+    ('physical_defense', '物理防御力'),
+    ('magic_attack', '魔法攻撃力'),
+    ('magic_defense', '魔法防御力'),
+    ('dodge_rate', '回避率'),
+    ('speed', 'すばやさ'),
+)
+DEFAULT_GROWTH_RATE = MappingProxyType({'HP':1.2, 'MP':1.1, 'Physical_Attack':1.1, 'Physical_Defense':1.1, 'Magic_Attack':1.1, 'Magic_Defense':1.1,  'Speed':1.1})
+_NO_HOOKS = MappingProxyType({})
+# レベルアップで成長するステータスと成長率のキー (乱数を引く順)
+LEVEL_UP_STATS = (
+    ('max_hp', 'HP'),
+    ('max_mp', 'MP'),
+    ('physical_attack', 'Physical_Attack'),
+    ('physical_defense', 'Physical_Defense'),
+    ('magic_attack', 'Magic_Attack'),
+    ('magic_defense', 'Magic_Defense'),
+    ('speed', 'Speed'),
+)
+# レベル n に到達するまでの累積経験値 (_CUMULATIVE_EXP[n - 1])。経験曲線は全種族で共通のため1つの表を共有し、必要な分だけ延長する
+_CUMULATIVE_EXP = [0]
+
+class MonsterSpecies:
+    __slots__ = ('name', 'growth_rate', 'enemy_exp', 'enemy_gold', 'scout_rate', 'ability', '_skill_trees')
+    _interned = {} # (種族名, 成長率, 報酬, ...) -> MonsterSpecies
+
+    def __init__(self, name, growth_rate, enemy_exp, enemy_gold, scout_rate, ability=None):
+        """
+        種族ごとに共通のデータ (成長率・報酬・スカウト率・スキルツリー) を保持する不変のレコード
+        同じ内容の種族は intern() で1つのオブジェクトを共有する
+        """
+        self.name = name
+        self.growth_rate = MappingProxyType(dict(growth_rate))
+        self.enemy_exp = enemy_exp
+        self.enemy_gold = enemy_gold
+        self.scout_rate = scout_rate
+        self.ability = ability
+        self._skill_trees = None # 種族の SkillTree テンプレートのタプル (初めて参照されたときに解決する)
+
+    @classmethod
+    def intern(cls, name, growth_rate, enemy_exp, enemy_gold, scout_rate, ability=None):
+        """
+        同じ内容の種族レコードがあればそれを返し、なければ作成して登録する
+        """
+        key = (name, tuple(sorted(growth_rate.items())), enemy_exp, enemy_gold, scout_rate, ability)
+        species = cls._interned.get(key)
+        if species is None:
+            species = cls._interned.setdefault(key, cls(name, growth_rate, enemy_exp, enemy_gold, scout_rate, ability))
+        return species
+
+    def __reduce__(self):
+        # 復元時も intern() を通して共有レコードを使う
+        return (MonsterSpecies.intern, (self.name, dict(self.growth_rate), self.enemy_exp, self.enemy_gold, self.scout_rate, self.ability))
+
+    @property
+    def skill_trees(self):
+        """
+        種族の SkillTree テンプレートのタプル (種族モジュールは初回参照時に一度だけ読み込む)
+        """
+        trees = self._skill_trees
+        if trees is None:
+            trees = self._skill_trees = Monster._resolve_skill_trees(self.name)
+        return trees
 
 class Monster:
     MONSTER_MAPPING = {
@@ -11,49 +83,57 @@ class Monster:
         "オオカミ": "wolf",
         "コウモリ": "bat",
     }
+    need_experience = 10  # 次のレベルに必要な経験値
+    experience_ratio = 1.5  # 経験値の増加率
+    SKILL_POINTS_PER_LEVEL = 30  # レベルアップごとに獲得するスキルポイント
+
+    # 個体ごとの状態だけを持つ (種族で共通のデータは species が持つ)
+    # 未設定のスロットは __getattr__ で補われる:
+    #   派生ステータス -> ベース値と補正から計算、enemy_exp などの報酬 -> 種族の値、rng -> random モジュール
+    __slots__ = (
+        'name', 'species', 'rng',
+        'level', 'experience', 'skill_points',
+        'current_hp', 'current_mp', 'is_alive', 'is_guarding',
+        'enemy_exp', 'enemy_gold', 'scout_rate',
+        'skills', 'active_skills', '_active_mp_costs', 'passive_skills', 'passive_hooks', '_skill_trees',
+        'status_effects', '_modifiers',
+        'base_max_hp', 'base_max_mp', 'base_physical_attack', 'base_physical_defense',
+        'base_magic_attack', 'base_magic_defense', 'base_speed', 'base_dodge_rate',
+        'max_hp', 'max_mp', 'physical_attack', 'physical_defense',
+        'magic_attack', 'magic_defense', 'speed', 'dodge_rate',
+    )
 
     def __init__(self, name, max_hp, max_mp, physical_attack, physical_defense, magic_attack, magic_defense, speed, 
                 enemy_exp=20, enemy_gold=15, scout_rate=0.1,
-                growth_rate={'HP':1.2, 'MP':1.1, 'Physical_Attack':1.1, 'Physical_Defense':1.1, 'Magic_Attack':1.1, 'Magic_Defense':1.1,  'Speed':1.1}, ability=None):
+                growth_rate=DEFAULT_GROWTH_RATE, ability=None,
+                rng=None):
+        """
+        :param rng: レベルアップなどで使う乱数列 (RandomStream など、省略時はグローバルな random モジュール)
+        """
         self.name = name
-        self.max_hp = max_hp
+        self.species = MonsterSpecies.intern(name, growth_rate, enemy_exp, enemy_gold, scout_rate, ability)
+        if rng is not None:
+            self.rng = rng
         self.current_hp = max_hp  # 現在のHP
-        self.max_mp = max_mp
         self.current_mp = max_mp  # 現在のMP
-        self.physical_attack = physical_attack
-        self.physical_defense = physical_defense
-        self.magic_attack = magic_attack
-        self.magic_defense = magic_defense
-        self.speed = speed
-        self.dodge_rate = 0.05  # 回避率
-        self.growth_rate = growth_rate
 
         self.is_alive = True
-        self.is_defending = False
         self.is_guarding = False
 
         self.level = 1
         self.experience = 0
-        self.need_experience = 10  # 次のレベルに必要な経験値
-        self.experience_ratio = 1.5  # 経験値の増加率
-
-        self.enemy_exp = enemy_exp # このモンスターを倒したときに得られる経験値
-        self.enemy_gold = enemy_gold # このモンスターを倒したときに得られるゴールド
-        self.scout_rate = scout_rate # スカウト成功率
 
-        self.skills = []
+        # スキルは習得時に作り直すタプルで持つ (未習得の個体は空のタプルを共有する)
+        self.skills = ()
+        self.active_skills = () # 習得済みアクティブスキル (消費MPの昇順)
+        self._active_mp_costs = () # active_skills と同じ順の消費MP (二分探索用)
+        self.passive_skills = ()
+        self.passive_hooks = _NO_HOOKS # トリガー名 -> パッシブスキルのフックのタプル (習得時に追加される)
         self.skill_points = 0
-        self.skill_trees = self.load_skill_tree()
+        self._skill_trees = None # スキルツリーの習得状態 (初めて参照されたときに種族モジュールを読み込む)
 
-        self.ability = ability  # 特性（未実装）
+        # status_effects (バフ・デバフ・状態異常) は初めて参照されたときに作成する
 
-        self.status_effects = {}
-
-        self.buffs = {}      # 例: {'physical_attack_up': {'duration': 3, 'value': 1.5, 'original_stat': 50}, ...}
-        self.debuffs = {}    # 例: {'physical_defense_down': {'duration': 2, 'value': 0.5, 'original_stat': 20}, ...}
-        self.ailments = {}   # 例: {'poison': {'duration': 4, 'damage_percent': 0.1}, 'burn': {'duration': 3, 'damage': 5}}
-        
-        # --- 追加点: 元のステータスを保持するための属性 ---
         # 永続的なステータス（ベース値）
         self.base_max_hp = max_hp
         self.base_max_mp = max_mp
@@ -62,63 +142,122 @@ class Monster:
         self.base_magic_attack = magic_attack
         self.base_magic_defense = magic_defense
         self.base_speed = speed
+        self.base_dodge_rate = 0.05  # 回避率
+        self._modifiers = None # ステータス名 -> {補正の出どころ: (固定値, 倍率)} (補正がなければ None)
+
+    @property
+    def growth_rate(self):
+        return self.species.growth_rate
+
+    @property
+    def ability(self):
+        return self.species.ability  # 特性（未実装）
+
+    def __getattr__(self, name):
+        # 通常の属性 (スロット) が未設定のときだけ呼ばれる
+        if name in STAT_NAMES:
+            return self._compute_stat(name)
+        if name in SPECIES_DEFAULTS:
+            return getattr(self.species, name)
+        if name == 'rng':
+            return random
+        if name == 'status_effects':
+            effects = self.status_effects = StatusEffects()
+            return effects
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def __getstate__(self):
+        # 設定済みのスロットだけを保存する (__getattr__ による補完値は保存しない)
+        state = {}
+        for name in Monster.__slots__:
+            try:
+                state[name] = object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+        # 共有の空のフック (MappingProxyType) は pickle できないため保存せず、復元時に付け直す
+        if state.get('passive_hooks') is _NO_HOOKS:
+            del state['passive_hooks']
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        if 'passive_hooks' not in state:
+            self.passive_hooks = _NO_HOOKS
     
     @classmethod
     def load_monster_data(cls, name):
         """
         JSONファイルから指定されたモンスターのデータをロードする
+        （共有カタログの解析済みデータを辞書形式で返す）
         """
-        # 現在のファイルのディレクトリを取得
-        base_path = os.path.dirname(os.path.abspath(__file__))
-        data_path = os.path.join(base_path, 'data', 'monster_stats.json')
-        
-        # 'data'ディレクトリがMonster.pyと同じ階層になく、プロジェクトのルートにある場合はパスを変更してください
-        # 例: data_path = os.path.join(os.path.abspath(os.path.join(base_path, os.pardir)), 'data', 'monster_stats.json')
-        
-        try:
-            with open(data_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            if name not in data:
-                raise ValueError(f"Error: {name} のデータがJSONファイルに見つかりません。")
-            
-            return data[name]
-            
-        except FileNotFoundError:
-            print(f"Error: JSONファイル {data_path} が見つかりません。")
-            sys.exit(1)
-        except json.JSONDecodeError:
-            print(f"Error: JSONファイル {data_path} のフォーマットが不正です。")
-            sys.exit(1)
+        from MonsterCatalog import MonsterCatalog
+        return MonsterCatalog.shared().get_template(name).to_dict()
 
     @classmethod
-    def from_json(cls, name):
+    def from_json(cls, name, rng=None):
         """
         JSONデータを使用してMonsterインスタンスを作成するファクトリメソッド
+        ファイルは共有カタログで一度だけ解析され、種族のプロトタイプを複製して作成する
+        :param rng: モンスターに持たせる乱数列 (省略時はグローバルな random モジュール)
         """
-        monster_data = cls.load_monster_data(name)
-
-        return cls(
-            name=name,
-            max_hp=monster_data['max_hp'],
-            max_mp=monster_data['max_mp'],
-            physical_attack=monster_data['physical_attack'],
-            physical_defense=monster_data['physical_defense'],
-            magic_attack=monster_data['magic_attack'],
-            magic_defense=monster_data['magic_defense'],
-            speed=monster_data['speed'],
-            enemy_exp=monster_data['enemy_exp'],
-            enemy_gold=monster_data['enemy_gold'],
-            scout_rate=monster_data['scout_rate'],
-            growth_rate=monster_data['growth_rate']
-        )
+        from MonsterCatalog import MonsterCatalog
+        return MonsterCatalog.shared().spawn(name, rng)
+
+    def clone(self):
+        """
+        このモンスターの複製を返す（プロトタイプからの生成用）
+        種族データやスキルのタプルは共有し、可変なコンテナのみ新しく作成する
+        """
+        new = object.__new__(type(self))
+        new.__setstate__(self.__getstate__())
+        if self._skill_trees is not None:
+            new._skill_trees = [state.copy() for state in self._skill_trees]
+        try:
+            new.status_effects = object.__getattribute__(self, 'status_effects').copy()
+        except AttributeError:
+            pass
+        if self._modifiers is not None:
+            new._modifiers = {stat: dict(modifiers) for stat, modifiers in self._modifiers.items()}
+        return new
+
+    def combat_state(self):
+        """
+        バトル中に変化する状態 (HP・MP・生存・ぼうぎょ・継続効果・ステータス補正) だけを取り出す (Battle.snapshot 用)
+        返り値は restore_combat_state() に何度でも渡せる (復元時に可変な部分を複製する)
+        """
+        try:
+            effects = object.__getattribute__(self, 'status_effects').copy()
+        except AttributeError:
+            effects = None
+        modifiers = {stat: dict(modifiers) for stat, modifiers in self._modifiers.items()} if self._modifiers else None
+        return (self.current_hp, self.current_mp, self.is_alive, self.is_guarding, effects, modifiers)
+
+    def restore_combat_state(self, state):
+        """
+        combat_state() で取り出した状態に戻す
+        """
+        self.current_hp, self.current_mp, self.is_alive, self.is_guarding, effects, modifiers = state
+        if effects is not None:
+            self.status_effects = effects.copy()
+        else:
+            try:
+                del self.status_effects
+            except AttributeError:
+                pass
+        # 補正が変わっていた場合だけ、全ての派生ステータスを再計算の対象にする
+        if (self._modifiers or None) != modifiers:
+            self._modifiers = {stat: dict(values) for stat, values in modifiers.items()} if modifiers else None
+            for stat in STAT_NAMES:
+                self._invalidate_stat(stat)
 
     def take_damage(self, damage):
         self.current_hp -= damage
         if self.current_hp <= 0:
             self.current_hp = 0
             self.is_alive = False
-        print(f"{self.name}は{damage}のダメージを受けた！")
+        if EVENTS.active:
+            EVENTS.publish(DamageTaken(self.name, damage))
 
     def is_fainted(self):
         return self.is_alive == False
@@ -134,46 +273,67 @@ class Monster:
         next_experience = self.need_experience * (self.experience_ratio ** (self.level - 1))
         return next_experience
     
+    @classmethod
+    def cumulative_exp(cls, level):
+        """
+        レベル1から level に到達するまでに必要な経験値の合計
+        """
+        table = _CUMULATIVE_EXP
+        while len(table) < level:
+            table.append(table[-1] + cls.need_experience * cls.experience_ratio ** (len(table) - 1))
+        return table[level - 1]
+
     def gain_experience(self, exp):
+        """
+        経験値を加算し、必要経験値に達していればレベルアップする
+        上がるレベル数は累積経験値の表を二分探索して一度に求める
+        :return: 上がったレベル数
+        """
         self.experience += exp
-        print(f"{self.name}は{exp}の経験値を得た！")
-        
+        if EVENTS.active:
+            EVENTS.publish(ExpGained(self.name, exp))
+
         # 経験値が次のレベルに必要な値を超えているかチェック
-        while self.experience >= self.get_next_level_exp():
-            # 次のレベルに必要な経験値を経験値から引いてからレベルアップ
-            self.experience -= self.get_next_level_exp()
-            self.level_up()
-
-    def level_up(self):
-        self.level += 1
-        self.max_hp = int(self.max_hp * self.growth_rate['HP'] + random.randint(1, 3))
+        if self.experience < self.get_next_level_exp():
+            return 0
+        total = self.cumulative_exp(self.level) + self.experience
+        while _CUMULATIVE_EXP[-1] <= total:
+            self.cumulative_exp(len(_CUMULATIVE_EXP) + 1)
+        new_level = bisect_right(_CUMULATIVE_EXP, total)
+        levels = new_level - self.level
+        # 到達したレベルまでの累積経験値を引いた残りを、次のレベルへの経験値とする
+        self.experience = total - _CUMULATIVE_EXP[new_level - 1]
+        self.level_up(levels)
+        return levels
+
+    def level_up(self, levels=1):
+        """
+        レベルを levels 上げ、ステータスを成長させる
+        複数レベル分の成長は、1レベルずつ上げた場合と同じ順序で乱数を引いてまとめて計算し、ステータスは最後に一度だけ更新する
+        """
+        if levels < 1:
+            return
+        randint = self.rng.randint
+        # 成長はベース値に対して行い、パッシブスキルやバフによる補正は派生ステータスとして再計算される
+        growth_rate = self.growth_rate
+        values = [getattr(self, f'base_{stat}') for stat, _ in LEVEL_UP_STATS]
+        rates = [growth_rate[key] for _, key in LEVEL_UP_STATS]
+        indices = range(len(values))
+        for _ in range(levels):
+            for i in indices:
+                values[i] = int(values[i] * rates[i] + randint(1, 3))
+        for (stat, _), value in zip(LEVEL_UP_STATS, values):
+            self.set_base_stat(stat, value)
+
+        self.level += levels
         self.current_hp = self.max_hp
-        self.base_max_hp = self.max_hp
-
-        self.max_mp = int(self.max_mp * self.growth_rate['MP'] + random.randint(1, 3))
         self.current_mp = self.max_mp
-        self.base_max_mp = self.max_mp
-
-        self.physical_attack = int(self.physical_attack * self.growth_rate['Physical_Attack'] + random.randint(1, 3))
-        self.base_physical_attack = self.physical_attack
-
-        self.physical_defense = int(self.physical_defense * self.growth_rate['Physical_Defense'] + random.randint(1, 3))
-        self.base_physical_defense = self.physical_defense
-
-        self.magic_attack = int(self.magic_attack * self.growth_rate['Magic_Attack'] + random.randint(1, 3))
-        self.base_magic_attack = self.magic_attack
 
-        self.magic_defense = int(self.magic_defense * self.growth_rate['Magic_Defense'] + random.randint(1, 3))
-        self.base_magic_defense = self.magic_defense
+        self.skill_points += self.SKILL_POINTS_PER_LEVEL * levels
 
-        self.speed = int(self.speed * self.growth_rate['Speed'] + random.randint(1, 3))
-        self.base_speed = self.speed
-
-        print(f"{self.name}はレベル{self.level}に上がった！")
-        print(f"HP: {self.max_hp}, MP: {self.max_mp}, 物理攻撃: {self.physical_attack}, 物理防御: {self.physical_defense}, 魔法攻撃: {self.magic_attack}, 魔法防御: {self.magic_defense}, すばやさ: {self.speed}")
-
-        self.skill_points += 30 # 例: レベルが上がるごとに1ポイント獲得
-        print(f"スキルポイントを1獲得した！ (合計: {self.skill_points})")
+        if EVENTS.active:
+            EVENTS.publish(LeveledUp(self.name, self.level, (self.max_hp, self.max_mp, self.physical_attack, self.physical_defense, self.magic_attack, self.magic_defense, self.speed)))
+            EVENTS.publish(SkillPointsGained(self.name, self.SKILL_POINTS_PER_LEVEL * levels, self.skill_points))
 
     def display_status(self):
         print(f"--- {self.name}のステータス ---")
@@ -208,60 +368,155 @@ class Monster:
 
     def get_active_skills(self):
         """
-        現在習得しているアクティブスキルをリストで返す
+        現在習得しているアクティブスキルを消費MPの昇順のリストで返す
+        """
+        return list(self.active_skills)
+
+    def get_usable_active_skills(self, mp):
+        """
+        消費MPが mp 以下のアクティブスキルをリストで返す (消費MPの昇順なので二分探索で求める)
         """
-        return [skill for skill in self.skills if skill.category == 'active']
+        return list(self.active_skills[:bisect_right(self._active_mp_costs, mp)])
     
     def get_passive_skills(self):
         """
         現在習得しているパッシブスキルをリストで返す
         """
-        # self.skillsはSkillオブジェクトのリストと仮定
-        return [skill for skill in self.skills if skill.category == 'passive']
-    
+        return list(self.passive_skills)
+
+    def add_skill(self, skill):
+        """
+        スキルをスキルリストに追加し、種類ごとの索引 (消費MP順のアクティブスキル、トリガー別のパッシブフック) を更新する
+        習得は頻繁ではないため、タプルを作り直す (複製したモンスター同士で安全に共有できる)
+        """
+        self.skills += (skill,)
+        if skill.category == 'active':
+            # 同じ消費MPのスキルは習得順に並べる
+            index = bisect_right(self._active_mp_costs, skill.mp_cost)
+            self.active_skills = self.active_skills[:index] + (skill,) + self.active_skills[index:]
+            self._active_mp_costs = self._active_mp_costs[:index] + (skill.mp_cost,) + self._active_mp_costs[index:]
+        elif skill.category == 'passive':
+            self.passive_skills += (skill,)
+            if skill.hooks:
+                hooks = dict(self.passive_hooks)
+                for trigger, hook in skill.hooks:
+                    hooks[trigger] = hooks.get(trigger, ()) + (hook,)
+                self.passive_hooks = hooks
+
+    @property
+    def skill_trees(self):
+        """
+        スキルツリーの習得状態のリスト (初回参照時に種族のスキルツリーを解決する)
+        """
+        trees = self._skill_trees
+        if trees is None:
+            trees = self._skill_trees = self.load_skill_tree()
+        return trees
+
     def load_skill_tree(self):
-        module_name = self.MONSTER_MAPPING.get(self.name)
+        """
+        種族に対応するスキルツリーの習得状態を作成する。
+        ツリーのテンプレートは種族レコードが一度だけ解決して保持し、各モンスターは習得ビットのみを持つ。
+        """
+        return [tree.new_state() for tree in self.species.skill_trees]
+
+    @classmethod
+    def _resolve_skill_trees(cls, name):
+        module_name = cls.MONSTER_MAPPING.get(name)
         if not module_name:
-            print(f"Warning: モンスター '{self.name}' に対応するスキルツリーが見つかりません。")
-            return []
+            print(f"Warning: モンスター '{name}' に対応するスキルツリーが見つかりません。")
+            return ()
 
         try:
-            # monstersフォルダをsys.pathに追加
-            base_path = os.path.dirname(os.path.abspath(__file__))
-            monsters_path = os.path.join(base_path, 'monsters')
-            if monsters_path not in sys.path:
-                sys.path.insert(0, monsters_path)
-            
-            # モジュールをインポートし、必要なオブジェクトのみをグローバル空間に読み込む
+            # モジュールをインポートし、必要なオブジェクトのみを取り出す
             # from monsters.slime import slime_tree のように処理する
             module = importlib.import_module(f'monsters.{module_name}')
             skill_tree = getattr(module, f'{module_name}_tree')
             
-            return [skill_tree]
+            return (skill_tree,)
         except (ImportError, AttributeError) as e:
-            print(f"Warning: スキルツリー {self.name} の読み込みに失敗しました。詳細: {e}")
+            print(f"Warning: スキルツリー {name} の読み込みに失敗しました。詳細: {e}")
+            return ()
+
+    def learn_skill(self, skill_name):
+        """
+        スキルツリーからスキルを習得し、スキルポイントを消費してスキルリストに追加する。
+        パッシブスキルの場合は効果も適用する。
+        :return: 成功時はパッシブ効果によるステータス変化のメッセージのリスト、失敗時はNone
+        """
+        for state in self.skill_trees:
+            if skill_name not in state.nodes:
+                continue
+            points_spent = state.learn_skill(skill_name, self.skill_points)
+            if points_spent is None:
+                return None
+            self.skill_points -= points_spent
+
+            skill = state.nodes[skill_name].skill
+            self.add_skill(skill)
+            if skill.category == 'passive':
+                return self.apply_passive_effect(skill)
             return []
+
+        if EVENTS.active:
+            EVENTS.publish(SkillLearnFailed(skill_name, 'unknown', owner=self.name))
+        return None
         
-    def reset_status_to_base(self, status_key, original_value):
-        """
-        特定のステータスを一時効果適用前の値に戻す
-        """
-        if status_key == 'max_hp':
-            self.max_hp = original_value
-        elif status_key == 'max_mp':
-            self.max_mp = original_value
-        elif status_key == 'physical_attack':
-            self.physical_attack = original_value
-        elif status_key == 'physical_defense':
-            self.physical_defense = original_value
-        elif status_key == 'magic_attack':
-            self.magic_attack = original_value
-        elif status_key == 'magic_defense':
-            self.magic_defense = original_value
-        elif status_key == 'speed':
-            self.speed = original_value
-        elif status_key == 'dodge_rate':
-            self.dodge_rate = original_value
+    # --- ステータス補正 (モディファイアスタック) ---
+    # physical_attack などの派生ステータスは通常の属性として保持され、参照は属性アクセス1回で済む。
+    # ベース値や補正が変わったときは該当する属性だけを削除し、次の参照時に __getattr__ で再計算する。
+    def _compute_stat(self, name):
+        value = getattr(self, f'base_{name}')
+        table = self._modifiers
+        modifiers = table.get(name) if table else None
+        if modifiers:
+            flat = 0
+            multiplier = 1.0
+            for mod_flat, mod_multiplier in modifiers.values():
+                flat += mod_flat
+                multiplier *= mod_multiplier
+            value += flat
+            if multiplier != 1.0:
+                value *= multiplier
+                if name != 'dodge_rate':
+                    value = int(value)
+        setattr(self, name, value)
+        return value
+
+    def _invalidate_stat(self, stat):
+        try:
+            delattr(self, stat)
+        except AttributeError:
+            pass
+
+    def set_base_stat(self, stat, value):
+        """
+        ステータスのベース値を設定する (レベルアップや敵の能力調整で使う)
+        派生ステータスに直接代入すると補正が失われるため、ステータスの変更は必ずこのメソッドか補正を使う
+        """
+        setattr(self, f'base_{stat}', value)
+        self._invalidate_stat(stat)
+
+    def add_modifier(self, stat, source, flat=0, multiplier=1.0):
+        """
+        ステータス補正を追加する (同じ source の補正は置き換える)
+        派生ステータスは (ベース値 + 固定値の合計) * 倍率の積 で計算される
+        :param source: 補正の出どころ (例: 'buff:physical_attack', 'passive:メタルボディ')
+        """
+        if self._modifiers is None:
+            self._modifiers = {}
+        self._modifiers.setdefault(stat, {})[source] = (flat, multiplier)
+        self._invalidate_stat(stat)
+
+    def remove_modifier(self, stat, source):
+        """
+        ステータス補正を取り除き、そのステータスだけを再計算の対象にする
+        """
+        modifiers = self._modifiers.get(stat) if self._modifiers else None
+        if modifiers and modifiers.pop(source, None) is not None:
+            if not modifiers:
+                del self._modifiers[stat]
+            self._invalidate_stat(stat)
         
     # --- 既存メソッド `apply_skill_effect` の変更 ---
     # `Battle.py` にあったものを修正して、バフ効果の適用時にベース値を記録し、効果を登録する
@@ -271,60 +526,49 @@ class Monster:
         if duration <= 0:
             return
             
-        for key, value in skill_effect.items():
-            if key in ['physical_attack', 'physical_defense', 'magic_attack', 'magic_defense', 'speed', 'dodge_rate']:
-                
-                # すでに効果が適用中の場合は、durationをリセットし、効果を上書きする
-                if key not in self.status_effects:
-                    # ベース値を取得（例: physical_attackのベース値）
-                    original_value = getattr(self, key)
-
-                    # ベース値を記録
-                    self.status_effects[key] = {
-                        'type': 'buff',
-                        'original_value': original_value,
-                        'duration': duration,
-                        'amount': value # 適用された効果量
-                    }
-                else:
-                    # 既に効果が適用中の場合は、durationを更新するだけにする（複雑なロジックは避ける）
-                    self.status_effects[key]['duration'] = duration
-                    
-                # モンスターのステータスに効果量を加算
-                setattr(self, key, getattr(self, key) + value)
-                
-        print(f"🔰 {self.name}のステータスが{duration}ターン上昇した！")
+        stats = [(key, value) for key, value in skill_effect.items() if key in STAT_KEYS]
+        self.apply_stat_effect('buff', stats, duration)
+        if EVENTS.active:
+            EVENTS.publish(StatBoosted(self.name, duration))
 
     def apply_debuff_effect(self, skill_effect):
         duration = skill_effect.get('duration', 0)
-        logs = [] # ログを保持するため
 
         if duration <= 0:
-            return logs
+            return
             
-        for key, value in skill_effect.items():
-            # ステータスデバフの適用
-            if key in ['physical_attack', 'physical_defense', 'magic_attack', 'magic_defense', 'speed', 'dodge_rate']:
-                # すでに効果が適用中の場合は、durationをリセットし、効果を上書きする
-                if key not in self.status_effects:
-                    original_value = getattr(self, key)
-                    self.status_effects[key] = {
-                        'original_value': original_value,
-                        'duration': duration,
-                        'amount': -value # 適用された効果量（デバフなのでマイナス）
-                    }
-                else:
-                    self.status_effects[key]['duration'] = duration
-                    
-                # モンスターのステータスに効果量を減算
-                setattr(self, key, getattr(self, key) - value)
-                logs.append(f"⬇️ {self.name}の**{key}**が{value}下がった！")
-
-    def apply_ailment_effect(self, skill_effect):
+        stats = [(key, value) for key, value in skill_effect.items() if key in STAT_KEYS]
+        self.apply_stat_effect('debuff', stats, duration)
+
+    def apply_stat_effect(self, effect_type, stats, duration):
+        """
+        ステータスの一時的な上昇 (buff) / 低下 (debuff) を適用し、元の値を記録する
+        :param effect_type: 'buff' または 'debuff'
+        :param stats: (ステータス名, 変化量) の列 (debuff の場合は変化量の分だけ下がる)
+        :param duration: 継続ターン数
+        """
+        sign = 1 if effect_type == 'buff' else -1
+        for key, value in stats:
+            source = f'{effect_type}:{key}' # 同じステータスのバフとデバフは別の効果として重ねられる
+            # すでに効果が適用中の場合は、durationをリセットし、効果量を上書きする (重ねがけはしない)
+            if source not in self.status_effects:
+                self.status_effects.add(source, {
+                    'type': effect_type,
+                    'stat': key,
+                    'amount': sign * value # 適用された効果量（デバフなのでマイナス）
+                }, duration)
+            else:
+                self.status_effects.refresh(source, duration)
+                self.status_effects[source]['amount'] = sign * value
+
+            # ステータス補正として登録する (期限切れのときは StatusEffects が補正を取り除く)
+            self.add_modifier(key, source, flat=sign * value)
+
+    def apply_ailment_effect(self, skill_effect, rng=None):
         """
         スキルエフェクトから状態異常を抽出し、モンスターに適用する。
+        :param rng: 判定に使う乱数列 (バトル中は Battle の乱数列を渡す、省略時はこのモンスターの乱数列)
         """
-        
         # typeが'ailment'でない場合は処理を終了
         if skill_effect.get('type') != 'ailment':
             return
@@ -335,110 +579,68 @@ class Monster:
         if duration <= 0:
             return 
             
-        chance = skill_effect.get('ailment_chance', 1.0) # 成功率
-        
         # ailment_type はリストまたは単一の文字列を想定
         ailment_candidates = skill_effect.get('ailment_type', [])
         if not ailment_candidates:
             return
+
+        chance = skill_effect.get('ailment_chance', 1.0) # 成功率
+        ailment_data = skill_effect.get('ailment_data', {}) # 状態異常の詳細データ（毒のダメージ量など）
+        self.apply_ailment(ailment_candidates, chance, duration, ailment_data, rng)
+
+    def apply_ailment(self, ailment_candidates, chance, duration, ailment_data, rng=None):
+        """
+        chance の確率で候補から1つの状態異常を選び、モンスターに適用する。
+        :param ailment_candidates: 状態異常名の文字列、または候補のリスト/タプル
+        :param rng: 判定に使う乱数列 (省略時はこのモンスターの乱数列)
+        """
+        rng = rng if rng is not None else self.rng
         
         # --- 状態異常の適用判定 ---
-        if random.random() < chance:
+        if rng.random() < chance:
             
             # 候補からランダムに1つの状態異常を選択 (リストで渡されている場合)
-            # 単一の文字列で渡された場合も random.choice はそのまま使える
-            if isinstance(ailment_candidates, list):
-                ailment = random.choice(ailment_candidates)
-            else:
+            if isinstance(ailment_candidates, str):
                 ailment = ailment_candidates # 単一の文字列の場合
+            else:
+                ailment = rng.choice(ailment_candidates)
                 
-            # 状態異常の詳細データ（毒のダメージ量など）
-            ailment_data = skill_effect.get('ailment_data', {})
-            
             # --- 状態異常の適用処理 ---
             
             # 既に同じ状態異常にかかっているかチェック
             if ailment in self.status_effects:
                 # 既存のdurationを更新
-                self.status_effects[ailment]['duration'] = duration
+                self.status_effects.refresh(ailment, duration)
             else:
                 # 新しい状態異常の適用
-                self.status_effects[ailment] = {
-                    'duration': duration,
+                self.status_effects.add(ailment, {
                     'type': 'ailment', # この情報があることで、バフ・デバフと区別しやすい
                     'data': ailment_data
-                }
+                }, duration)
 
     # --- 新しいメソッド: ターン終了時の効果処理 ---
     def process_turn_end_effects(self):
         """
         ターン終了時に継続効果の処理、カウントダウン、解除を行う
+        (期限を迎えた効果と継続ダメージを持つ状態異常だけが処理される)
+        :return: バトルイベントのリスト, 継続ダメージで戦闘不能になったか
         """
-        logs = []
-        expired_effects = []
-        fainted_by_effect = False # 継続ダメージで戦闘不能になったか
-        
-        # 1. 効果の処理とカウントダウン
-        for key, effect_data in list(self.status_effects.items()): # list()でコピーして反復中に変更できるようにする
-            
-            # --- A. 状態異常 (継続ダメージなど) の処理 ---
-            if effect_data['type'] == 'ailment':
-                ailment_type = key
-                data = effect_data['data']
-                
-                if ailment_type == 'poison':
-                    # 毒ダメージ計算 (ここでは最大HPの10%とし、データがあればそれを使う)
-                    damage_percent = data.get('damage_percent', 0.1)
-                    damage = max(1, int(self.max_hp * damage_percent))
-                    
-                    self.current_hp = max(0, self.current_hp - damage)
-                    logs.append(f"💀 {self.name}は毒に侵され、{damage} のダメージを受けた！")
-                
-                elif ailment_type == 'burn':
-                    # 火傷ダメージ計算 (固定値)
-                    damage = data.get('damage', 5)
-                    self.current_hp = max(0, self.current_hp - damage)
-                    logs.append(f"🔥 {self.name}は火傷で、{damage} のダメージを受けた！")
-                    
-                # 継続ダメージで倒れたかチェック
-                if self.current_hp <= 0:
-                    self.is_alive = False
-                    fainted_by_effect = True
-                    logs.append(f"💥 {self.name}は継続ダメージにより力尽きた...")
-            
-            # --- B. 継続ターンを減らす ---
-            effect_data['duration'] -= 1
-            if effect_data['duration'] <= 0:
-                expired_effects.append(key)
-        
-        # 2. 期限切れ効果の解除
-        for key in expired_effects:
-            # 継続ダメージで既に倒れている場合は、解除ログは不要
-            if fainted_by_effect and self.status_effects[key]['type'] == 'ailment':
-                del self.status_effects[key]
-                continue
+        return self.status_effects.tick(self)
 
-            effect_data = self.status_effects.pop(key)
-            
-            if effect_data['type'] in ['buff', 'debuff']:
-                stat_key = key
-                # original_valueに戻す (ベース値の参照方法を修正)
-                # 注: ここでは一時的に変更した属性値を、記録しておいた元の値に戻します。
-                
-                # 記録しておいた元の値を再設定
-                # keyが'physical_attack'などの属性名に対応していることが前提
-                self.reset_status_to_base(stat_key, effect_data['original_value'])
-                
-                if effect_data['type'] == 'buff':
-                    logs.append(f"⬇️ {self.name}の**{stat_key}**上昇効果が切れた。")
-                else: # debuff
-                    logs.append(f"⬆️ {self.name}の**{stat_key}**低下効果が治った。")
-            
-            elif effect_data['type'] == 'ailment':
-                logs.append(f"✨ {self.name}の**{key}**状態が治った！")
-        
-        # 倒れたか、ログメッセージ、何か解除されたかを返す
-        return logs, fainted_by_effect
+    def clear_status_effects(self):
+        """
+        継続効果 (バフ・デバフ・状態異常) と、それによるステータス補正を全て取り除く
+        継続効果はバトル中だけのもので、控えのモンスターは期限が進まないため、バトルの区切りで必ず解除する
+        パッシブスキルの補正 ('passive:...') は残る
+        """
+        try:
+            effects = object.__getattribute__(self, 'status_effects')
+        except AttributeError:
+            return
+        for key, effect in effects.items():
+            if effect['type'] != 'ailment':
+                self.remove_modifier(effect['stat'], key)
+        del self.status_effects
 
     def apply_passive_effect(self, skill):
         """
@@ -446,46 +648,22 @@ class Monster:
         適用結果のメッセージをリストで返す。
         """
         message = []
+
+        # type を持つ効果 (リーダーシップなど) はバトル開始時のフックとして発動するため、常時効果にはしない
+        if 'type' in skill.effect:
+            return message
         
-        # 物理攻撃
-        if "physical_attack" in skill.effect.keys():
-            amount = skill.effect["physical_attack"]
-            self.physical_attack += amount
-            self.base_physical_attack += amount 
-            message.append(f"物理攻撃力 +{amount}")
-            
-        # 物理防御
-        if "physical_defense" in skill.effect.keys():
-            amount = skill.effect["physical_defense"]
-            self.physical_defense += amount
-            self.base_physical_defense += amount
-            message.append(f"物理防御力 +{amount}")
-            
-        # 魔法攻撃
-        if "magic_attack" in skill.effect.keys():
-            amount = skill.effect["magic_attack"]
-            self.magic_attack += amount
-            self.base_magic_attack += amount
-            message.append(f"魔法攻撃力 +{amount}")
-
-        # 魔法防御
-        if "magic_defense" in skill.effect.keys():
-            amount = skill.effect["magic_defense"]
-            self.magic_defense += amount
-            self.base_magic_defense += amount
-            message.append(f"魔法防御力 +{amount}")
-            
-        # 回避率
-        if "dodge_rate" in skill.effect.keys():
-            amount = skill.effect["dodge_rate"]
-            self.dodge_rate += amount
-            # UIで表示しやすいように%表示に変換
-            message.append(f"回避率 +{int(amount * 100)}%")
-            
-        # すばやさ
-        if "speed" in skill.effect.keys():
-            amount = skill.effect["speed"]
-            self.speed += amount
-            message.append(f"すばやさ +{amount}")
+        # 常時効果はパッシブスキルを出どころとするステータス補正として登録する
+        source = f'passive:{skill.name}'
+        for stat, label in PASSIVE_STAT_LABELS:
+            if stat not in skill.effect:
+                continue
+            amount = skill.effect[stat]
+            self.add_modifier(stat, source, flat=amount)
+            if stat == 'dodge_rate':
+                # UIで表示しやすいように%表示に変換
+                message.append(f"{label} +{int(amount * 100)}%")
+            else:
+                message.append(f"{label} +{amount}")
             
         return message
\ No newline at end of file
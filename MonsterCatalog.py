@@ -0,0 +1,228 @@
+# MonsterCatalog.py
+
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+from Monster import Monster
+from RuleSet import RELOAD_CHECK_INTERVAL
+
+# monster_stats.json の各種族エントリに必須のキー
+STAT_KEYS = ('max_hp', 'max_mp', 'physical_attack', 'physical_defense', 'magic_attack', 'magic_defense', 'speed')
+REWARD_KEYS = ('enemy_exp', 'enemy_gold')
+GROWTH_KEYS = ('HP', 'MP', 'Physical_Attack', 'Physical_Defense', 'Magic_Attack', 'Magic_Defense', 'Speed')
+
+
+@dataclass(frozen=True)
+class MonsterTemplate:
+    """
+    monster_stats.json の1種族分を検証済みの不変データとして保持するクラス
+    """
+    name: str
+    max_hp: int
+    max_mp: int
+    physical_attack: int
+    physical_defense: int
+    magic_attack: int
+    magic_defense: int
+    speed: int
+    enemy_exp: int
+    enemy_gold: int
+    scout_rate: float
+    growth_rate: tuple  # (('HP', 1.2), ('MP', 1.1), ...) の形で保持する
+
+    @classmethod
+    def from_dict(cls, name, data):
+        """
+        JSONの1エントリを検証してテンプレートを作成する
+        :param name: 種族名（例: 'スライム'）
+        :param data: monster_stats.json の該当エントリ
+        """
+        if not isinstance(data, dict):
+            raise ValueError(f"Error: {name} のデータが辞書形式ではありません。")
+
+        fields = {}
+        for key in STAT_KEYS + REWARD_KEYS:
+            value = data.get(key)
+            if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+                raise ValueError(f"Error: {name} の {key} が不正です。（値: {value!r}）")
+            fields[key] = value
+        if fields['max_hp'] <= 0:
+            raise ValueError(f"Error: {name} の max_hp は1以上である必要があります。")
+
+        scout_rate = data.get('scout_rate')
+        if not isinstance(scout_rate, (int, float)) or not 0.0 <= scout_rate <= 1.0:
+            raise ValueError(f"Error: {name} の scout_rate が不正です。（値: {scout_rate!r}）")
+
+        growth = data.get('growth_rate')
+        if not isinstance(growth, dict) or any(key not in growth for key in GROWTH_KEYS):
+            raise ValueError(f"Error: {name} の growth_rate に不足しているキーがあります。")
+        for key in GROWTH_KEYS:
+            if not isinstance(growth[key], (int, float)) or growth[key] <= 0:
+                raise ValueError(f"Error: {name} の growth_rate.{key} が不正です。（値: {growth[key]!r}）")
+
+        return cls(
+            name=name,
+            scout_rate=float(scout_rate),
+            growth_rate=tuple((key, float(growth[key])) for key in GROWTH_KEYS),
+            **fields
+        )
+
+    def to_dict(self):
+        """
+        monster_stats.json と同じ形式の辞書に戻す
+        """
+        data = {key: getattr(self, key) for key in STAT_KEYS + REWARD_KEYS}
+        data['scout_rate'] = self.scout_rate
+        data['growth_rate'] = dict(self.growth_rate)
+        return data
+
+    def build(self):
+        """
+        テンプレートから新しいMonsterを通常のコンストラクタで作成する（プロトタイプ作成用）
+        """
+        return Monster(
+            name=self.name,
+            max_hp=self.max_hp,
+            max_mp=self.max_mp,
+            physical_attack=self.physical_attack,
+            physical_defense=self.physical_defense,
+            magic_attack=self.magic_attack,
+            magic_defense=self.magic_defense,
+            speed=self.speed,
+            enemy_exp=self.enemy_exp,
+            enemy_gold=self.enemy_gold,
+            scout_rate=self.scout_rate,
+            growth_rate=dict(self.growth_rate)
+        )
+
+
+_NOT_FAILED = object() # _failed_mtime の初期値 (どの mtime とも、ファイルがない場合の None とも一致しない)
+
+class MonsterCatalog:
+    """
+    monster_stats.json を一度だけ読み込み、種族ごとのテンプレートとプロトタイプを保持するクラス。
+    ファイルの更新時刻(mtime)が変わった場合のみ再読み込みする（mtime の確認は check_interval 秒に一度）。
+    """
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, data_path=None, check_interval=RELOAD_CHECK_INTERVAL):
+        """
+        :param data_path: monster_stats.json のパス（省略時はプロジェクトの data ディレクトリ）
+        :param check_interval: mtime を確認する最短間隔 (秒)。0 なら refresh のたびに確認する
+        """
+        if data_path is None:
+            base_path = os.path.dirname(os.path.abspath(__file__))
+            data_path = os.path.join(base_path, 'data', 'monster_stats.json')
+        self.data_path = data_path
+        self._lock = threading.Lock()
+        self._mtime = None # 最後に読み込みに成功したときの mtime
+        self._failed_mtime = _NOT_FAILED # 最後に再読み込みに失敗したときの mtime (同じファイルを何度も読み直さないため)
+        self._loaded = False # 一度でも読み込みに成功したか (成功した後は失敗しても終了しない)
+        self.check_interval = check_interval
+        self._next_check = 0.0 # 次に mtime を確認してよい時刻 (time.monotonic)
+        self.generation = 0 # 読み込みに成功するたびに増える (プロトタイプから作った物のキャッシュの破棄に使う)
+        self._templates = {}
+        self._prototypes = {}
+
+    @classmethod
+    def shared(cls):
+        """
+        プロセス全体で共有されるカタログを返す（初回呼び出し時に作成）
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    def _read_mtime(self):
+        try:
+            return os.stat(self.data_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def refresh(self):
+        """
+        ファイルの mtime が前回の読み込み時から変わっていれば再読み込みする
+        読み込み済みの場合、前回の確認から check_interval 秒経つまではファイルを見ない
+        """
+        now = time.monotonic()
+        if self._loaded and now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        mtime = self._read_mtime()
+        if self._is_current(mtime):
+            return
+        with self._lock:
+            if self._is_current(mtime):
+                return
+            self._load(mtime)
+
+    def _is_current(self, mtime):
+        # 読み込み済みで、ファイルが前回の読み込み (または失敗した再読み込み) から変わっていない
+        # ファイルが一時的にない場合 (エディタの保存でのリネームなど) は mtime が None になり、失敗として扱う
+        return self._loaded and (mtime == self._mtime or mtime == self._failed_mtime)
+
+    def _load(self, mtime):
+        try:
+            with open(self.data_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError(f"Error: JSONファイル {self.data_path} のトップレベルが辞書形式ではありません。")
+            templates = {name: MonsterTemplate.from_dict(name, entry) for name, entry in data.items()}
+        except (FileNotFoundError, json.JSONDecodeError, ValueError) as e:
+            if self._loaded:
+                # 稼働中の再読み込みに失敗した場合は、直前の正常なデータを使い続ける (ファイルが直れば次の refresh で読み込む)
+                print(f"Warning: {self.data_path} の再読み込みに失敗しました。以前のデータを使用します。詳細: {e}")
+                self._failed_mtime = mtime
+                return
+            if isinstance(e, FileNotFoundError):
+                print(f"Error: JSONファイル {self.data_path} が見つかりません。")
+            elif isinstance(e, json.JSONDecodeError):
+                print(f"Error: JSONファイル {self.data_path} のフォーマットが不正です。")
+            else:
+                print(e)
+            sys.exit(1)
+
+        self._templates = templates
+        self._prototypes = {}
+        self._mtime = mtime
+        self._failed_mtime = _NOT_FAILED
+        self._loaded = True
+        self.generation += 1
+
+    def names(self):
+        """
+        登録されている種族名のリストを返す
+        """
+        self.refresh()
+        return list(self._templates)
+
+    def get_template(self, name):
+        """
+        種族名に対応する MonsterTemplate を返す
+        """
+        self.refresh()
+        template = self._templates.get(name)
+        if template is None:
+            raise ValueError(f"Error: {name} のデータがJSONファイルに見つかりません。")
+        return template
+
+    def spawn(self, name, rng=None):
+        """
+        種族のプロトタイプを複製して新しいMonsterを作成する
+        :param rng: 作成したモンスターに持たせる乱数列 (省略時はグローバルな random モジュール)
+        """
+        self.refresh()
+        prototype = self._prototypes.get(name)
+        if prototype is None:
+            prototype = self._prototypes.setdefault(name, self.get_template(name).build())
+        monster = prototype.clone()
+        if rng is not None:
+            monster.rng = rng
+        return monster
@@ -0,0 +1,265 @@
+# MonsterPool.py
+# 牧場・倉庫や集団シミュレーション用に、大量のモンスターを NumPy の列 (struct-of-arrays) で保持するモジュール
+# 個々の Monster オブジェクトは、バトルに出すときなど必要になったときだけ materialize() で作成する
+
+import numpy as np
+
+from Monster import Monster
+from MonsterCatalog import GROWTH_KEYS, STAT_KEYS, MonsterCatalog
+
+STAT_INDEX = {stat: column for column, stat in enumerate(STAT_KEYS)} # ステータス名 -> stats の列番号
+# 行ごとの列: (属性名, dtype, 1行あたりの形)
+COLUMNS = (
+    ('species', np.int32, ()),
+    ('level', np.int32, ()),
+    ('experience', np.float64, ()), # Monster と同じく、次のレベルの必要経験値を引いた残り
+    ('skill_points', np.int32, ()),
+    ('current_hp', np.int64, ()),
+    ('current_mp', np.int64, ()),
+    ('alive', bool, ()),
+    ('stats', np.int64, (len(STAT_KEYS),)), # ベースステータス (STAT_KEYS の順)
+)
+MIN_CAPACITY = 16
+
+def _reserve(buffer, length, needed):
+    # buffer の行数が needed 未満なら、倍々に広げた新しい配列に先頭の length 行を写して返す (追加は償却 O(1))
+    capacity = buffer.shape[0]
+    if needed <= capacity:
+        return buffer
+    grown = np.empty((max(needed, capacity * 2, MIN_CAPACITY),) + buffer.shape[1:], dtype=buffer.dtype)
+    grown[:length] = buffer[:length]
+    return grown
+
+class MonsterPool:
+    def __init__(self, catalog=None, seed=None):
+        """
+        モンスターの集団を列ごとの配列で保持するクラス。1体 = 1行で、行番号でモンスターを指定する。
+        保持するのはレベル・経験値・スキルポイント・現在HP/MP・生存フラグ・ベースステータスのみで、
+        習得スキルやバフなどの戦闘中の状態は持たない (必要な場合は materialize() で Monster にする)。
+        成長率は種族ごとの表 (種族数 x 7) に持ち、行の種族番号で引く。
+        :param catalog: 種族データの取得元 (省略時は共有カタログ)
+        :param seed: レベルアップの成長量に使う乱数のシード
+        """
+        self.catalog = catalog if catalog is not None else MonsterCatalog.shared()
+        self.rng = np.random.default_rng(seed)
+        self.species_names = [] # 種族番号 -> 種族名
+        self._species_index = {} # 種族名 -> 種族番号
+        self._growth_buffer = np.empty((0, len(GROWTH_KEYS)), dtype=np.float64)
+        self._growth = self._growth_buffer # 種族番号 -> 成長率 (STAT_KEYS の順)
+
+        # 各列は余裕を持って確保した配列 (_buffers) に持ち、self.level などは先頭 _length 行のビューとして公開する
+        # (ビューへの書き込みはそのまま配列に反映される。add() で配列を広げたときはビューを作り直す)
+        self._length = 0
+        self._buffers = {name: np.empty((0,) + shape, dtype=dtype) for name, dtype, shape in COLUMNS}
+        self._expose()
+
+    @classmethod
+    def from_species(cls, names, catalog=None, seed=None):
+        """
+        種族名の列からレベル1のモンスターの集団を作成する
+        :param names: 種族名のリスト、または {種族名: 体数} の辞書
+        """
+        pool = cls(catalog, seed)
+        pool.add(names)
+        return pool
+
+    def __len__(self):
+        return self._length
+
+    def _expose(self):
+        length = self._length
+        for name, buffer in self._buffers.items():
+            setattr(self, name, buffer[:length])
+
+    def _species_id(self, name):
+        species_id = self._species_index.get(name)
+        if species_id is None:
+            template = self.catalog.get_template(name)
+            growth = dict(template.growth_rate)
+            species_id = len(self.species_names)
+            self._growth_buffer = _reserve(self._growth_buffer, species_id, species_id + 1)
+            self._growth_buffer[species_id] = [growth[key] for key in GROWTH_KEYS]
+            self.species_names.append(name)
+            self._species_index[name] = species_id
+            self._growth = self._growth_buffer[:species_id + 1]
+        return species_id
+
+    def add(self, names):
+        """
+        種族のテンプレートどおりのレベル1のモンスターを追加する
+        :param names: 種族名のリスト、または {種族名: 体数} の辞書
+        :return: 追加した行の行番号の配列
+        """
+        if isinstance(names, dict):
+            counts = names
+        else:
+            counts = {}
+            for name in names:
+                counts[name] = counts.get(name, 0) + 1
+
+        start = self._length
+        total = start + sum(counts.values())
+        buffers = self._buffers
+        for name in buffers:
+            buffers[name] = _reserve(buffers[name], start, total)
+
+        # 既存の行は写さず、確保済みの領域に新しい行だけを書き込む
+        end = start
+        for name, count in counts.items():
+            if count <= 0:
+                continue
+            template = self.catalog.get_template(name)
+            rows = slice(end, end + count)
+            stats = [getattr(template, stat) for stat in STAT_KEYS]
+            buffers['species'][rows] = self._species_id(name)
+            buffers['stats'][rows] = stats
+            buffers['current_hp'][rows] = stats[STAT_INDEX['max_hp']]
+            buffers['current_mp'][rows] = stats[STAT_INDEX['max_mp']]
+            end += count
+        rows = slice(start, end)
+        buffers['level'][rows] = 1
+        buffers['experience'][rows] = 0.0
+        buffers['skill_points'][rows] = 0
+        buffers['alive'][rows] = True
+        self._length = end
+        self._expose()
+        return np.arange(start, end)
+
+    def stat(self, name):
+        """
+        ステータス1列分のビュー (例: pool.stat('speed'))
+        """
+        return self.stats[:, STAT_INDEX[name]]
+
+    # --- 絞り込み ---
+    def where(self, alive=None, min_level=None, max_level=None, species=None):
+        """
+        条件に一致する行番号の配列を返す (省略した条件は判定しない)
+        :param alive: True なら生存中、False なら戦闘不能のみ
+        :param species: 種族名
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if alive is not None:
+            mask &= self.alive == alive
+        if min_level is not None:
+            mask &= self.level >= min_level
+        if max_level is not None:
+            mask &= self.level <= max_level
+        if species is not None:
+            species_id = self._species_index.get(species)
+            if species_id is None:
+                return np.empty(0, dtype=np.intp)
+            mask &= self.species == species_id
+        return np.flatnonzero(mask)
+
+    def _rows(self, rows):
+        # 行番号の配列 (重複なし) に変換する。省略時は全行
+        if rows is None:
+            return np.arange(len(self))
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            return np.flatnonzero(rows)
+        return rows
+
+    # --- 一括操作 ---
+    def next_level_exp(self, rows=None):
+        """
+        次のレベルに上がるために必要な経験値 (Monster.get_next_level_exp と同じ式)
+        """
+        rows = self._rows(rows)
+        return Monster.need_experience * Monster.experience_ratio ** (self.level[rows] - 1.0)
+
+    def gain_experience(self, exp, rows=None):
+        """
+        経験値を一括で加算し、必要経験値に達した行をレベルアップさせる
+        :param exp: 加算する経験値 (スカラーまたは rows と同じ長さの配列)
+        :param rows: 対象の行番号 (重複なし) またはブールマスク、省略時は全行
+        :return: rows の各行が上がったレベル数
+        """
+        rows = self._rows(rows)
+        self.experience[rows] += exp
+        gained = np.zeros(rows.shape[0], dtype=np.int32)
+        positions = np.arange(rows.shape[0])
+        # 1回の繰り返しで、まだ必要経験値に達している行だけを1レベル上げる
+        while positions.shape[0]:
+            active = rows[positions]
+            need = self.next_level_exp(active)
+            ready = self.experience[active] >= need
+            positions = positions[ready]
+            if not positions.shape[0]:
+                break
+            active = rows[positions]
+            self.experience[active] -= need[ready]
+            self._level_up_rows(active)
+            gained[positions] += 1
+        return gained
+
+    def level_up(self, rows=None, levels=1):
+        """
+        経験値に関係なく、指定した行を levels レベル上げる
+        """
+        rows = self._rows(rows)
+        for _ in range(levels):
+            self._level_up_rows(rows)
+
+    def _level_up_rows(self, rows):
+        # Monster.level_up と同じく、各ステータスを int(ベース値 * 成長率 + 1〜3の乱数) にする
+        rolls = self.rng.integers(1, 4, size=(rows.shape[0], len(STAT_KEYS)))
+        stats = (self.stats[rows] * self._growth[self.species[rows]] + rolls).astype(np.int64)
+        self.stats[rows] = stats
+        self.level[rows] += 1
+        self.current_hp[rows] = stats[:, STAT_INDEX['max_hp']]
+        self.current_mp[rows] = stats[:, STAT_INDEX['max_mp']]
+        self.skill_points[rows] += Monster.SKILL_POINTS_PER_LEVEL
+
+    def heal(self, rows=None):
+        """
+        HP・MPを全回復し、戦闘不能から復帰させる
+        """
+        rows = self._rows(rows)
+        self.current_hp[rows] = self.stats[rows, STAT_INDEX['max_hp']]
+        self.current_mp[rows] = self.stats[rows, STAT_INDEX['max_mp']]
+        self.alive[rows] = True
+
+    # --- Monster との変換 ---
+    def materialize(self, row, rng=None):
+        """
+        指定した行から通常の Monster を作成する (バトルに出すときなど)
+        :param rng: 作成したモンスターに持たせる乱数列
+        """
+        monster = self.catalog.spawn(self.species_names[self.species[row]], rng)
+        for column, stat in enumerate(STAT_KEYS):
+            monster.set_base_stat(stat, int(self.stats[row, column]))
+        monster.level = int(self.level[row])
+        experience = float(self.experience[row])
+        monster.experience = int(experience) if experience.is_integer() else experience
+        monster.skill_points = int(self.skill_points[row])
+        monster.current_hp = int(self.current_hp[row])
+        monster.current_mp = int(self.current_mp[row])
+        monster.is_alive = bool(self.alive[row])
+        return monster
+
+    def store(self, row, monster):
+        """
+        materialize() したモンスターの状態 (バトル後のHPや成長) を行に書き戻す
+        行が持てない状態 (習得スキル・継続効果・ステータス補正) があるモンスターは、黙って捨てずにエラーにする
+        (バトル後のモンスターは Monster.clear_status_effects() で継続効果を解除してから格納する)
+        """
+        if monster.name != self.species_names[self.species[row]]:
+            raise ValueError(f"Error: {row} 行目の種族と異なるモンスターは格納できません。（{monster.name}）")
+        if monster.skills:
+            raise ValueError(f"Error: スキルを習得したモンスターは MonsterPool に格納できません。（{monster.name}）")
+        try:
+            effects = len(object.__getattribute__(monster, 'status_effects'))
+        except AttributeError:
+            effects = 0
+        if effects or monster._modifiers:
+            raise ValueError(f"Error: 継続効果やステータス補正が残っているモンスターは MonsterPool に格納できません。（{monster.name}）")
+        for column, stat in enumerate(STAT_KEYS):
+            self.stats[row, column] = getattr(monster, f'base_{stat}')
+        self.level[row] = monster.level
+        self.experience[row] = monster.experience
+        self.skill_points[row] = monster.skill_points
+        self.current_hp[row] = monster.current_hp
+        self.current_mp[row] = monster.current_mp
+        self.alive[row] = monster.is_alive
@@ -0,0 +1,167 @@
+# PhaseProfiler.py
+# Battle / Monster の処理 (フェーズ) ごとの経過時間と呼び出し回数を集計するモジュール
+#
+# enable() で対象のメソッドをクラスごと計測用の関数に置き換え、disable() で元に戻す。
+# 無効の間はクラスに元の関数がそのまま入っているため、計測のための処理は一切実行されない。
+
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+# 計測するフェーズ: (モジュール名, クラス名, メソッド名のタプル)
+DEFAULT_TARGETS = (
+    ('Battle', 'Battle', (
+        '__init__', 'process_attack', 'process_skill_use', 'process_guard', 'process_scout', 'process_escape',
+        'process_switch', 'process_enemy_turn', 'process_turn_end_effects', 'apply_skill_effect',
+        'after_damage_dealt', '_apply_passive_start_of_battle_effects', '_process_passive_after_action',
+        'check_battle_status',
+    )),
+    ('Monster', 'Monster', (
+        'gain_experience', 'level_up', 'learn_skill', 'apply_passive_effect', 'process_turn_end_effects',
+        'apply_ailment', 'apply_stat_effect',
+    )),
+    ('BattleLog', 'BattleLog', ('extend', 'render_tail')),
+)
+
+@dataclass(frozen=True)
+class PhaseStats:
+    label: str          # 'Battle.process_attack' のようなフェーズ名
+    calls: int
+    total: float        # 経過時間の合計 (秒、内側のフェーズを含む)
+    self_time: float    # 内側で計測された別のフェーズを除いた経過時間 (秒)
+    max: float          # 1回あたりの最大の経過時間 (秒)
+
+    @property
+    def mean(self):
+        return self.total / self.calls if self.calls else 0.0
+
+class PhaseProfiler:
+    def __init__(self, targets=DEFAULT_TARGETS):
+        """
+        フェーズごとの経過時間を集計するクラス (既定では無効)
+        集計はプロセス全体で1つ (Streamlit の複数のセッションの呼び出しも合算される)
+        :param targets: enable() で計測する (モジュール名, クラス名, メソッド名のタプル) の列
+        """
+        self.targets = targets
+        self.enabled = False
+        self._originals = {} # (クラス, メソッド名) -> 元の関数
+        self._totals = {} # フェーズ名 -> [呼び出し回数, 合計, 自身の時間, 最大]
+        self._lock = threading.Lock() # 集計の更新と enable/disable を1スレッドずつにする
+        self._local = threading.local() # スレッドごとの、計測中のフェーズの内側の時間のスタック
+
+    # --- 有効化・無効化 ---
+    def enable(self):
+        """
+        対象のメソッドを計測用の関数に置き換える (有効な場合は何もしない)
+        """
+        with self._lock:
+            if self.enabled:
+                return
+            for module_name, class_name, methods in self.targets:
+                cls = getattr(importlib.import_module(module_name), class_name)
+                for name in methods:
+                    func = cls.__dict__.get(name)
+                    if not callable(func):
+                        raise ValueError(f"Error: {class_name}.{name} は計測できるメソッドではありません。")
+                    self._originals[(cls, name)] = func
+                    setattr(cls, name, self._wrap(f"{class_name}.{name}", func))
+            self.enabled = True
+
+    def disable(self):
+        """
+        置き換えたメソッドを元に戻す (集計結果は残る)
+        """
+        with self._lock:
+            for (cls, name), func in self._originals.items():
+                setattr(cls, name, func)
+            self._originals = {}
+            self.enabled = False
+
+    def _wrap(self, label, func):
+        perf_counter = time.perf_counter
+        local = self._local
+        record = self._record
+
+        def timed(*args, **kwargs):
+            frames = local.__dict__.setdefault('frames', [])
+            frames.append(0.0)
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                inner = frames.pop()
+                if frames:
+                    frames[-1] += elapsed
+                record(label, elapsed, elapsed - inner)
+
+        timed.__name__ = func.__name__
+        timed.__qualname__ = func.__qualname__
+        timed.__doc__ = func.__doc__
+        timed.__wrapped__ = func
+        return timed
+
+    def _record(self, label, elapsed, self_time):
+        with self._lock:
+            entry = self._totals.get(label)
+            if entry is None:
+                entry = self._totals[label] = [0, 0.0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] += self_time
+            if elapsed > entry[3]:
+                entry[3] = elapsed
+
+    @contextmanager
+    def measure(self, label):
+        """
+        with ブロック内の処理を label のフェーズとして計測する (無効の場合は何もしない)
+        app.py の再描画1回分など、メソッド以外の区間の計測に使う
+        """
+        if not self.enabled:
+            yield
+            return
+        frames = self._local.__dict__.setdefault('frames', [])
+        frames.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            inner = frames.pop()
+            if frames:
+                frames[-1] += elapsed
+            self._record(label, elapsed, elapsed - inner)
+
+    # --- 集計結果 ---
+    def stats(self):
+        """
+        フェーズごとの集計結果を、自身の時間の長い順に返す
+        :return: PhaseStats のリスト
+        """
+        with self._lock:
+            items = [PhaseStats(label, *entry) for label, entry in self._totals.items()]
+        return sorted(items, key=lambda item: item.self_time, reverse=True)
+
+    def reset(self):
+        """
+        集計結果を捨てる (有効・無効の状態は変えない)
+        """
+        with self._lock:
+            self._totals = {}
+
+    def report(self, file=None):
+        """
+        集計結果を表形式で出力する
+        """
+        file = file or sys.stderr
+        print(f"--- phase report ({'enabled' if self.enabled else 'disabled'}) ---", file=file)
+        print(f"{'calls':>8} {'total ms':>10} {'self ms':>10} {'mean us':>10} {'max ms':>9}  phase", file=file)
+        for item in self.stats():
+            print(f"{item.calls:>8} {item.total * 1000:10.2f} {item.self_time * 1000:10.2f} "
+                  f"{item.mean * 1e6:10.1f} {item.max * 1000:9.2f}  {item.label}", file=file)
+
+phase_profiler = PhaseProfiler()
@@ -12,4 +12,12 @@ class Player:
         self.monsters.append(monster)
 
     def gain_gold(self, amount):
-        self.gold += amount
\ No newline at end of file
+        self.gold += amount
+
+    def distribute_rewards(self, exp, gold):
+        """
+        バトルの報酬 (経験値・ゴールド) をパーティ全体にまとめて分配する
+        :return: モンスターごとの (モンスター, 獲得前のレベル, 上がったレベル数) のリスト
+        """
+        self.gain_gold(gold)
+        return [(monster, monster.level, monster.gain_experience(exp)) for monster in self.monsters]
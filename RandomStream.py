@@ -0,0 +1,80 @@
+# RandomStream.py
+
+import hashlib
+import os
+import random
+
+def derive_seed(seed, stream_id):
+    """
+    (seed, stream_id) から独立した乱数列用の128bitシードを導出する
+    stream_id の要素は int か str を想定 (repr が実行環境に依存しないこと)
+    """
+    material = repr((seed, tuple(stream_id))).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(material, digest_size=16).digest(), 'big')
+
+class RandomStream:
+    def __init__(self, seed=None, stream_id=()):
+        """
+        Battle や Monster に渡す乱数列クラス。(seed, stream_id) が同じなら、どのプロセスでも同じ乱数列になる。
+        random モジュールと同じ名前のメソッド (random / randint / uniform / choice) を持つため、
+        グローバルな random モジュールの代わりにそのまま使える。
+        :param seed: 基準となるシード (省略時は OS の乱数から決める)
+        :param stream_id: 乱数列の識別子 (int または int/str のタプル)
+        """
+        if seed is None:
+            seed = int.from_bytes(os.urandom(8), 'big')
+        if isinstance(stream_id, (int, str)):
+            stream_id = (stream_id,)
+        self.seed = seed
+        self.stream_id = tuple(stream_id)
+        self._generator = random.Random(derive_seed(seed, self.stream_id))
+        self._spawned = 0
+        # random() は C 実装のメソッドを直接呼ぶ (属性参照1回 + 呼び出し1回)
+        self.random = self._generator.random
+
+    def __repr__(self):
+        return f"RandomStream(seed={self.seed!r}, stream_id={self.stream_id!r})"
+
+    # --- 派生する乱数 ---
+    # random モジュールの randint / choice は内部で getrandbits を繰り返すため遅い。
+    # ここでは random() 1回から作るため、呼び出しあたりのコストが小さく、状態も random() の位置だけで決まる。
+    def randint(self, a, b):
+        return a + int(self.random() * (b - a + 1))
+
+    def uniform(self, a, b):
+        return a + (b - a) * self.random()
+
+    def choice(self, seq):
+        if not seq:
+            raise IndexError("Cannot choose from an empty sequence")
+        return seq[int(self.random() * len(seq))]
+
+    # --- 子の乱数列 ---
+    def spawn(self):
+        """
+        呼び出し順に番号を振った、独立した子の乱数列を返す
+        """
+        child = RandomStream(self.seed, self.stream_id + (self._spawned,))
+        self._spawned += 1
+        return child
+
+    def substream(self, key):
+        """
+        key で識別される独立した子の乱数列を返す (呼び出し順に依存しない)
+        """
+        return RandomStream(self.seed, self.stream_id + (key,))
+
+    # --- 状態の保存と復元 ---
+    def getstate(self):
+        return (self._generator.getstate(), self._spawned)
+
+    def setstate(self, state):
+        generator_state, self._spawned = state
+        self._generator.setstate(generator_state)
+
+    def __getstate__(self):
+        return {'seed': self.seed, 'stream_id': self.stream_id, 'state': self.getstate()}
+
+    def __setstate__(self, data):
+        self.__init__(data['seed'], data['stream_id'])
+        self.setstate(data['state'])
@@ -0,0 +1,160 @@
+# RuleSet.py
+
+import json
+import math
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+# battle_config.json に記述がない場合の既定値（従来のハードコード値と同じ結果になる）
+DEFAULT_CONFIG = {
+    "DAMAGE_REDUCTION_DEFENSE_RATE": 0.5,
+    "DEFEND_DAMAGE_MULTIPLIER": 0.5,
+    "BASE_ESCAPE_CHANCE": 0.5,
+    "LEVEL_ESCAPE_WEIGHT": 0.5,
+    "SPEED_ESCAPE_WEIGHT": 0.5,
+    "SCOUT_HP_BONUS_WEIGHT": 1.5,
+    "CONFUSION_SELF_HIT_CHANCE": 0.5,
+    "CONFUSION_SELF_DAMAGE_DIVISOR": 3,
+}
+# データファイルの mtime を確認する最短間隔 (秒)。Battle の作成や spawn のたびに os.stat しないため (MonsterCatalog も使用する)
+RELOAD_CHECK_INTERVAL = 1.0
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    """
+    battle_config.json から一度だけ組み立てられる、バトル計算式の不変セット。
+    各計算式は設定値を束縛済みの関数として保持し、全てのBattleで共有される。
+    """
+    config: dict = field(compare=False)
+    damage: Callable = field(compare=False)             # damage(attack, defense) -> 通常攻撃のダメージ
+    guard_damage: Callable = field(compare=False)       # guard_damage(damage) -> ぼうぎょ中の被ダメージ
+    escape_chance: Callable = field(compare=False)      # escape_chance(runner, enemy) -> 逃走成功率
+    scout_chance: Callable = field(compare=False)       # scout_chance(enemy) -> スカウト成功率
+    confusion_damage: Callable = field(compare=False)   # confusion_damage(attack) -> 混乱時の自傷ダメージ
+    confusion_self_hit_chance: float = 0.5
+
+    _shared = None
+    _shared_mtime = None
+    _next_check = 0.0 # 次に mtime を確認してよい時刻 (time.monotonic)
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        設定辞書を検証し、計算式を組み立てたRuleSetを返す
+        :param config: battle_config.json の内容
+        """
+        merged = dict(DEFAULT_CONFIG)
+        merged.update(config)
+        for key in DEFAULT_CONFIG:
+            value = merged[key]
+            if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+                raise ValueError(f"Error: 設定値 {key} が不正です。（値: {value!r}）")
+        if merged["CONFUSION_SELF_DAMAGE_DIVISOR"] <= 0:
+            raise ValueError("Error: 設定値 CONFUSION_SELF_DAMAGE_DIVISOR は正の数である必要があります。")
+
+        defense_rate = merged["DAMAGE_REDUCTION_DEFENSE_RATE"]
+        defend_multiplier = merged["DEFEND_DAMAGE_MULTIPLIER"]
+        base_escape = merged["BASE_ESCAPE_CHANCE"]
+        level_weight = merged["LEVEL_ESCAPE_WEIGHT"]
+        speed_weight = merged["SPEED_ESCAPE_WEIGHT"]
+        scout_hp_weight = merged["SCOUT_HP_BONUS_WEIGHT"]
+        confusion_divisor = merged["CONFUSION_SELF_DAMAGE_DIVISOR"]
+        floor = math.floor
+
+        def damage(attack, defense):
+            # ダメージ = 攻撃力 - 防御力 * 軽減率 (最低1)
+            return max(1, attack - floor(defense * defense_rate))
+
+        def guard_damage(damage):
+            return max(1, floor(damage * defend_multiplier))
+
+        def escape_chance(runner, enemy):
+            # レベル差・すばやさ差を -1〜1 に正規化して基礎逃走率に加算する
+            level_term = (runner.level - enemy.level) / max(1, runner.level + enemy.level)
+            speed_term = (runner.speed - enemy.speed) / max(1, runner.speed + enemy.speed)
+            chance = base_escape + level_weight * level_term + speed_weight * speed_term
+            return min(1.0, max(0.0, chance))
+
+        def scout_chance(enemy):
+            # 敵のHPが低いほど成功率が上がる
+            hp_ratio = (enemy.max_hp - enemy.current_hp) / enemy.max_hp
+            return min(1.0, enemy.scout_rate * (1 + hp_ratio * scout_hp_weight))
+
+        def confusion_damage(attack):
+            return max(1, floor(attack / confusion_divisor))
+
+        return cls(
+            config=merged,
+            damage=damage,
+            guard_damage=guard_damage,
+            escape_chance=escape_chance,
+            scout_chance=scout_chance,
+            confusion_damage=confusion_damage,
+            confusion_self_hit_chance=merged["CONFUSION_SELF_HIT_CHANCE"],
+        )
+
+    def __reduce__(self):
+        # 計算式はクロージャのため pickle できない。別プロセスには設定辞書を送り、そこで組み立て直す
+        return (RuleSet.from_config, (self.config,))
+
+    @staticmethod
+    def config_path():
+        base_path = os.path.dirname(os.path.abspath(__file__))
+        return os.path.join(base_path, 'data', 'battle_config.json')
+
+    @classmethod
+    def load(cls, data_path=None):
+        """
+        battle_config.jsonから設定をロードしてRuleSetを作成する
+        """
+        data_path = data_path or cls.config_path()
+        try:
+            with open(data_path, 'r', encoding='utf-8') as f:
+                return cls.from_config(json.load(f))
+        except FileNotFoundError:
+            print(f"Error: JSONファイル {data_path} が見つかりません。")
+            sys.exit(1)
+        except json.JSONDecodeError:
+            print(f"Error: JSONファイル {data_path} のフォーマットが不正です。")
+            sys.exit(1)
+
+    @classmethod
+    def shared(cls):
+        """
+        全てのBattleで共有されるRuleSetを返す。
+        battle_config.json の mtime が変わっていれば作り直す（ホットリロード）。
+        mtime の確認は RELOAD_CHECK_INTERVAL 秒に一度だけ行う。
+        """
+        now = time.monotonic()
+        if cls._shared is not None and now < cls._next_check:
+            return cls._shared
+        cls._next_check = now + RELOAD_CHECK_INTERVAL
+        data_path = cls.config_path()
+        try:
+            mtime = os.stat(data_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if cls._shared is not None and mtime == cls._shared_mtime:
+            return cls._shared
+
+        with cls._shared_lock:
+            if cls._shared is None or mtime != cls._shared_mtime:
+                if cls._shared is None:
+                    rules = cls.load(data_path)
+                else:
+                    # 稼働中の再読み込みに失敗した場合は、直前の正常なルールを使い続ける
+                    try:
+                        with open(data_path, 'r', encoding='utf-8') as f:
+                            rules = cls.from_config(json.load(f))
+                    except (OSError, ValueError) as e:
+                        print(f"Warning: {data_path} の再読み込みに失敗しました。以前の設定を使用します。詳細: {e}")
+                        rules = cls._shared
+                cls._shared = rules
+                cls._shared_mtime = mtime
+        return cls._shared
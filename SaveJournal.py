@@ -0,0 +1,404 @@
+# SaveJournal.py
+# Player (所持金・アイテム・モンスター) をバージョン付きのバイナリ形式で保存するモジュール
+#
+# ファイルはヘッダーと、追記されていくレコードの列からなる。
+#   ヘッダー: b'MRSV' + 形式のバージョン (u16)
+#   レコード: 種類 (u8) + ペイロードの長さ (u32) + ペイロードの CRC32 (u32) + ペイロード
+# SNAPSHOT は Player 全体、DELTA は直前の状態から変わった部分 (所持金・アイテム・変わったモンスターだけ) を持つ。
+# 保存のたびに DELTA を追記し、DELTA が compact_every 件たまったら SNAPSHOT 1件のファイルに書き直す。
+#
+# スキルやスキルツリーは種族ごとに共有されるため保存せず、モンスターごとの習得ビットだけを保存する。
+# 読み込み時は種族のプロトタイプから複製し、習得ビットからスキルとパッシブ効果を付け直す。
+#
+# 同じファイルへの保存は SaveJournal.shared(path) が返す1つのインスタンスにまとめる
+# (インスタンスごとに保存済みの状態を持つため、別々のインスタンスから追記するとファイルが壊れる)。
+
+import os
+import struct
+import threading
+import zlib
+
+from Player import Player
+
+MAGIC = b'MRSV'
+FORMAT_VERSION = 1
+DEFAULT_COMPACT_EVERY = 32 # この件数の DELTA がたまったら書き直す
+
+SNAPSHOT = 1
+DELTA = 2
+
+_FILE_HEADER = struct.Struct('<4sH')
+_RECORD_HEADER = struct.Struct('<BII') # 種類, ペイロードの長さ, CRC32
+_U8 = struct.Struct('<B')
+_U16 = struct.Struct('<H')
+_GOLD = struct.Struct('<q')
+_ITEM_COUNT = struct.Struct('<i')
+# レベル, 経験値, スキルポイント, 現在HP, 現在MP, フラグ, ベースステータス7つ, ベース回避率
+_MONSTER = struct.Struct('<HdiiiB7id')
+_INT = struct.Struct('<i')
+_FLOAT = struct.Struct('<d')
+_MASK = struct.Struct('<Q')
+
+BASE_STATS = ('max_hp', 'max_mp', 'physical_attack', 'physical_defense', 'magic_attack', 'magic_defense', 'speed')
+# 個体ごとに上書きされていることがある報酬・スカウト率 (フラグのビット, 名前, 形式)
+OVERRIDES = ((0x02, 'enemy_exp', _INT), (0x04, 'enemy_gold', _INT), (0x08, 'scout_rate', _FLOAT))
+ALIVE = 0x01
+
+# DELTA のフラグ
+PLAYER_CHANGED = 0x01 # 名前・所持金・アイテム
+ROSTER_RESIZED = 0x02 # モンスターの数
+
+# ==================================
+# 1. エンコード・デコード
+# ==================================
+
+def _pack_str(text):
+    data = text.encode('utf-8')
+    if len(data) > 0xFF:
+        raise ValueError(f"Error: 名前が長すぎるため保存できません。（{text!r}）")
+    return _U8.pack(len(data)) + data
+
+def _unpack_str(data, offset):
+    length = data[offset]
+    offset += 1
+    return data[offset:offset + length].decode('utf-8'), offset + length
+
+def encode_monster(monster):
+    """
+    モンスター1体を bytes にする (同じ状態のモンスターは同じ bytes になる)
+    """
+    flags = ALIVE if monster.is_alive else 0
+    overrides = []
+    for bit, name, fmt in OVERRIDES:
+        try:
+            value = object.__getattribute__(monster, name)
+        except AttributeError:
+            continue # 種族の値を使っている
+        flags |= bit
+        overrides.append(fmt.pack(value))
+    masks = [state.mask for state in monster.skill_trees]
+    return b''.join((
+        _pack_str(monster.name),
+        _MONSTER.pack(monster.level, monster.experience, monster.skill_points, monster.current_hp, monster.current_mp,
+                      flags, *(getattr(monster, f'base_{stat}') for stat in BASE_STATS), monster.base_dodge_rate),
+        *overrides,
+        _U8.pack(len(masks)),
+        *(_MASK.pack(mask) for mask in masks),
+    ))
+
+def decode_monster(data, catalog):
+    """
+    encode_monster() の bytes からモンスターを作成する
+    :param catalog: 種族のプロトタイプの取得元 (MonsterCatalog)
+    """
+    name, offset = _unpack_str(data, 0)
+    values = _MONSTER.unpack_from(data, offset)
+    offset += _MONSTER.size
+    monster = catalog.spawn(name)
+    monster.level, monster.skill_points = values[0], values[2]
+    # 経験値は double で保存しているため、整数だったものは int に戻す (MonsterPool.materialize と同じ)
+    experience = values[1]
+    monster.experience = int(experience) if experience.is_integer() else experience
+    flags = values[5]
+    for stat, value in zip(BASE_STATS, values[6:13]):
+        monster.set_base_stat(stat, value)
+    monster.set_base_stat('dodge_rate', values[13])
+    for bit, attr, fmt in OVERRIDES:
+        if flags & bit:
+            setattr(monster, attr, fmt.unpack_from(data, offset)[0])
+            offset += fmt.size
+
+    # 習得ビットからスキルとパッシブ効果を付け直す (SPは消費しない)
+    count = data[offset]
+    offset += 1
+    trees = monster.skill_trees
+    if count != len(trees):
+        raise ValueError(f"Error: {name} のスキルツリーの数が保存時と違います。（保存: {count}, 現在: {len(trees)}）")
+    for state in trees:
+        mask = _MASK.unpack_from(data, offset)[0]
+        offset += _MASK.size
+        state.mask = mask
+        for node in state.nodes.values():
+            if mask & node.bit:
+                monster.add_skill(node.skill)
+                if node.skill.category == 'passive':
+                    monster.apply_passive_effect(node.skill)
+
+    # パッシブ効果を付け直した後の最大値で現在値を設定する
+    monster.current_hp, monster.current_mp = values[3], values[4]
+    monster.is_alive = bool(flags & ALIVE)
+    return monster
+
+def encode_player_header(player):
+    items = player.items
+    parts = [_pack_str(player.name), _GOLD.pack(player.gold), _U16.pack(len(items))]
+    for name, count in items.items():
+        parts.append(_pack_str(name))
+        parts.append(_ITEM_COUNT.pack(count))
+    return b''.join(parts)
+
+def _decode_player_header(data, offset):
+    name, offset = _unpack_str(data, offset)
+    gold = _GOLD.unpack_from(data, offset)[0]
+    offset += _GOLD.size
+    count = _U16.unpack_from(data, offset)[0]
+    offset += _U16.size
+    items = {}
+    for _ in range(count):
+        item, offset = _unpack_str(data, offset)
+        items[item] = _ITEM_COUNT.unpack_from(data, offset)[0]
+        offset += _ITEM_COUNT.size
+    return (name, gold, items), offset
+
+def _pack_blob(blob):
+    return _U16.pack(len(blob)) + blob
+
+def _unpack_blob(data, offset):
+    length = _U16.unpack_from(data, offset)[0]
+    offset += _U16.size
+    return data[offset:offset + length], offset + length
+
+# ==================================
+# 2. ジャーナル
+# ==================================
+
+class SaveJournal:
+    _shared = {} # 絶対パス -> SaveJournal
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path, catalog=None, compact_every=DEFAULT_COMPACT_EVERY):
+        """
+        1つのセーブデータ (ファイル) への保存と読み込みを行うクラス
+        保存済みの状態をモンスターごとの bytes で覚えておき、save() では変わった部分だけを追記する
+        :param path: セーブファイルのパス
+        :param catalog: 読み込み時に使う MonsterCatalog (省略時は共有カタログ)
+        :param compact_every: 書き直すまでに追記する DELTA の件数
+        """
+        self.path = path
+        self._catalog = catalog
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._header = None # 保存済みの Player のヘッダー (bytes)、未保存なら None
+        self._monsters = [] # 保存済みのモンスターごとの bytes
+        self._deltas = 0 # 最後の SNAPSHOT 以降の DELTA の件数
+        self._size = None # 正しく読めたところまでのファイルサイズ (末尾の壊れたレコードは切り捨てる)
+
+    @classmethod
+    def shared(cls, path, catalog=None):
+        """
+        path のセーブファイルを扱う、プロセス全体で共有されるインスタンスを返す (初回呼び出し時に作成)
+        Streamlit の複数のセッションが同じファイルに保存する場合も、追記は1つのインスタンスの中で順番に行われる
+        """
+        key = os.path.abspath(path)
+        with cls._shared_lock:
+            journal = cls._shared.get(key)
+            if journal is None:
+                journal = cls._shared[key] = cls(key, catalog)
+            return journal
+
+    @property
+    def catalog(self):
+        if self._catalog is None:
+            from MonsterCatalog import MonsterCatalog
+            self._catalog = MonsterCatalog.shared()
+        return self._catalog
+
+    # --- 読み込み ---
+    def load(self):
+        """
+        セーブファイルを読み込み、Player を作成する
+        書き込み中に中断された末尾のレコードは無視する (次の保存で切り捨てる)
+        :return: Player (ファイルがない場合は None)
+        """
+        with self._lock:
+            try:
+                with open(self.path, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                self._reset(None)
+                return None
+            header, monsters = self._replay(data)
+            if header is None:
+                return None
+
+            # モンスターを作成するのは最後の状態の分だけ
+            name, gold, items = _decode_player_header(header, 0)[0]
+            player = Player(name)
+            player.gold = gold
+            player.items = items
+            catalog = self.catalog
+            for blob in monsters:
+                player.add_monster(decode_monster(blob, catalog))
+            return player
+
+    def discard(self):
+        """
+        読み込めないセーブファイルを <path>.broken に退避し、次の save() で新しく書き始められるようにする
+        """
+        with self._lock:
+            try:
+                os.replace(self.path, f"{self.path}.broken")
+            except FileNotFoundError:
+                pass
+            self._reset(None)
+
+    def _replay(self, data):
+        if len(data) < _FILE_HEADER.size:
+            raise ValueError(f"Error: セーブファイル {self.path} が壊れています。")
+        magic, version = _FILE_HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Error: {self.path} はセーブファイルではありません。")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"Error: セーブファイル {self.path} の形式 (バージョン {version}) には対応していません。")
+
+        header = None
+        monsters = []
+        deltas = 0
+        offset = _FILE_HEADER.size
+        while offset + _RECORD_HEADER.size <= len(data):
+            kind, length, checksum = _RECORD_HEADER.unpack_from(data, offset)
+            start = offset + _RECORD_HEADER.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                break # 書き込み途中で中断されたレコード
+            if kind == SNAPSHOT:
+                header, position = _decode_player_header(payload, 0)
+                header = payload[:position]
+                count = _U16.unpack_from(payload, position)[0]
+                position += _U16.size
+                monsters = []
+                for _ in range(count):
+                    blob, position = _unpack_blob(payload, position)
+                    monsters.append(blob)
+                deltas = 0
+            elif kind == DELTA:
+                if header is None:
+                    raise ValueError(f"Error: セーブファイル {self.path} の先頭に SNAPSHOT がありません。")
+                header, monsters = self._apply_delta(payload, header, monsters)
+                deltas += 1
+            else:
+                raise ValueError(f"Error: セーブファイル {self.path} に不明なレコード ({kind}) があります。")
+            offset = start + length
+
+        self._header = header
+        self._monsters = monsters
+        self._deltas = deltas
+        self._size = offset
+        return header, monsters
+
+    @staticmethod
+    def _apply_delta(payload, header, monsters):
+        flags = payload[0]
+        position = 1
+        if flags & PLAYER_CHANGED:
+            _, end = _decode_player_header(payload, position)
+            header = payload[position:end]
+            position = end
+        monsters = list(monsters)
+        if flags & ROSTER_RESIZED:
+            count = _U16.unpack_from(payload, position)[0]
+            position += _U16.size
+            del monsters[count:]
+            monsters.extend([b''] * (count - len(monsters)))
+        changed = _U16.unpack_from(payload, position)[0]
+        position += _U16.size
+        for _ in range(changed):
+            slot = _U16.unpack_from(payload, position)[0]
+            position += _U16.size
+            monsters[slot], position = _unpack_blob(payload, position)
+        return header, monsters
+
+    # --- 保存 ---
+    def save(self, player):
+        """
+        Player の現在の状態を保存する
+        初回 (またはファイルがない場合) は SNAPSHOT、それ以降は変わった部分だけの DELTA を追記する
+        :return: 書き込んだバイト数 (変更がなければ0)
+        """
+        header = encode_player_header(player)
+        monsters = [encode_monster(monster) for monster in player.monsters]
+        with self._lock:
+            if self._size is None:
+                # まだ読み込んでいない場合は、既存のファイルの内容を差分の基準にする
+                try:
+                    with open(self.path, 'rb') as f:
+                        self._replay(f.read())
+                except FileNotFoundError:
+                    self._reset(None)
+            if self._header is None:
+                return self._rewrite(header, monsters)
+            if self._deltas >= self.compact_every:
+                return self._rewrite(header, monsters)
+
+            flags = 0
+            parts = []
+            if header != self._header:
+                flags |= PLAYER_CHANGED
+                parts.append(header)
+            if len(monsters) != len(self._monsters):
+                flags |= ROSTER_RESIZED
+                parts.append(_U16.pack(len(monsters)))
+            old = self._monsters
+            changed = [(slot, blob) for slot, blob in enumerate(monsters) if slot >= len(old) or old[slot] != blob]
+            if not flags and not changed:
+                return 0
+            parts.append(_U16.pack(len(changed)))
+            for slot, blob in changed:
+                parts.append(_U16.pack(slot))
+                parts.append(_pack_blob(blob))
+            written = self._append(DELTA, _U8.pack(flags) + b''.join(parts))
+            self._header = header
+            self._monsters = monsters
+            self._deltas += 1
+            return written
+
+    def compact(self, player=None):
+        """
+        ファイルを SNAPSHOT 1件に書き直す (player を省略した場合は保存済みの状態で書き直す)
+        :return: 書き込んだバイト数
+        """
+        with self._lock:
+            if player is not None:
+                return self._rewrite(encode_player_header(player), [encode_monster(monster) for monster in player.monsters])
+            if self._header is None:
+                return 0
+            return self._rewrite(self._header, self._monsters)
+
+    @staticmethod
+    def _record(kind, payload):
+        return _RECORD_HEADER.pack(kind, len(payload), zlib.crc32(payload)) + payload
+
+    def _append(self, kind, payload):
+        record = self._record(kind, payload)
+        with open(self.path, 'r+b') as f:
+            # 中断された書き込みの残りがあれば、正しく読めたところまで切り詰めてから追記する
+            f.truncate(self._size)
+            f.seek(self._size)
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+        self._size += len(record)
+        return len(record)
+
+    def _rewrite(self, header, monsters):
+        # 一時ファイルに書いてから置き換えるため、途中で中断されても元のファイルは壊れない
+        payload = header + _U16.pack(len(monsters)) + b''.join(_pack_blob(blob) for blob in monsters)
+        data = _FILE_HEADER.pack(MAGIC, FORMAT_VERSION) + self._record(SNAPSHOT, payload)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self._reset(len(data))
+        self._header = header
+        self._monsters = monsters
+        return len(data)
+
+    def _reset(self, size):
+        self._header = None
+        self._monsters = []
+        self._deltas = 0
+        self._size = size
@@ -1,24 +1,32 @@
 # Skill.py
 
+from EventBus import EVENTS, SkillLearned, SkillLearnFailed
+from SkillEffects import compile_effect, compile_passive
+
 class Skill:
     def __init__(self, name, description, category, mp_cost=0, sp_cost=0, effect=None):
         """
         個々のスキルを表すクラス
+        スキルは種族ごとに共有される不変の定義であり、習得状態は各モンスターの SkillTreeState が持つ
         :param name: スキル名（例: 'メラ', '攻撃力アップ'）
         :param description: スキルの説明
         :param category: スキルの種類（例: 'attack', 'status_up', 'passive', 'support'）
         :param mp_cost: 消費MP
         :param sp_cost: 習得に必要なスキルポイント
         :param effect: スキルがもたらす効果（辞書形式で定義）
+        アクティブスキルの効果は定義時に検証され、バトルで実行する op の列 (ops) に変換される
+        パッシブスキルのバトル中の効果は、(トリガー, フック) の列 (hooks) に変換される
         """
         self.name = name
         self.description = description
         self.category = category
         self.mp_cost = mp_cost
         self.sp_cost = sp_cost
-        self.effect = effect or {} # 例: {'damage': 10, 'element': 'fire'}, {'status': 'attack', 'amount': 5}
-        self.unlocked = False # 習得済みかどうか
-        
+        self.effect = effect or {} # 例: {'damage_type': 'magic', 'damage_multiplier': 1.2}, {'type': 'buff', 'speed': 10, 'duration': 3}
+        # 不正な効果はバトル中に何も起きないのではなく、スキル定義の読み込み時に ValueError になる
+        self.ops = compile_effect(name, self.effect) if category == 'active' else ()
+        self.hooks = compile_passive(name, self.effect) if category == 'passive' else ()
+
 class SkillNode:
     def __init__(self, skill: Skill, prerequisites=None):
         """
@@ -29,52 +37,118 @@ class SkillNode:
         self.skill = skill
         # デフォルト引数がNoneの場合に、新しいリストを作成する
         self.prerequisites = prerequisites if prerequisites is not None else []
+        self.bit = 0 # SkillTree に登録されたときに割り当てられる習得ビット
+        self.prerequisite_mask = 0 # 前提スキルのビットをまとめたマスク
 
 class SkillTree:
     def __init__(self, name, nodes):
         """
-        スキルツリー全体を管理するクラス
+        スキルツリー全体を表す不変のテンプレートクラス（種族ごとに1つだけ作成され共有される）
+        習得状態は持たず、各モンスターの SkillTreeState のビットセットで管理する
         :param name: ツリー名（例: '炎の極意', '守護者の誓い'）
         :param nodes: ツリー内の全てのSkillNodeのリスト
         """
         self.name = name
         self.nodes = {node.skill.name: node for node in nodes}
-        self.total_points = 0
-        self.unlocked_skills = set()
 
-    def learn_skill(self, skill_name, monster_skill_points):
+        # ノードごとに習得ビットを割り当て、前提条件をビットマスクに変換する
+        for index, node in enumerate(self.nodes.values()):
+            node.bit = 1 << index
+        for node in self.nodes.values():
+            node.prerequisites = tuple(node.prerequisites) # 登録後は前提条件を変更できないようにする
+            mask = 0
+            for prereq in node.prerequisites:
+                mask |= prereq.bit
+            node.prerequisite_mask = mask
+
+    def new_state(self):
+        """
+        このツリーに対する未習得状態の SkillTreeState を作成する
+        """
+        return SkillTreeState(self)
+
+    def learn_skill(self, skill_name, monster_skill_points, state):
         """
         モンスターのスキルポイントが足りているかなどをチェックし、
-        習得成功時に必要なスキルポイントを返します。
+        習得成功時に state の習得ビットを立てて必要なスキルポイントを返します。
         :param skill_name: 習得したいスキルの名前
         :param monster_skill_points: モンスターが持つスキルポイント
+        :param state: 習得状態を保持するモンスター固有の SkillTreeState
         :return: 習得成功時に消費するポイント、失敗時はNone
         """
-        if skill_name not in self.nodes:
-            print(f"Error: {skill_name} はこのツリーに存在しません。")
+        node = self.nodes.get(skill_name)
+        if node is None:
+            if EVENTS.active:
+                EVENTS.publish(SkillLearnFailed(skill_name, 'unknown'))
             return None
 
-        skill_to_unlock = self.nodes[skill_name].skill
-        required_points = skill_to_unlock.sp_cost
+        required_points = node.skill.sp_cost
 
         # 習得済みチェック
-        if skill_to_unlock.unlocked:
-            print(f"Warning: {skill_name} は既に習得済みです。")
+        if state.mask & node.bit:
+            if EVENTS.active:
+                EVENTS.publish(SkillLearnFailed(skill_name, 'learned'))
             return None
 
         # スキルポイントチェック
         if monster_skill_points < required_points:
-            print(f"Error: スキルポイントが{required_points}必要です。（現在: {monster_skill_points}）")
+            if EVENTS.active:
+                EVENTS.publish(SkillLearnFailed(skill_name, 'points', required_points, monster_skill_points))
             return None
 
         # 前提スキルチェック
-        prerequisites_met = all(prereq.skill.unlocked for prereq in self.nodes[skill_name].prerequisites)
-        if not prerequisites_met:
-            print(f"Error: {skill_name} の前提スキルがまだ習得されていません。")
+        if state.mask & node.prerequisite_mask != node.prerequisite_mask:
+            if EVENTS.active:
+                EVENTS.publish(SkillLearnFailed(skill_name, 'prerequisite'))
             return None
 
         # 習得成功
-        self.unlocked_skills.add(skill_name)
-        skill_to_unlock.unlocked = True
-        print(f"Info: {skill_name} を習得しました！")
-        return required_points
\ No newline at end of file
+        state.mask |= node.bit
+        if EVENTS.active:
+            EVENTS.publish(SkillLearned(skill_name))
+        return required_points
+
+class SkillTreeState:
+    __slots__ = ('tree', 'mask')
+
+    def __init__(self, tree, mask=0):
+        """
+        モンスター1体分のスキルツリー習得状態（共有テンプレート + 習得ビットセット）
+        :param tree: 共有される SkillTree テンプレート
+        :param mask: 習得済みスキルのビットセット
+        """
+        self.tree = tree
+        self.mask = mask
+
+    @property
+    def name(self):
+        return self.tree.name
+
+    @property
+    def nodes(self):
+        return self.tree.nodes
+
+    @property
+    def unlocked_skills(self):
+        """
+        習得済みスキル名の集合を返す
+        """
+        return {name for name, node in self.tree.nodes.items() if self.mask & node.bit}
+
+    def is_unlocked(self, skill_name):
+        node = self.tree.nodes.get(skill_name)
+        return node is not None and bool(self.mask & node.bit)
+
+    def learnable_skills(self):
+        """
+        未習得かつ前提スキルを満たしているスキルのリストを返す
+        """
+        mask = self.mask
+        return [node.skill for node in self.tree.nodes.values()
+                if not mask & node.bit and mask & node.prerequisite_mask == node.prerequisite_mask]
+
+    def learn_skill(self, skill_name, monster_skill_points):
+        return self.tree.learn_skill(skill_name, monster_skill_points, self)
+
+    def copy(self):
+        return SkillTreeState(self.tree, self.mask)
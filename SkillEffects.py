@@ -0,0 +1,302 @@
+# SkillEffects.py
+# アクティブスキルの効果辞書を、スキル定義の読み込み時に検証し「操作 (op)」の列に変換するモジュール
+# バトル中は Skill.ops を先頭から順に呼び出すだけで、効果辞書を参照しない
+# パッシブスキルはバトル中の効果を、発動タイミング (トリガー) ごとの「フック」に変換する
+
+from BattleLog import AilmentApplied, Buff, Damage, DamageTotal, Debuff, Heal, NoEffect, PassiveActivated, SelfDamage
+
+STAT_KEYS = ('physical_attack', 'physical_defense', 'magic_attack', 'magic_defense', 'speed', 'dodge_rate')
+DAMAGE_TYPES = {
+    'physical': ('physical_attack', 'physical_defense'),
+    'magic': ('magic_attack', 'magic_defense'),
+}
+EFFECT_TYPES = ('buff', 'debuff', 'ailment')
+AILMENT_TYPES = ('poison', 'burn', 'stun', 'confusion')
+
+# パッシブスキルのフックが呼び出されるタイミング
+ON_BATTLE_START = 'on_battle_start'         # hook(battle, owner, logs): バトル開始時
+AFTER_DAMAGE_DEALT = 'after_damage_dealt'   # hook(battle, owner, logs, damage): 敵にダメージを与えた後
+AFTER_ACTION = 'after_action'               # hook(battle, owner, logs): こうげき・スキル使用の後 (敵が生存している場合)
+
+# 味方全員を強化する効果 ({'buff': 名前, 'amount': 量, 'duration': ターン数}) の名前 -> 上昇するステータス
+ALLY_BUFFS = {'all_attack_up': 'physical_attack'}
+# スキル定義にはあるが、バトルにまだ仕組みがない効果 (味方の肩代わり・命中率の低下・難聴)
+# スキルの内容は変えずに読み込み、使用しても何も起こらない (他に効果がなければバトルログに NoEffect が残る)
+UNSUPPORTED_KEYS = {'protect', 'debuff', 'status_effect'}
+
+# 効果の種類ごとに使用できるキー
+_DAMAGE_KEYS = {'damage_multiplier', 'damage_type', 'hits'}
+_ALLY_BUFF_KEYS = {'buff', 'amount', 'duration'}
+_COMMON_KEYS = {'heal', 'self_damage', 'type'} | _DAMAGE_KEYS | UNSUPPORTED_KEYS
+_TYPE_KEYS = {
+    None: set(),
+    'buff': {'duration'} | set(STAT_KEYS),
+    'debuff': {'duration'} | set(STAT_KEYS),
+    'ailment': {'duration', 'ailment_chance', 'ailment_type', 'ailment_data'},
+}
+
+# ==================================
+# 1. 操作 (op) の定義
+# ==================================
+# 各 op は op(battle, user, target, logs) の形で呼び出され、発生したイベントを logs に追加する
+
+class HealOp:
+    __slots__ = ('amount',)
+
+    def __init__(self, amount):
+        self.amount = amount
+
+    def __call__(self, battle, user, target, logs):
+        user.current_hp = min(user.max_hp, user.current_hp + self.amount)
+        logs.append(Heal(user.name, self.amount))
+
+class DamageOp:
+    __slots__ = ('attack_stat', 'defense_stat', 'multiplier', 'hits')
+
+    def __init__(self, damage_type, multiplier, hits):
+        self.attack_stat, self.defense_stat = DAMAGE_TYPES[damage_type]
+        self.multiplier = multiplier
+        self.hits = hits
+
+    def __call__(self, battle, user, target, logs):
+        hits = self.hits
+        # ダメージ = (モンスター攻撃力 * 倍率) - 敵の防御力 (最低1)
+        # 連続攻撃中に攻撃力・防御力は変化しないため、1ヒット分のダメージは最初に一度だけ計算する
+        raw_damage = int(getattr(user, self.attack_stat) * self.multiplier)
+        damage = max(1, raw_damage - getattr(target, self.defense_stat))
+
+        total_damage_dealt = 0
+        for hit in range(1, hits + 1):
+            target.current_hp = max(0, target.current_hp - damage)
+            logs.append(Damage('', target.name, damage, hit, hits))
+            total_damage_dealt += damage
+            # 連続攻撃で敵が倒れたら中断
+            if target.current_hp <= 0:
+                break
+
+        if hits > 1 and target.current_hp > 0:
+            logs.append(DamageTotal(target.name, total_damage_dealt))
+        battle.after_damage_dealt(user, total_damage_dealt, logs)
+
+class SelfDamageOp:
+    __slots__ = ('amount',)
+
+    def __init__(self, amount):
+        self.amount = amount
+
+    def __call__(self, battle, user, target, logs):
+        user.current_hp -= self.amount
+        logs.append(SelfDamage(user.name, self.amount))
+
+class BuffOp:
+    __slots__ = ('stats', 'duration')
+
+    def __init__(self, stats, duration):
+        self.stats = stats
+        self.duration = duration
+
+    def __call__(self, battle, user, target, logs):
+        user.apply_stat_effect('buff', self.stats, self.duration)
+        logs.append(Buff(user.name))
+
+class AllyBuffOp(BuffOp):
+    __slots__ = ()
+
+    def __call__(self, battle, user, target, logs):
+        # 生存している味方全員 (自身を含む) を強化する (敵が使った場合は自身のみ)
+        allies = battle.player.monsters if user is not battle.enemy else (user,)
+        for ally in allies:
+            if ally.is_alive:
+                ally.apply_stat_effect('buff', self.stats, self.duration)
+                logs.append(Buff(ally.name))
+
+class NoEffectOp:
+    __slots__ = ('skill_name',)
+
+    def __init__(self, skill_name):
+        self.skill_name = skill_name
+
+    def __call__(self, battle, user, target, logs):
+        logs.append(NoEffect(self.skill_name))
+
+class DebuffOp(BuffOp):
+    __slots__ = ()
+
+    def __call__(self, battle, user, target, logs):
+        target.apply_stat_effect('debuff', self.stats, self.duration)
+        logs.append(Debuff(target.name))
+
+class AilmentOp:
+    __slots__ = ('candidates', 'chance', 'duration', 'data')
+
+    def __init__(self, candidates, chance, duration, data):
+        self.candidates = candidates
+        self.chance = chance
+        self.duration = duration
+        self.data = data
+
+    def __call__(self, battle, user, target, logs):
+        target.apply_ailment(self.candidates, self.chance, self.duration, self.data, battle.rng)
+        logs.append(AilmentApplied(target.name))
+
+# ==================================
+# 2. パッシブスキルのフック
+# ==================================
+
+class LifeStealHook:
+    """吸血: 与えたダメージの一部を回復する"""
+    __slots__ = ('ratio',)
+
+    def __init__(self, ratio):
+        self.ratio = ratio
+
+    def __call__(self, battle, owner, logs, damage):
+        life_steal_amount = int(damage * self.ratio)
+        if life_steal_amount > 0:
+            owner.current_hp = min(owner.max_hp, owner.current_hp + life_steal_amount)
+            logs.append(Heal(owner.name, life_steal_amount, 'life_steal'))
+
+class ExtraAttackHook:
+    """連携攻撃・追撃: 確率で物理の追加攻撃を行う"""
+    __slots__ = ('skill_name', 'chance', 'multiplier')
+
+    def __init__(self, skill_name, chance, multiplier):
+        self.skill_name = skill_name
+        self.chance = chance
+        self.multiplier = multiplier
+
+    def __call__(self, battle, owner, logs):
+        if battle.rng.random() >= self.chance:
+            return
+        enemy = battle.enemy
+        logs.append(PassiveActivated(owner.name, self.skill_name))
+        damage = max(1, int(owner.physical_attack * self.multiplier) - enemy.physical_defense)
+        enemy.current_hp = max(0, enemy.current_hp - damage)
+        logs.append(Damage(owner.name, enemy.name, damage))
+
+class AllyBuffHook:
+    """リーダーシップ: バトル開始時に生存している味方全員 (自身を含む) を強化する"""
+    __slots__ = ('skill_name', 'stats', 'duration')
+
+    def __init__(self, skill_name, stats, duration):
+        self.skill_name = skill_name
+        self.stats = stats
+        self.duration = duration
+
+    def __call__(self, battle, owner, logs):
+        logs.append(PassiveActivated(owner.name, self.skill_name))
+        for ally in battle.player.monsters:
+            if ally.is_alive:
+                ally.apply_stat_effect('buff', self.stats, self.duration)
+                logs.append(Buff(ally.name))
+
+# ==================================
+# 3. 効果辞書の検証と変換
+# ==================================
+
+def _number(skill_name, effect, key, minimum=0, integer=False):
+    value = effect[key]
+    kind = int if integer else (int, float)
+    if isinstance(value, bool) or not isinstance(value, kind) or value < minimum:
+        raise ValueError(f"Error: スキル「{skill_name}」の {key} が不正です。（{value!r}）")
+    return value
+
+def _stat_changes(skill_name, effect):
+    stats = tuple((key, _number(skill_name, effect, key, minimum=float('-inf'))) for key in STAT_KEYS if key in effect)
+    if not stats:
+        raise ValueError(f"Error: スキル「{skill_name}」に変化させるステータスがありません。")
+    return stats
+
+def _ailment_candidates(skill_name, effect):
+    candidates = effect.get('ailment_type')
+    names = [candidates] if isinstance(candidates, str) else candidates
+    if not isinstance(names, (list, tuple)) or not names or any(name not in AILMENT_TYPES for name in names):
+        raise ValueError(f"Error: スキル「{skill_name}」の ailment_type が不正です。（{candidates!r}）")
+    # 単一の文字列はそのまま、複数候補はタプルにして rng.choice で選ぶ
+    return candidates if isinstance(candidates, str) else tuple(candidates)
+
+def compile_effect(skill_name, effect):
+    """
+    アクティブスキルの効果辞書を検証し、実行順に並んだ op のタプルに変換する
+    実行順は 回復 → ダメージ → 自傷 → ぼうぎょ → バフ/デバフ/状態異常
+    :param skill_name: エラーメッセージに使うスキル名
+    :param effect: スキルの効果辞書
+    :return: op のタプル
+    """
+    effect_type = effect.get('type')
+    if effect_type is not None and effect_type not in EFFECT_TYPES:
+        raise ValueError(f"Error: スキル「{skill_name}」の type が不正です。（{effect_type!r}）")
+    ally_buff = 'buff' in effect
+    unknown = set(effect) - _COMMON_KEYS - _TYPE_KEYS[effect_type] - (_ALLY_BUFF_KEYS if ally_buff else set())
+    if unknown:
+        raise ValueError(f"Error: スキル「{skill_name}」に未対応の効果があります。（{', '.join(sorted(unknown))}）")
+
+    ops = []
+    if 'heal' in effect:
+        ops.append(HealOp(_number(skill_name, effect, 'heal', integer=True)))
+
+    if 'damage_multiplier' in effect:
+        damage_type = effect.get('damage_type', 'physical') # damage_typeの指定がない場合は物理をデフォルトとする
+        if damage_type not in DAMAGE_TYPES:
+            raise ValueError(f"Error: スキル「{skill_name}」の damage_type が不正です。（{damage_type!r}）")
+        hits = _number(skill_name, effect, 'hits', minimum=1, integer=True) if 'hits' in effect else 1
+        ops.append(DamageOp(damage_type, _number(skill_name, effect, 'damage_multiplier'), hits))
+    elif 'damage_type' in effect or 'hits' in effect:
+        raise ValueError(f"Error: スキル「{skill_name}」に damage_multiplier がありません。")
+
+    if 'self_damage' in effect:
+        ops.append(SelfDamageOp(_number(skill_name, effect, 'self_damage', integer=True)))
+
+    if ally_buff:
+        if effect_type is not None or effect['buff'] not in ALLY_BUFFS:
+            raise ValueError(f"Error: スキル「{skill_name}」の buff が不正です。（{effect['buff']!r}）")
+        duration = _number(skill_name, effect, 'duration', minimum=1, integer=True) if 'duration' in effect else 0
+        if not duration:
+            raise ValueError(f"Error: スキル「{skill_name}」に duration がありません。")
+        amount = _number(skill_name, effect, 'amount', minimum=float('-inf')) if 'amount' in effect else 0
+        ops.append(AllyBuffOp(((ALLY_BUFFS[effect['buff']], amount),), duration))
+
+    if effect_type is not None:
+        duration = _number(skill_name, effect, 'duration', minimum=1, integer=True) if 'duration' in effect else 0
+        if not duration:
+            raise ValueError(f"Error: スキル「{skill_name}」に duration がありません。")
+        if effect_type == 'buff':
+            ops.append(BuffOp(_stat_changes(skill_name, effect), duration))
+        elif effect_type == 'debuff':
+            ops.append(DebuffOp(_stat_changes(skill_name, effect), duration))
+        else:
+            chance = _number(skill_name, effect, 'ailment_chance') if 'ailment_chance' in effect else 1.0
+            data = effect.get('ailment_data', {})
+            if not isinstance(data, dict):
+                raise ValueError(f"Error: スキル「{skill_name}」の ailment_data が不正です。（{data!r}）")
+            ops.append(AilmentOp(_ailment_candidates(skill_name, effect), chance, duration, data))
+
+    if not ops and UNSUPPORTED_KEYS & set(effect):
+        ops.append(NoEffectOp(skill_name))
+
+    if not ops:
+        raise ValueError(f"Error: スキル「{skill_name}」に効果がありません。")
+    return tuple(ops)
+
+def compile_passive(skill_name, effect):
+    """
+    パッシブスキルの効果辞書から、バトル中に発動するフックを作成する
+    常時効果のステータス上昇 (physical_defense など) は習得時に Monster.apply_passive_effect で適用済みのため、フックにはならない
+    :return: (トリガー, フック) のタプル
+    """
+    hooks = []
+    if 'life_steal' in effect:
+        hooks.append((AFTER_DAMAGE_DEALT, LifeStealHook(_number(skill_name, effect, 'life_steal'))))
+
+    # 追加攻撃は発動条件 (trigger) を持つもの (連携攻撃) だけがフックになる
+    # trigger のない 追撃 は従来どおり発動しない (発動させるかはバランス調整として別に決める)
+    if 'extra_attack_chance' in effect and 'trigger' in effect:
+        multiplier = _number(skill_name, effect, 'damage_multiplier') if 'damage_multiplier' in effect else 1.0
+        hooks.append((AFTER_ACTION, ExtraAttackHook(skill_name, _number(skill_name, effect, 'extra_attack_chance'), multiplier)))
+
+    if effect.get('type') == 'buff':
+        duration = _number(skill_name, effect, 'duration', minimum=1, integer=True) if 'duration' in effect else 0
+        if not duration:
+            raise ValueError(f"Error: スキル「{skill_name}」に duration がありません。")
+        hooks.append((ON_BATTLE_START, AllyBuffHook(skill_name, _stat_changes(skill_name, effect), duration)))
+    return tuple(hooks)
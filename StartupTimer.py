@@ -0,0 +1,55 @@
+# StartupTimer.py
+
+import itertools
+import sys
+import time
+from contextlib import contextmanager
+
+PROCESS_START = time.perf_counter() # このモジュールが最初にインポートされた時刻
+_run_numbers = itertools.count(1) # 再実行の通し番号 (プロセス全体・全セッション共通)
+
+class StartupTimer:
+    def __init__(self, enabled=True):
+        """
+        起動処理（インポート・初期化）の所要時間を計測するクラス
+        app.py は再実行されるたびに新しいインスタンスを作り、各処理を measure() で囲む
+        (インスタンスは再実行ごとに別なので、同時に動くセッション同士で記録が混ざらない)
+        :param enabled: False の場合 measure() は何も記録しない
+        """
+        self.enabled = enabled
+        self.run = next(_run_numbers) if enabled else 0
+        self.run_start = time.perf_counter()
+        self.records = [] # [(ラベル, 秒数, ネストの深さ), ...]
+        self._depth = 0
+
+    @contextmanager
+    def measure(self, label):
+        """
+        with ブロック内の処理時間を label として記録する
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        index = len(self.records)
+        self.records.append((label, 0.0, self._depth))
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.records[index] = (label, time.perf_counter() - start, self._depth)
+
+    def report(self, file=None):
+        """
+        計測結果を表形式で出力する
+        """
+        file = file or sys.stderr
+        total = time.perf_counter() - self.run_start
+        print(f"--- startup report (run #{self.run}) ---", file=file)
+        for label, seconds, depth in self.records:
+            print(f"{seconds * 1000:9.2f} ms  {'  ' * depth}{label}", file=file)
+        print(f"{total * 1000:9.2f} ms  total (this run)", file=file)
+        if self.run == 1:
+            since_process = time.perf_counter() - PROCESS_START
+            print(f"{since_process * 1000:9.2f} ms  since first import", file=file)
@@ -0,0 +1,155 @@
+# StatusEffects.py
+# モンスター1体分の継続効果 (バフ・デバフ・状態異常) を管理するモジュール
+# 効果の期限はターン番号ごとのタイマーホイールで管理し、ターン終了時には期限を迎えた効果だけを処理する
+
+from BattleLog import DamageOverTime, Expired, Fainted
+
+# 状態異常のビットフラグ (ailment_mask で「行動できるか」などを O(1) で判定する)
+STUN = 1 << 0
+CONFUSION = 1 << 1
+POISON = 1 << 2
+BURN = 1 << 3
+AILMENT_FLAGS = {'stun': STUN, 'confusion': CONFUSION, 'poison': POISON, 'burn': BURN}
+DOT_MASK = POISON | BURN # 毎ターンダメージを受ける状態異常
+
+class StatusEffects:
+    __slots__ = ('turn', 'ailment_mask', '_effects', '_wheel', '_dot')
+
+    def __init__(self):
+        """
+        継続効果の集合を表すクラス
+        効果は {'type': 'buff' | 'debuff' | 'ailment', 'expires_at': 期限のターン番号, ...} の辞書で保持する。
+        バフ・デバフは 'buff:physical_attack' のような名前で登録され、'stat' に対象のステータス名を持つ。
+        期限が延長された効果はタイマーホイールに古い登録が残るが、期限のターンに expires_at と照合して読み飛ばす。
+        """
+        self.turn = 0 # 処理済みのターン終了の回数
+        self.ailment_mask = 0 # かかっている状態異常のビットの論理和
+        self._effects = {} # 効果名 -> 効果の辞書
+        self._wheel = {} # 期限のターン番号 -> [(効果名, 効果の辞書), ...]
+        self._dot = {} # 継続ダメージを持つ状態異常名 -> 効果の辞書
+
+    # --- 辞書と同じように参照するためのメソッド ---
+    def __contains__(self, key):
+        return key in self._effects
+
+    def __getitem__(self, key):
+        return self._effects[key]
+
+    def __len__(self):
+        return len(self._effects)
+
+    def __iter__(self):
+        return iter(self._effects)
+
+    def items(self):
+        return self._effects.items()
+
+    def remaining(self, key):
+        """
+        効果の残りターン数を返す (効果がなければ0)
+        """
+        effect = self._effects.get(key)
+        return effect['expires_at'] - self.turn if effect is not None else 0
+
+    def has(self, flags):
+        """
+        flags のいずれかの状態異常にかかっているかを返す
+        """
+        return bool(self.ailment_mask & flags)
+
+    # --- 効果の追加・延長 ---
+    def add(self, key, effect, duration):
+        """
+        新しい効果を登録する (同じ名前の効果がある場合は置き換える)
+        :param effect: 'type' を含む効果の辞書 (このオブジェクトが所有する)
+        :param duration: 継続ターン数
+        """
+        self._effects[key] = effect
+        if effect['type'] == 'ailment':
+            flag = AILMENT_FLAGS.get(key, 0)
+            self.ailment_mask |= flag
+            if flag & DOT_MASK:
+                self._dot[key] = effect
+        self._schedule(key, effect, duration)
+
+    def refresh(self, key, duration):
+        """
+        既存の効果の残りターン数を duration に更新する
+        """
+        self._schedule(key, self._effects[key], duration)
+
+    def _schedule(self, key, effect, duration):
+        expires_at = self.turn + duration
+        effect['expires_at'] = expires_at
+        self._wheel.setdefault(expires_at, []).append((key, effect))
+
+    def _remove(self, key):
+        effect = self._effects.pop(key)
+        if effect['type'] == 'ailment':
+            self.ailment_mask &= ~AILMENT_FLAGS.get(key, 0)
+            self._dot.pop(key, None)
+        return effect
+
+    # --- ターン終了時の処理 ---
+    def tick(self, monster):
+        """
+        ターン終了時に継続ダメージをまとめて適用し、期限を迎えた効果を解除する
+        :param monster: この効果を持つモンスター (HPの減少とステータス補正の解除に使う)
+        :return: バトルイベントのリスト, 継続ダメージで戦闘不能になったか
+        """
+        logs = []
+        fainted_by_effect = False # 継続ダメージで戦闘不能になったか
+        self.turn += 1
+
+        # 1. 継続ダメージ (毒・火傷) をまとめて適用する
+        if self._dot:
+            total = 0
+            for ailment, effect in self._dot.items():
+                data = effect['data']
+                if ailment == 'poison':
+                    # 毒ダメージ計算 (最大HPの10%とし、データがあればそれを使う)
+                    damage = max(1, int(monster.max_hp * data.get('damage_percent', 0.1)))
+                else:
+                    # 火傷ダメージ計算 (固定値)
+                    damage = data.get('damage', 5)
+                total += damage
+                logs.append(DamageOverTime(monster.name, ailment, damage))
+            monster.current_hp = max(0, monster.current_hp - total)
+
+            # 継続ダメージで倒れたかチェック
+            if monster.current_hp <= 0:
+                monster.is_alive = False
+                fainted_by_effect = True
+                logs.append(Fainted(monster.name))
+
+        # 2. 期限切れ効果の解除 (このターンに期限を迎える登録だけを調べる)
+        for key, effect in self._wheel.pop(self.turn, ()):
+            # 期限が延長された・置き換えられた効果の古い登録は読み飛ばす
+            if self._effects.get(key) is not effect or effect['expires_at'] != self.turn:
+                continue
+            self._remove(key)
+
+            if effect['type'] == 'ailment':
+                # 継続ダメージで既に倒れている場合は、解除ログは不要
+                if not fainted_by_effect:
+                    logs.append(Expired(monster.name, key, 'ailment'))
+            else:
+                # ステータス補正を取り除く (対象のステータスだけが再計算される)
+                monster.remove_modifier(effect['stat'], key)
+                logs.append(Expired(monster.name, effect['stat'], effect['type']))
+
+        return logs, fainted_by_effect
+
+    def copy(self):
+        """
+        効果の辞書も含めて複製する (タイマーホイールの登録は複製後の辞書を指すように付け替える)
+        """
+        new = StatusEffects()
+        new.turn = self.turn
+        new.ailment_mask = self.ailment_mask
+        new._effects = {key: dict(effect) for key, effect in self._effects.items()}
+        for key, effect in new._effects.items():
+            new._wheel.setdefault(effect['expires_at'], []).append((key, effect))
+            if key in self._dot:
+                new._dot[key] = effect
+        return new
@@ -1,31 +1,112 @@
 # app.py
 
-import streamlit as st
-import random
-# Monster, Battle, Playerは別途インポートされているものと仮定します
-from Monster import Monster 
-from Battle import Battle
-from Player import Player
-
-st.set_page_config(page_title="モンスター育成ゲーム", layout="wide")
-st.title("⚔️ モンスター育成ゲーム 📱")
+import os
+import re
+import secrets
+import sys
+from typing import NamedTuple
+from StartupTimer import StartupTimer
+
+# `streamlit run app.py -- --startup-report` でインポート・初期化ごとの所要時間を出力する
+STARTUP_REPORT = '--startup-report' in sys.argv
+# `streamlit run app.py -- --profile` でサイドバーにフェーズごとの計測パネルを表示する
+PROFILE = '--profile' in sys.argv
+# セーブデータは saves/<スロット名>.sav に保存する (スロットは URL の ?save=<名前>、ない場合はセッションごとに新しく作る)
+SAVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saves')
+# 計測は再実行ごとに別のインスタンスで行う (--startup-report がない場合は何も記録しない)
+startup_timer = StartupTimer(enabled=STARTUP_REPORT)
+
+with startup_timer.measure("import streamlit"):
+    import streamlit as st
+# Monster, Battle は必要になった画面で初めてインポートする (起動時間短縮のため)
+with startup_timer.measure("import Player"):
+    from Player import Player
+    from RandomStream import RandomStream
+    from BattleLog import BattleLog
+    from EventBus import EVENTS, SkillLearnFailed
+    from PhaseProfiler import phase_profiler
+    from SaveJournal import SaveJournal
+
+with startup_timer.measure("page setup"):
+    st.set_page_config(page_title="モンスター育成ゲーム", layout="wide")
+    st.title("⚔️ モンスター育成ゲーム 📱")
 
 # --- 1. 初期化とセッションステートの管理 ---
-if 'player' not in st.session_state:
-    # ゲーム開始時の初期化処理
-    player = Player("主人公")
-
-    player.add_monster(Monster.from_json("スライム"))
-    player.add_monster(Monster.from_json("オオカミ"))
+class GameData(NamedTuple):
+    catalog: object     # MonsterCatalog (種族データとプロトタイプ)
+    encounters: object  # EncounterGenerator (検証済みの出現テーブル)
+
+@st.cache_resource(show_spinner=False)
+def game_data():
+    """
+    変更されないゲームデータを、全セッションで共有する1つのリソースとして用意する (プロセスで一度だけ実行)
+    種族データは MonsterCatalog が monster_stats.json の mtime を見て再読み込みするため、キャッシュの破棄は不要
+    """
+    from MonsterCatalog import MonsterCatalog
+    from EncounterGenerator import EncounterGenerator
+    catalog = MonsterCatalog.shared()
+    catalog.refresh()
+    return GameData(catalog, EncounterGenerator.shared())
+
+def init_session():
+    """
+    ゲーム開始時の初期化処理 (セッションごとに一度だけ実行)
+    """
+    with startup_timer.measure("load game data"):
+        data = game_data()
+
+    # セーブデータがあれば続きから、なければ最初のパーティで始める
+    journal = SaveJournal.shared(os.path.join(SAVE_DIR, f"{save_slot()}.sav"), data.catalog)
+    with startup_timer.measure("load save data"):
+        try:
+            player = journal.load()
+        except (OSError, ValueError) as e:
+            # 壊れたセーブデータは退避して最初から始める (他のセッションは巻き込まない)
+            st.warning(f"セーブデータを読み込めなかったため、最初から始めます。詳細: {e}")
+            journal.discard()
+            player = None
+    if player is None:
+        player = Player("主人公")
+        # 種族のスキルツリーモジュールは、スキル画面などで初めて参照されたときに読み込まれる (全セッションで共有)
+        with startup_timer.measure("create starter party"):
+            player.add_monster(data.catalog.spawn("スライム"))
+            player.add_monster(data.catalog.spawn("オオカミ"))
 
     st.session_state.player = player
+    st.session_state.save_journal = journal
+    st.session_state.rng = RandomStream() # セッションの乱数列 (バトルごとに子の乱数列を派生させる)
     st.session_state.game_state = 'main_menu' # 現在のゲーム状態を保持
     st.session_state.battle = None # バトルオブジェクト
-    st.session_state.battle_log = [] # ログ表示用リスト
+    st.session_state.battle_log = BattleLog() # ログ表示用のリングバッファ (古いイベントは自動的に捨てられる)
 
     st.session_state.battle_state = 'player_turn' # 新しいバトルの詳細状態
     st.session_state.player_action = None # 選択されたコマンド
     st.session_state.turn_message = None # ターン処理後のメッセージ
+    st.session_state.battle_rewards = None # 分配済みのバトル報酬 (再描画で二重に分配しないため)
+
+def save_slot():
+    """
+    URL の ?save=<名前> からセーブデータのスロット名を決める (ファイル名に使えない文字は取り除く)
+    指定がない場合は新しいスロットを作って URL に書き込む (URL を開き直せば続きから遊べる)
+    """
+    slot = re.sub(r'[^0-9A-Za-z_-]', '', st.query_params.get('save', ''))[:32]
+    if not slot:
+        slot = secrets.token_hex(8)
+        st.query_params['save'] = slot
+    return slot
+
+def save_game():
+    """
+    プレイヤーの状態をセーブデータに保存する (前回から変わった部分だけが追記される)
+    """
+    try:
+        st.session_state.save_journal.save(st.session_state.player)
+    except (OSError, ValueError) as e:
+        st.warning(f"セーブデータを保存できませんでした。詳細: {e}")
+
+if 'player' not in st.session_state:
+    with startup_timer.measure("init session"):
+        init_session()
 
 if 'management_state' not in st.session_state:
     st.session_state.management_state = 'menu'
@@ -59,31 +140,23 @@ def main_menu():
 
 # --- 3. バトル準備の関数 (start_battle_loop の前半部分) ---
 def battle_setup():
+    from Battle import Battle
+
     player = st.session_state.player
+    if 'rng' not in st.session_state:
+        st.session_state.rng = RandomStream()
+    # バトルごとに独立した乱数列を使う ((seed, stream_id) からバトルを再現できる)
+    rng = st.session_state.rng.spawn()
     
-    # 敵モンスターの生成とステータス調整ロジックを移植
-    enemy_type = random.choice(["ゴブリン", "コウモリ", "オオカミ"])
-    
-    enemy_monster = Monster.from_json(enemy_type)
-
-    enemy_monster.max_hp = int(enemy_monster.max_hp * random.uniform(0.8, 1.2))
-    enemy_monster.current_hp = enemy_monster.max_hp
-    enemy_monster.max_mp = int(enemy_monster.max_mp * random.uniform(0.8, 1.2))
-    enemy_monster.current_mp = enemy_monster.max_mp
-    enemy_monster.physical_attack = int(enemy_monster.physical_attack * random.uniform(0.8, 1.2))
-    enemy_monster.physical_defense = int(enemy_monster.physical_defense * random.uniform(0.8, 1.2))
-    enemy_monster.magic_attack = int(enemy_monster.magic_attack * random.uniform(0.8, 1.2))
-    enemy_monster.magic_defense = int(enemy_monster.magic_defense * random.uniform(0.8, 1.2))
-    enemy_monster.speed = int(enemy_monster.speed * random.uniform(0.8, 1.2))
-    enemy_monster.level = random.randint(1, 3)  # 敵のレベルを1から3の間でランダムに設定
-    enemy_monster.enemy_exp = int(enemy_monster.enemy_exp * (1 + enemy_monster.level * 0.1))
-    enemy_monster.enemy_gold = int(enemy_monster.enemy_gold * (1 + enemy_monster.level * 0.1))
-    enemy_monster.scout_rate = enemy_monster.scout_rate * (1 - enemy_monster.level * 0.05)
+    # 敵モンスターもバトルの乱数列から生成する (共有のプールは使わない。敵も含めてバトルを再現できる)
+    enemy_monster = game_data().encounters.generate_one(rng.substream('enemy'))
 
     # バトルオブジェクトをセッションに保存し、バトル開始状態へ移行
-    st.session_state.battle = Battle(player, enemy_monster)
+    st.session_state.battle = Battle(player, enemy_monster, rng=rng.substream('battle'))
     st.session_state.game_state = 'in_battle'
-    st.session_state.battle_log = [f"野生の{enemy_monster.name}が現れた！"]
+    st.session_state.battle_log = BattleLog()
+    st.session_state.battle_log.append(f"野生の{enemy_monster.name}が現れた！")
+    st.session_state.battle_log.extend(st.session_state.battle.opening_logs)
     st.rerun()
 
 # --- 4. モンスター管理メニューの関数 (Placeholder) ---
@@ -164,6 +237,14 @@ def management_menu():
         learn_skill_gui(st.session_state.selected_monster)
 
 # --- 5. バトルループの関数 (最も複雑な部分) ---
+# コマンド選択中の画面は、ステータス・コマンド・ログの3つのフラグメントに分けて描画する。
+# コマンドはボタンのコールバックで処理し、バトルが続く間はこの3つのフラグメントだけを再実行する
+# (タイトルやサイドバーなど、スクリプト全体は再実行しない)。
+PANEL_STATES = ('player_turn', 'skill_selection', 'switching_monster', 'forced_switching')
+BATTLE_FRAGMENTS = ['battle_status', 'battle_commands', 'battle_log']
+LOG_COUNT_CHOICES = (10, 30) # バトルログの表示件数の選択肢 (これに BattleLog が保持する上限の件数が加わる)
+LATENCY_TARGET_MS = 50 # 1回の操作 (コールバック + フラグメントの再実行) のサーバー側の処理時間の目標
+
 def battle_loop():
     if st.session_state.game_state != 'in_battle':
         return
@@ -174,109 +255,141 @@ def battle_loop():
     
     battle = st.session_state.battle
     
-    # 敗北判定などでメインメニューに戻る前に処理を終了
-    if st.session_state.game_state != 'in_battle':
-        return
-    
-    # --- 1. ステータス表示エリア (常に最上位に固定) ---
     st.header("💥 バトル中 💥")
-    
-    # 敵のステータス表示 (HPバーのみ、数値非表示)
-    st.subheader(f"敵: {battle.enemy.name}")
-    enemy_hp_ratio = battle.enemy.current_hp / battle.enemy.max_hp
-    # 具体的な数値は表示せず、名前とバーのみ
-    st.progress(max(0.0, enemy_hp_ratio), text="HP") 
-    
-    # プレイヤーのステータス表示 (HP, MP数値あり)
-    st.subheader(f"プレイヤー: {battle.current_monster.name}")
-    player_hp_ratio = battle.current_monster.current_hp / battle.current_monster.max_hp
-    st.progress(max(0.0, player_hp_ratio), text=f"HP: {battle.current_monster.current_hp}/{battle.current_monster.max_hp}")
-    st.caption(f"MP: {battle.current_monster.current_mp}/{battle.current_monster.max_mp}")
-    
-    st.markdown("---")
-    
-    # --- 2. ターンの進行処理 (状態に応じてロジックを実行) ---
-    
+
     # バトル終了チェック
     if st.session_state.battle_state in ['win', 'lose', 'escape']:
         battle_end_screen()
         return
 
-    # プレイヤーのターン
-    if st.session_state.battle_state == 'player_turn':
-        # コマンド選択エリアをログの上に配置する
-        player_turn_gui(battle)
-        
-        # ログ表示エリアをコマンドの下に配置する
-        st.markdown("---")
+    if st.session_state.battle_state == 'scout_success':
+        scout_success_screen(battle)
+        return
+
+    # --- 1. ステータス表示エリア (常に最上位に固定) ---
+    status_panel()
+    st.markdown("---")
+
+    # --- 2. コマンド選択エリアをログの上に配置する ---
+    command_panel()
+
+    # --- 3. ログ表示エリア ---
+    st.markdown("---")
+    log_panel()
+
+@st.fragment(key='battle_status')
+def status_panel():
+    with phase_profiler.measure("app.fragment: battle_status"):
+        battle = st.session_state.battle
+        # 敵のステータス表示 (HPバーのみ、数値非表示)
+        st.subheader(f"敵: {battle.enemy.name}")
+        enemy_hp_ratio = battle.enemy.current_hp / battle.enemy.max_hp
+        # 具体的な数値は表示せず、名前とバーのみ
+        st.progress(max(0.0, enemy_hp_ratio), text="HP")
+
+        # プレイヤーのステータス表示 (HP, MP数値あり)
+        current = battle.current_monster
+        st.subheader(f"プレイヤー: {current.name}")
+        st.progress(max(0.0, current.current_hp / current.max_hp), text=f"HP: {current.current_hp}/{current.max_hp}")
+        st.caption(f"MP: {current.current_mp}/{current.max_mp}")
+
+@st.fragment(key='battle_commands')
+def command_panel():
+    with phase_profiler.measure("app.fragment: battle_commands"):
+        battle = st.session_state.battle
+        battle_state = st.session_state.battle_state
+        if battle_state == 'player_turn':
+            player_turn_gui(battle)
+        elif battle_state == 'skill_selection':
+            skill_selection_gui(battle)
+        elif battle_state == 'switching_monster':
+            # 任意交代画面 (コマンド選択時)
+            switch_monster_gui(battle, is_forced=False)
+        elif battle_state == 'forced_switching':
+            # 🔄 強制交代画面 (必ず交代させる)
+            switch_monster_gui(battle, is_forced=True)
+
+@st.fragment(key='battle_log')
+def log_panel():
+    with phase_profiler.measure("app.fragment: battle_log"):
         st.subheader("📝 バトルログ")
-        for log in st.session_state.battle_log[-10:]:
+        battle_log = st.session_state.battle_log
+        # 表示件数の変更はこのフラグメントだけを再実行する (選択肢はログが保持している件数まで)
+        choices = tuple(count for count in LOG_COUNT_CHOICES if count < battle_log.maxlen) + (battle_log.maxlen,)
+        count = st.radio("表示件数", choices, horizontal=True, key='battle_log_count')
+        for log in battle_log.render_tail(count): # 表示する分だけ文章に変換する
             st.code(log)
-        st.markdown("---")
-    
-    # 敵のターン実行
-    elif st.session_state.battle_state == 'enemy_turn':
-        # 1. 敵の行動を実行
-        logs, result = battle.process_enemy_turn()
-        st.session_state.battle_log.extend(logs)
-        
-        # 敵の行動後に勝敗をチェックし、バトル終了なら再描画
-        if result is not None:
-            st.session_state.battle_state = result
-            st.rerun() # 勝利/敗北/強制交代画面へ
-            return
 
-        # ---------------------------------------------
-        # 2. ターン終了時の継続効果を処理 (🔥 ここを追加 🔥)
-        # ---------------------------------------------
-        # 継続ダメージ、バフ・デバフのカウントダウンなどを処理
-        effect_logs, effect_result = battle.process_turn_end_effects() 
-        st.session_state.battle_log.extend(effect_logs)
-        
-        # 継続ダメージ等で勝敗が決した場合をチェック
-        if effect_result is not None:
-            st.session_state.battle_state = effect_result
-            st.rerun() # 勝利/敗北/強制交代画面へ
-            return
+def set_battle_state(state):
+    """
+    battle_state を変更して再描画する (ボタンのコールバックから呼ぶ)
+    コマンド選択中の画面どうしの切り替えはバトルのフラグメントだけ、それ以外はスクリプト全体を再実行する
+    """
+    st.session_state.battle_state = state
+    if state in PANEL_STATES:
+        st.rerun(BATTLE_FRAGMENTS)
+    st.rerun()
+
+def resolve_turn(battle, result):
+    """
+    プレイヤーの行動の結果 result を受け取り、バトルが続いていれば敵のターンとターン終了時の効果を続けて処理する
+    :return: 次の battle_state
+    """
+    battle_log = st.session_state.battle_log
+    # 敵の行動後に勝敗をチェックする
+    if result is None:
+        logs, result = battle.process_enemy_turn()
+        battle_log.extend(logs)
+    # 継続ダメージ、バフ・デバフのカウントダウンなどを処理
+    if result is None:
+        logs, result = battle.process_turn_end_effects()
+        battle_log.extend(logs)
 
-        # 3. 問題なければ次のプレイヤーのターンへ
-        st.session_state.battle_state = 'player_turn'
-            
-        # 処理が実行され、ログが更新されたので画面を更新
-        st.rerun()
-        
     # モンスター入れ替えが必要な場合
-    elif st.session_state.battle_state == 'switch_needed':
-        
+    if result == 'switch_needed':
         # 交代可能なモンスターがいるかチェック (自分以外の生存モンスター)
         alive_others = [m for m in battle.player.monsters if m.is_alive and m != battle.current_monster]
-        
-        if len(alive_others) > 0:
-            # 強制交代画面へ遷移
-            st.warning(f"⚠️ {battle.current_monster.name}は戦闘不能になりました！次のモンスターを選択してください。")
-            st.session_state.battle_state = 'forced_switching' 
+        if not alive_others:
+            return 'lose' # 交代可能なモンスターがいない場合は敗北
+        battle_log.append(f"⚠️ {battle.current_monster.name}は戦闘不能になりました！次のモンスターを選択してください。")
+        return 'forced_switching'
+    return result or 'player_turn'
+
+def take_action(kind, arg=None):
+    """
+    コマンドボタンのコールバック。行動を実行し、ターンの残り (敵の行動・ターン終了時の効果) まで処理する
+    :param kind: 'attack' / 'skill' (arg はスキルの番号) / 'guard' / 'scout' / 'switch' (arg はモンスターの番号) / 'escape'
+    """
+    battle = st.session_state.battle
+    battle_log = st.session_state.battle_log
+    with phase_profiler.measure(f"app.action: {kind}"):
+        if kind == 'attack':
+            logs, result = battle.process_attack()
+        elif kind == 'skill':
+            logs, result = battle.process_skill_use(battle.current_monster.get_active_skills()[arg])
+        elif kind == 'guard':
+            logs, result = battle.process_guard(), None
+        elif kind == 'scout':
+            logs, result = battle.process_scout()
+        elif kind == 'switch':
+            # 交代はターン消費アクションであり、敵のターンへ移行
+            logs, result = battle.process_switch(battle.player.monsters[arg]), None
+        elif kind == 'escape':
+            logs, result = battle.process_escape()
         else:
-            # 交代可能なモンスターがいない場合は敗北
-            st.session_state.battle_state = 'lose'
-            
-        st.rerun() # 状態変更後に再描画
-        
-    # 🔄 強制交代画面
-    elif st.session_state.battle_state == 'forced_switching':
-        # 強制交代UIを表示し、必ず交代させる
-        switch_monster_gui(battle, is_forced=True)
-
-    elif st.session_state.battle_state == 'skill_selection':
-        skill_selection_gui(battle)
-
-    elif st.session_state.battle_state == 'scout_success':
-        scout_success_screen(battle)
-        return
-        
-    # 任意交代画面 (コマンド選択時)
-    elif st.session_state.battle_state == 'switching_monster':
-        switch_monster_gui(battle, is_forced=False)
-
+            raise ValueError(f"Error: 不明な行動です。（{kind!r}）")
+        battle_log.extend(logs)
+        # 勝敗が決した場合 (スカウト成功・逃走を含む) は敵のターンに進まない
+        state = result if result not in (None, 'switch_needed') else resolve_turn(battle, result)
+    set_battle_state(state)
+
+def open_menu(state, message=None):
+    """
+    スキル選択・入れ替え画面との行き来 (ターンを消費しない) のコールバック
+    """
+    if message:
+        st.session_state.battle_log.append(message)
+    set_battle_state(state)
 
 # --- 3. プレイヤーコマンド選択UI (新しいヘルパー関数) ---
 
@@ -285,74 +398,43 @@ def player_turn_gui(battle):
     col1, col2, col3, col4, col5, col6 = st.columns(6)
     
     # 1. こうげき
-    if col1.button("1. こうげき"):
-        logs, result = battle.process_attack()
-        st.session_state.battle_log.extend(logs)
-        
-        if result: # 勝敗が決した場合
-            st.session_state.battle_state = result
-        else:
-            st.session_state.battle_state = 'enemy_turn' # 次は敵のターン
-        st.rerun()
+    col1.button("1. こうげき", on_click=take_action, args=('attack',))
     
-    # 2. スキル
-    battle_monster = battle.current_monster
-    active_skills = battle_monster.get_active_skills()
-    
-    # 覚えているスキルがない場合はボタンを無効化
-    if col2.button("2. スキル", disabled=not active_skills):
-        if active_skills:
-            st.session_state.battle_state = 'skill_selection'
-        else:
-            st.session_state.battle_log.append("💡 習得しているアクティブスキルがありません。")
-            
-        st.rerun()
+    # 2. スキル (覚えているスキルがない場合はボタンを無効化)
+    active_skills = battle.current_monster.get_active_skills()
+    col2.button("2. スキル", disabled=not active_skills, on_click=open_menu, args=('skill_selection',))
     
     # 3. ぼうぎょ
-    if col3.button("3. ぼうぎょ"):
-        logs = battle.process_guard()
-        st.session_state.battle_log.extend(logs)
-        st.session_state.battle_state = 'enemy_turn'
-        st.rerun()
+    col3.button("3. ぼうぎょ", on_click=take_action, args=('guard',))
 
-    # 4. スカウト (TODO: 確率判定を伴うため次ステップ)
-    if col4.button("4. スカウト"):
-        logs, result = battle.process_scout()
-        st.session_state.battle_log.extend(logs)
-        
-        if result == "scout_success":
-            # 成功した場合、スカウト成功状態へ遷移
-            st.session_state.battle_state = 'scout_success'
-        else:
-            # 失敗した場合、敵のターンへ移行
-            st.session_state.battle_state = 'enemy_turn'
-            
-        st.rerun()
+    # 4. スカウト (成功した場合はスカウト成功画面、失敗した場合は敵のターンへ)
+    col4.button("4. スカウト", on_click=take_action, args=('scout',))
         
-    # 5. いれかえ (TODO: 選択肢を伴うため次ステップ)
-    alive_others = [m for m in battle.player.monsters if m.is_alive and m != battle.current_monster]
-    can_switch = len(alive_others) > 0
-    
-    if col5.button("5. いれかえ", disabled=not can_switch):
-        if can_switch:
-            # 交代可能なモンスターがいる場合、状態を遷移させる
-            st.session_state.battle_state = 'switching_monster'
-        else:
-            st.session_state.battle_log.append("⚠️ 入れ替えられるモンスターがいません。")
-            
-        st.rerun()
+    # 5. いれかえ (交代可能なモンスターがいる場合のみ)
+    can_switch = any(m.is_alive and m != battle.current_monster for m in battle.player.monsters)
+    col5.button("5. いれかえ", disabled=not can_switch, on_click=open_menu, args=('switching_monster',))
         
     # 6. にげる
-    if col6.button("6. にげる"):
-        logs, result = battle.process_escape()
-        st.session_state.battle_log.extend(logs)
-        if result == "escape":
-            st.session_state.battle_state = 'escape'
-        else:
-            st.session_state.battle_state = 'enemy_turn'
-        st.rerun()
-        
-        
+    col6.button("6. にげる", on_click=take_action, args=('escape',))
+
+    # 💡 アドバイス (モンテカルロ木探索で次の行動を提案する)
+    if st.button("💡 アドバイス", key="advice_btn"):
+        from Advisor import MCTSAdvisor # 探索モジュールは初めて使うときに読み込む
+        st.session_state.advice = (advice_key(battle), MCTSAdvisor.shared().advise(battle))
+    advice = st.session_state.get('advice')
+    # 提案後に局面が変わっていれば表示しない
+    if advice is not None and advice[0] == advice_key(battle):
+        best = advice[1].best
+        st.info(f"💡 おすすめ: **{best.label}** (勝率 {best.win_probability:.0%} / スカウト成功率 {best.scout_probability:.0%}、{advice[1].iterations}回探索)")
+
+def advice_key(battle):
+    """
+    アドバイスを求めた局面を識別するキー (戦闘中のモンスターと全モンスターのHP・MP)
+    """
+    monsters = battle.player.monsters
+    return (id(battle), monsters.index(battle.current_monster),
+            tuple((m.current_hp, m.current_mp) for m in monsters), battle.enemy.current_hp, battle.enemy.current_mp)
+
 def battle_end_screen():
     result = st.session_state.battle_state
     battle = st.session_state.battle # Battleオブジェクトを取得
@@ -362,29 +444,26 @@ def battle_end_screen():
         st.success("🎉 勝利！")
         
         # --- 2. 経験値、ゴールド獲得処理 ---
-        
+        # 報酬の分配はバトルごとに一度だけ行い、再描画時は保存した結果を表示する
         gained_exp = battle.enemy.enemy_exp
         gained_gold = battle.enemy.enemy_gold
-        
-        # ゴールド獲得 (Player.pyのメソッドを使用)
-        st.session_state.player.gain_gold(gained_gold) # Player.pyで処理
+        rewards = st.session_state.get('battle_rewards')
+        first_settlement = rewards is None
+        if first_settlement:
+            rewards = st.session_state.player.distribute_rewards(gained_exp, gained_gold) # Player.pyで処理
+            st.session_state.battle_rewards = rewards
+
         st.info(f"💰 **{gained_gold}G** を獲得しました！ (所持金: {st.session_state.player.gold}G)")
         
         st.markdown("---")
         st.subheader("経験値とレベルアップ")
         
-        # 経験値獲得とレベルアップ処理 (全モンスターを対象に)
-        for monster in st.session_state.player.monsters:
-            # 獲得前のレベルを記録
-            old_level = monster.level
-            
-            # 経験値獲得 (Monster.pyのgain_experienceがレベルアップを自動処理)
-            monster.gain_experience(gained_exp)
-            
+        for monster, old_level, levels in rewards:
             # レベルアップしたかチェック
-            if monster.level > old_level:
-                st.balloons() # レベルアップ時にバルーンを出す
-                st.success(f"🎉 **{monster.name}** は **Lv.{old_level}** から **Lv.{monster.level}** にレベルアップしました！")
+            if levels:
+                if first_settlement:
+                    st.balloons() # レベルアップ時にバルーンを出す
+                st.success(f"🎉 **{monster.name}** は **Lv.{old_level}** から **Lv.{old_level + levels}** にレベルアップしました！")
             else:
                 st.write(f"✨ **{monster.name}** は **{gained_exp}** の経験値を獲得しました！ (残り: {monster.experience}/{monster.get_next_level_exp()})")
         
@@ -399,12 +478,15 @@ def battle_end_screen():
     
     # --- 3. メインメニューに戻るボタン (状態リセットはボタン内へ) ---
     if st.button("メインメニューに戻る", key="battle_end_back_btn"):
-        # バトルオブジェクトと状態のリセットをボタン内で行う
+        # バトルオブジェクトと状態のリセットをボタン内で行う (継続効果はバトルの外に持ち越さない)
+        st.session_state.battle.clear_battle_effects()
         st.session_state.battle = None 
         st.session_state.battle_state = 'player_turn' # 次のバトル用に初期値に戻す
+        st.session_state.battle_rewards = None
         
         st.session_state.game_state = 'main_menu'
-        st.session_state.battle_log = []
+        st.session_state.battle_log.clear()
+        save_game()
         st.rerun()
 
 def view_status_gui(monster):
@@ -468,9 +550,8 @@ def learn_skill_gui(monster):
             st.markdown("---")
             st.caption(f"🌳 **{selected_tree.name} ツリー**")
             
-            # 習得可能スキルを取得
-            learnable_skills = [node.skill for node in selected_tree.nodes.values() 
-                                if not node.skill.unlocked and all(prereq.skill.unlocked for prereq in selected_tree.nodes[node.skill.name].prerequisites)]
+            # 習得可能スキルを取得 (習得状態はモンスターごとのビットセットで判定)
+            learnable_skills = selected_tree.learnable_skills()
 
             if not learnable_skills:
                 st.warning("習得できるスキルがありません。")
@@ -490,25 +571,22 @@ def learn_skill_gui(monster):
                     
                     if st.button(f"✨ {selected_skill.name} を習得する", key="learn_skill_button", disabled=not can_learn):
                         
-                        # SkillTree.learn_skill() の呼び出し
-                        points_spent = selected_tree.learn_skill(selected_skill.name, monster.skill_points)
+                        # Monster.learn_skill() がSP消費・スキル追加・パッシブ効果の適用まで行う
+                        # 失敗した場合の理由は EventBus の通知から受け取る
+                        with EVENTS.capture(SkillLearnFailed) as failures:
+                            stat_messages = monster.learn_skill(selected_skill.name)
                         
-                        if points_spent is not None:
-                            monster.skill_points -= points_spent
+                        if stat_messages is not None:
+                            if stat_messages:
+                                st.info(f"**{monster.name}** のステータスが上昇しました: {', '.join(stat_messages)}")
                             
-                            # パッシブスキルの効果を適用し、スキルリストに追加
-                            monster.skills.append(selected_skill) 
-                            if selected_skill.category == 'passive':
-                                stat_messages = monster.apply_passive_effect(selected_skill)
-
-                                if stat_messages:
-                                    st.info(f"**{monster.name}** のステータスが上昇しました: {', '.join(stat_messages)}")
-                            
-                            st.success(f"🎉 **{selected_skill.name}** を習得しました！スキルポイントを {points_spent} 消費しました。")
+                            st.success(f"🎉 **{selected_skill.name}** を習得しました！スキルポイントを {selected_skill.sp_cost} 消費しました。")
                             st.session_state.player = st.session_state.player # 状態更新を確実に
+                            save_game()
                             st.rerun()
                         else:
-                            st.error("習得できませんでした。SPまたは前提スキルが不足しています。")
+                            reasons = [event.render() for event in failures.drain()]
+                            st.error(f"習得できませんでした。{' '.join(reasons) or 'SPまたは前提スキルが不足しています。'}")
                     
                     if not can_learn:
                         st.error("スキルポイントが不足しています。")
@@ -546,37 +624,27 @@ def switch_monster_gui(battle, is_forced=False):
             st.rerun()
             return
     
-    # モンスター選択
-    selected_display = st.selectbox(
+    # モンスター選択 (選択の変更はコマンドのフラグメントだけを再実行する)
+    selected_index = st.selectbox(
         "控えモンスターを選択",
-        monster_options,
+        range(len(monster_options)),
+        format_func=monster_options.__getitem__,
         # キーを動的にすることで強制/任意でウィジェットがリセットされるのを防ぐ
         key=f"switch_select_{'forced' if is_forced else 'normal'}"
     )
 
     # 戻るボタンの処理 (強制交代ではない場合のみ)
-    if not is_forced and selected_display == "↩️ コマンド選択に戻る":
-        if st.button("キャンセルしてコマンド選択に戻る"):
-            st.session_state.battle_state = 'player_turn'
-            st.session_state.battle_log.append("入れ替えをキャンセルしました。")
-            st.rerun()
-        return
-        
-    # 交代確定ボタンの処理
-    
-    # 選択されたモンスターオブジェクトを特定
-    selected_name = selected_display.split(' (')[0]
-    new_monster = next((m for m in switchable_monsters if m.name == selected_name), None)
-    
-    if new_monster and st.button(f"🔥 {new_monster.name}と交代！", key="confirm_switch_btn"):
-        
-        # Battle.py のメソッドを呼び出し、交代処理を実行
-        logs = battle.process_switch(new_monster)
-        st.session_state.battle_log.extend(logs)
+    if not is_forced:
+        if selected_index == 0:
+            st.button("キャンセルしてコマンド選択に戻る", on_click=open_menu,
+                      args=('player_turn', "入れ替えをキャンセルしました。"))
+            return
+        selected_index -= 1
         
-        # 交代はターン消費アクションであり、敵のターンへ移行
-        st.session_state.battle_state = 'enemy_turn'
-        st.rerun()
+    # 交代確定ボタンの処理 (Battle.py のメソッドを呼び出し、交代処理を実行)
+    new_monster = switchable_monsters[selected_index]
+    st.button(f"🔥 {new_monster.name}と交代！", key="confirm_switch_btn",
+              on_click=take_action, args=('switch', player.monsters.index(new_monster)))
         
     if is_forced:
         st.error("⚠️ 戦闘不能のため、交代をキャンセルすることはできません。必ずモンスターを選択してください。")
@@ -602,12 +670,14 @@ def scout_success_screen(battle):
     
     # バトル終了処理
     if st.button("メインメニューに戻る", key="scout_end_back_btn"):
-        # 🔥 バトルオブジェクトと状態のリセットをボタン内で行う
+        # 🔥 バトルオブジェクトと状態のリセットをボタン内で行う (仲間にした敵の継続効果も解除する)
+        st.session_state.battle.clear_battle_effects()
         st.session_state.battle = None 
         st.session_state.battle_state = 'player_turn' # 次のバトル用に初期値に戻す
         
         st.session_state.game_state = 'main_menu'
-        st.session_state.battle_log = []
+        st.session_state.battle_log.clear()
+        save_game()
         st.rerun()
 
 def skill_selection_gui(battle):
@@ -632,16 +702,8 @@ def skill_selection_gui(battle):
             button_label = f"✨ {skill.name}"
             
             if is_available:
-                if col1.button(button_label, key=f"skill_use_{i}"):
-                    # スキル使用処理を実行
-                    logs, result = battle.process_skill_use(skill)
-                    st.session_state.battle_log.extend(logs)
-                    
-                    if result: # 勝敗が決した場合
-                        st.session_state.battle_state = result
-                    else:
-                        st.session_state.battle_state = 'enemy_turn' # 敵のターンへ
-                    st.rerun()
+                # スキル使用処理を実行 (勝敗が決しなければ敵のターンへ)
+                col1.button(button_label, key=f"skill_use_{i}", on_click=take_action, args=('skill', i))
             else:
                 # MP不足などで使用不可の場合
                 col1.button(button_label, disabled=True, key=f"skill_disabled_{i}", help="MPが足りません")
@@ -654,19 +716,76 @@ def skill_selection_gui(battle):
     st.markdown("---")
     
     # 2. 戻るボタン
-    if st.button("↩️ コマンド選択に戻る", key="skill_back_btn"):
-        st.session_state.battle_state = 'player_turn'
-        st.session_state.battle_log.append("スキル選択をキャンセルしました。")
-        st.rerun()
+    st.button("↩️ コマンド選択に戻る", key="skill_back_btn", on_click=open_menu,
+              args=('player_turn', "スキル選択をキャンセルしました。"))
 
 # --- 6. メインロジック（状態遷移）---
 # この部分が、元の main() 関数の while ループの役割を果たします。
-if st.session_state.game_state == 'main_menu':
-    main_menu()
-elif st.session_state.game_state == 'battle_setup':
-    battle_setup()
-elif st.session_state.game_state == 'in_battle':
-    battle_loop()
-elif st.session_state.game_state == 'management_menu':
-    management_menu()
-# ... (他の状態を追加)
\ No newline at end of file
+def render_current_state():
+    if st.session_state.game_state == 'main_menu':
+        main_menu()
+    elif st.session_state.game_state == 'battle_setup':
+        battle_setup()
+    elif st.session_state.game_state == 'in_battle':
+        battle_loop()
+    elif st.session_state.game_state == 'management_menu':
+        management_menu()
+    # ... (他の状態を追加)
+
+# --- 7. デバッグ用の計測パネル (--profile 指定時のみ) ---
+def toggle_profiler():
+    """
+    フェーズ計測の有効・無効を切り替える (ボタンのコールバック、全セッションに影響する)
+    """
+    if phase_profiler.enabled:
+        phase_profiler.disable()
+    else:
+        phase_profiler.enable()
+
+def profiler_panel():
+    """
+    Battle / Monster のフェーズごとの経過時間と呼び出し回数をサイドバーに表示する
+    表示されるのは前回までの再描画の集計 (この再描画の分はパネルの表示後に記録される)
+    """
+    with st.sidebar.expander("⏱️ フェーズ計測", expanded=True):
+        # 計測の有効・無効はプロセス全体の状態 (Battle / Monster のクラスを置き換える) なので、
+        # セッションごとの値は持たず、ボタンで現在の状態を切り替える (他のセッションの表示にも反映される)
+        st.caption(f"計測: {'有効' if phase_profiler.enabled else '無効'} (全セッション共通)")
+        st.button("計測を無効にする" if phase_profiler.enabled else "計測を有効にする", on_click=toggle_profiler)
+        if st.button("集計をリセット"):
+            phase_profiler.reset()
+        stats = phase_profiler.stats()
+        if not stats:
+            st.caption("まだ記録がありません。")
+            return
+        # 1回の操作あたりの処理時間 (コールバック・フラグメント・再描画) と目標の比較
+        interactions = [item for item in stats if item.label.startswith('app.')]
+        if interactions:
+            st.caption(f"操作ごとの処理時間 (目標 {LATENCY_TARGET_MS} ms 以内)")
+            st.dataframe([{
+                '区間': item.label,
+                '平均 ms': round(item.mean * 1000, 2),
+                '最大 ms': round(item.max * 1000, 2),
+                '目標': '✅' if item.max * 1000 <= LATENCY_TARGET_MS else '⚠️',
+            } for item in sorted(interactions, key=lambda item: item.label)], hide_index=True)
+        st.dataframe([{
+            'フェーズ': item.label,
+            '回数': item.calls,
+            '合計 ms': round(item.total * 1000, 2),
+            '自身 ms': round(item.self_time * 1000, 2),
+            '平均 µs': round(item.mean * 1e6, 1),
+            '最大 ms': round(item.max * 1000, 2),
+        } for item in stats], hide_index=True)
+
+if PROFILE:
+    profiler_panel()
+
+# st.rerun() / st.stop() は例外で処理を抜けるため、レポートは finally で出力する
+# 再描画全体もフェーズとして計測する (計測が無効なら何もしない)
+try:
+    with (startup_timer.measure(f"render: {st.session_state.game_state}"),
+          phase_profiler.measure(f"app.rerun: {st.session_state.game_state}")):
+        render_current_state()
+finally:
+    if STARTUP_REPORT:
+        startup_timer.report()
\ No newline at end of file
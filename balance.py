@@ -0,0 +1,355 @@
+# balance.py
+# monster_stats.json の数値 (ベースステータス・growth_rate・enemy_exp・scout_rate) を、
+# 目標の指標 (同レベルでの勝率・スカウトにかかるターン数) に近づくように探索するモジュール
+#
+# 使い方: python balance.py --win-rate 0.45 0.55 --scout-turns 4 --generations 200 --workers 4
+#
+# 候補の評価は MarkovSolver による厳密計算で行うため、モンテカルロ法のような誤差がない。
+# 1つの候補は直前の最良案から数個の値だけを変えたものなので、変更のない種族どうしの組み合わせは
+# 各ワーカープロセスの MarkovSolver のキャッシュからそのまま取り出される。
+
+import argparse
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import combinations
+
+from MarkovSolver import MarkovSolver
+from MonsterCatalog import GROWTH_KEYS, REWARD_KEYS, STAT_KEYS, MonsterCatalog, MonsterTemplate
+from RandomStream import RandomStream
+
+DEFAULT_PARAMETERS = ('max_hp', 'physical_attack', 'physical_defense', 'speed', 'scout_rate')
+SOLVER_CACHE_SIZE = 1 << 16 # ワーカーごとに保持する MarkovSolver の結果の数
+MONSTER_CACHE_SIZE = 1 << 12 # ワーカーごとに保持するレベルアップ済みのモンスターの数
+
+# ==================================
+# 1. 目標の指標
+# ==================================
+# 目標は、方針 (MarkovSolver の policy) ・組み合わせの列挙・指標の計算方法・許容範囲を持つ
+# 指標は value(solve, a, b) で計算する。solve(味方の種族, 敵の種族) は MatchupResult を返す
+# 損失は、全ての組み合わせについて許容範囲からのはみ出し (scale で正規化) の二乗の和に weight を掛けたもの
+
+class WinRateTarget:
+    policy = 'attack'
+
+    def __init__(self, low=0.45, high=0.55, level=1, weight=1.0):
+        """
+        同じレベルの2種族が「こうげき」だけで戦ったときの勝率の目標
+        バトルでは味方が先に行動するため、先攻・後攻を入れ替えた2通りの勝率の平均を指標にする
+        :param low: 勝率の下限
+        :param high: 勝率の上限
+        :param level: 両者のレベル
+        :param weight: 損失の重み
+        """
+        self.low = low
+        self.high = high
+        self.level = level
+        self.weight = weight
+        self.scale = 1.0
+
+    def __repr__(self):
+        return f"WinRateTarget({self.low}-{self.high}, level={self.level})"
+
+    def pairs(self, species):
+        return list(combinations(species, 2))
+
+    def value(self, solve, a, b):
+        # b が味方側のときの a の勝率は、b の敗北率
+        return (solve(a, b).win + solve(b, a).lose) / 2
+
+class ScoutTurnsTarget:
+    policy = 'scout'
+
+    def __init__(self, turns=4.0, tolerance=0.5, level=1, weight=1.0):
+        """
+        同じ種族・同じレベルの相手にスカウトし続けたときの、決着までの期待ターン数の目標
+        :param turns: 目標のターン数
+        :param tolerance: 許容する差
+        :param level: 両者のレベル
+        :param weight: 損失の重み
+        """
+        self.low = turns - tolerance
+        self.high = turns + tolerance
+        self.level = level
+        self.weight = weight
+        self.scale = turns
+
+    def __repr__(self):
+        return f"ScoutTurnsTarget({self.low}-{self.high}, level={self.level})"
+
+    def pairs(self, species):
+        return [(name, name) for name in species]
+
+    def value(self, solve, a, b):
+        return solve(a, b).expected_turns
+
+def _excess(target, value):
+    if value < target.low:
+        return (target.low - value) / target.scale
+    if value > target.high:
+        return (value - target.high) / target.scale
+    return 0.0
+
+# ==================================
+# 2. 候補の評価 (ワーカープロセス側)
+# ==================================
+
+class Evaluator:
+    def __init__(self, samples=1, seed=0):
+        """
+        種族データの候補を目標の指標で評価するクラス
+        MarkovSolver とレベルアップ済みのモンスターは、同じ種族データ (MonsterTemplate) に対して使い回す
+        :param samples: レベル2以上で平均を取る、レベルアップの乱数の組の数
+        :param seed: レベルアップに使う乱数のシード (全候補で共通にして、候補間の差だけを比べる)
+        """
+        self.samples = samples
+        self.seed = seed
+        self._solvers = {} # policy -> MarkovSolver
+        self._monsters = {} # (MonsterTemplate, レベル, 組の番号) -> Monster
+
+    def monster(self, template, level, sample):
+        key = (template, level, sample)
+        monster = self._monsters.get(key)
+        if monster is None:
+            monster = template.build()
+            monster.rng = RandomStream(self.seed, (template.name, level, sample))
+            monster.level_up(level - 1)
+            # 候補ごとに新しい MonsterTemplate が増えるため、上限を超えたら古いものから捨てる
+            if len(self._monsters) >= MONSTER_CACHE_SIZE:
+                self._monsters.pop(next(iter(self._monsters)))
+            self._monsters[key] = monster
+        return monster
+
+    def solver(self, policy):
+        solver = self._solvers.get(policy)
+        if solver is None:
+            solver = self._solvers[policy] = MarkovSolver(policy, cache_size=SOLVER_CACHE_SIZE)
+        return solver
+
+    def evaluate(self, templates, targets):
+        """
+        :param templates: 種族名 -> MonsterTemplate
+        :return: (損失, [(目標, 種族a, 種族b, 指標の値), ...])
+        """
+        loss = 0.0
+        metrics = []
+        species = list(templates)
+        for target in targets:
+            solver = self.solver(target.policy)
+            samples = self.samples if target.level > 1 else 1
+            for a, b in target.pairs(species):
+                total = 0.0
+                for sample in range(samples):
+                    # 同じ種族どうしでも別個体として戦わせる
+                    def solve(player_name, enemy_name):
+                        player = self.monster(templates[player_name], target.level, (sample, 'player'))
+                        enemy = self.monster(templates[enemy_name], target.level, (sample, 'enemy'))
+                        return solver.solve(player, enemy)
+                    total += target.value(solve, a, b)
+                value = total / samples
+                metrics.append((target, a, b, value))
+                loss += target.weight * _excess(target, value) ** 2
+        return loss, metrics
+
+    def cache_info(self):
+        """
+        MarkovSolver のキャッシュのヒット数とミス数の合計
+        """
+        return (sum(solver.hits for solver in self._solvers.values()),
+                sum(solver.misses for solver in self._solvers.values()))
+
+_evaluator = None # ワーカープロセスごとの Evaluator (キャッシュを候補間・世代間で使い回す)
+
+def evaluate_candidate(data, targets, samples, seed):
+    """
+    種族データの候補1つを評価する (ワーカープロセスの処理単位)
+    :param data: 種族名 -> monster_stats.json と同じ形式の辞書
+    :return: (損失, 指標のリスト, この評価でのキャッシュのヒット数, ミス数)
+    """
+    global _evaluator
+    if _evaluator is None or (_evaluator.samples, _evaluator.seed) != (samples, seed):
+        _evaluator = Evaluator(samples, seed)
+    hits, misses = _evaluator.cache_info()
+    templates = {name: MonsterTemplate.from_dict(name, entry) for name, entry in data.items()}
+    loss, metrics = _evaluator.evaluate(templates, targets)
+    total_hits, total_misses = _evaluator.cache_info()
+    return loss, metrics, total_hits - hits, total_misses - misses
+
+# ==================================
+# 3. 探索
+# ==================================
+
+def _read(entry, key):
+    # 'growth_rate.HP' のようなキーは growth_rate の中を参照する
+    if '.' in key:
+        group, name = key.split('.', 1)
+        return entry[group][name]
+    return entry[key]
+
+def _write(entry, key, value):
+    if '.' in key:
+        group, name = key.split('.', 1)
+        entry[group] = dict(entry[group], **{name: value})
+    else:
+        entry[key] = value
+
+def _validate_parameter(key):
+    if key in STAT_KEYS or key in REWARD_KEYS or key == 'scout_rate':
+        return
+    if key.startswith('growth_rate.') and key.split('.', 1)[1] in GROWTH_KEYS:
+        return
+    raise ValueError(f"Error: 調整できないパラメータです。（{key}）")
+
+def _mutate(value, original, key, step, max_change):
+    # 元の値から ±max_change の割合の範囲で、step の割合だけ値を動かす
+    low = original * (1 - max_change)
+    high = original * (1 + max_change)
+    if key == 'scout_rate':
+        high = min(high, 1.0)
+    if isinstance(original, int):
+        new = min(high, max(low, value + step * max(abs(original), 1)))
+        rounded = int(round(new))
+        if rounded == value:
+            # 整数の値は最低でも1だけ動かす
+            rounded = value + (1 if step > 0 else -1)
+        low_int = max(1 if key == 'max_hp' else 0, math.ceil(low))
+        return min(int(high), max(low_int, rounded))
+    new = min(high, max(low, value + step * abs(original)))
+    if key.startswith('growth_rate.'):
+        return round(max(new, 0.01), 3)
+    return round(max(new, 0.0), 4)
+
+@dataclass
+class BalanceReport:
+    data: dict              # 探索後の種族データ (monster_stats.json と同じ形式)
+    loss: float
+    initial_loss: float
+    metrics: list           # [(目標, 種族a, 種族b, 指標の値), ...]
+    evaluations: int        # 評価した候補の数
+    cache_hits: int         # MarkovSolver のキャッシュのヒット数 (全ワーカーの合計)
+    cache_misses: int
+
+    def summary(self):
+        lines = [f"損失: {self.initial_loss:.6f} -> {self.loss:.6f} (候補 {self.evaluations} 件)"]
+        total = self.cache_hits + self.cache_misses
+        if total:
+            lines.append(f"ソルバーのキャッシュ: {self.cache_hits}/{total} ({self.cache_hits / total:.1%}) がヒット")
+        for target, a, b, value in self.metrics:
+            mark = '  ' if _excess(target, value) == 0 else '! '
+            lines.append(f"{mark}{target!r} {a} vs {b}: {value:.4f}")
+        return "\n".join(lines)
+
+def optimize(targets, parameters=DEFAULT_PARAMETERS, species=None, generations=200, population=16,
+             max_change=0.5, step=0.1, samples=1, seed=0, workers=None, catalog=None):
+    """
+    目標の指標に近づくように種族データを探索する ((1+λ)-進化戦略)
+    各世代で、最良案から 1〜2個の値を変えた候補を population 件作ってプロセスプールで並列に評価し、
+    損失が下がった候補があれば最良案を置き換える。変化量は成功率に応じて広げたり狭めたりする。
+    :param targets: 目標の指標 (WinRateTarget / ScoutTurnsTarget) のリスト
+    :param parameters: 調整するキー (例: 'physical_attack', 'growth_rate.HP', 'scout_rate')
+    :param species: 調整・評価する種族名 (省略時はカタログの全種族)
+    :param max_change: 元の値からの変化の上限 (割合)
+    :param step: 1回の変化量の初期値 (元の値に対する割合)
+    :param samples: レベル2以上の目標で平均を取るレベルアップの乱数の組の数
+    :param workers: ワーカープロセス数 (None で CPU 数、0 または 1 で現在のプロセスのみ)
+    :return: BalanceReport
+    """
+    for key in parameters:
+        _validate_parameter(key)
+    catalog = catalog if catalog is not None else MonsterCatalog.shared()
+    species = list(species) if species else catalog.names()
+    original = {name: catalog.get_template(name).to_dict() for name in species}
+    coordinates = [(name, key) for name in species for key in parameters]
+    rng = RandomStream(seed, 'balance')
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def evaluate_all(candidates):
+        args = ([targets] * len(candidates), [samples] * len(candidates), [seed] * len(candidates))
+        if executor is None:
+            return list(map(evaluate_candidate, candidates, *args))
+        return list(executor.map(evaluate_candidate, candidates, *args))
+
+    try:
+        best = original
+        best_loss, best_metrics, cache_hits, cache_misses = evaluate_all([best])[0]
+        initial_loss = best_loss
+        evaluations = 1
+        for _ in range(generations):
+            if best_loss == 0:
+                break
+            candidates = []
+            for _ in range(population):
+                candidate = {name: dict(entry) for name, entry in best.items()}
+                for _ in range(1 + (rng.random() < 0.5)):
+                    name, key = rng.choice(coordinates)
+                    delta = rng.uniform(-step, step)
+                    _write(candidate[name], key, _mutate(_read(candidate[name], key), _read(original[name], key),
+                                                          key, delta, max_change))
+                candidates.append(candidate)
+            results = evaluate_all(candidates)
+            evaluations += len(candidates)
+            improved = False
+            for candidate, (loss, metrics, hits, misses) in zip(candidates, results):
+                cache_hits += hits
+                cache_misses += misses
+                if loss < best_loss:
+                    best, best_loss, best_metrics = candidate, loss, metrics
+                    improved = True
+            # 1/5 成功則: 改善があれば変化量を広げ、なければ狭める
+            step = min(max_change, step * 1.5) if improved else max(0.01, step * 0.8)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # 調整しなかった種族も含めて、元のファイルの順序で出力する
+    data = {name: best.get(name, catalog.get_template(name).to_dict()) for name in catalog.names()}
+    return BalanceReport(data, best_loss, initial_loss, best_metrics, evaluations, cache_hits, cache_misses)
+
+def write_data(data, path):
+    """
+    探索結果を monster_stats.json と同じ形式で書き出す (書き出す前に MonsterTemplate で検証する)
+    """
+    for name, entry in data.items():
+        MonsterTemplate.from_dict(name, entry)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+        f.write('\n')
+
+def main():
+    parser = argparse.ArgumentParser(description="目標の指標に合わせて monster_stats.json の数値を探索する")
+    parser.add_argument('--win-rate', nargs=2, type=float, metavar=('LOW', 'HIGH'), default=[0.45, 0.55],
+                        help="同レベルの全ての組み合わせの勝率の目標範囲")
+    parser.add_argument('--scout-turns', type=float, default=None, help="スカウトにかかる期待ターン数の目標")
+    parser.add_argument('--scout-tolerance', type=float, default=0.5)
+    parser.add_argument('--level', type=int, default=1)
+    parser.add_argument('--params', nargs='+', default=list(DEFAULT_PARAMETERS))
+    parser.add_argument('--species', nargs='+', default=None)
+    parser.add_argument('--generations', type=int, default=200)
+    parser.add_argument('--population', type=int, default=16)
+    parser.add_argument('--max-change', type=float, default=0.5)
+    parser.add_argument('--samples', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('-o', '--output', default=None, help="出力先 (省略時は data/monster_stats.tuned.json)")
+    args = parser.parse_args()
+
+    targets = [WinRateTarget(args.win_rate[0], args.win_rate[1], args.level)]
+    if args.scout_turns is not None:
+        targets.append(ScoutTurnsTarget(args.scout_turns, args.scout_tolerance, args.level))
+    report = optimize(targets, args.params, args.species, args.generations, args.population,
+                      args.max_change, samples=args.samples, seed=args.seed, workers=args.workers)
+    print(report.summary())
+
+    output = args.output
+    if output is None:
+        output = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'monster_stats.tuned.json')
+    write_data(report.data, output)
+    print(f"出力: {output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,2 @@
+# bench
+# エンジンの主要な処理のベンチマーク (実行方法は bench/__main__.py を参照)
@@ -0,0 +1,50 @@
+# bench/__main__.py
+# ベンチマークの実行・基準値の保存・比較を行うコマンド (リポジトリのルートで実行する)
+#
+# 使い方:
+#   python -m bench                                   # 全て実行して結果を表示する
+#   python -m bench --save bench/baselines/baseline.json # 結果を基準値として保存する
+#   python -m bench --compare bench/baselines/baseline.json --threshold 0.1
+#   python -m bench -k battle --group micro           # 名前に battle を含むマイクロベンチマークだけ
+
+import argparse
+import sys
+
+import bench.micro  # noqa: F401 (ベンチマークの登録)
+import bench.scenarios  # noqa: F401
+from bench.harness import (
+    DEFAULT_MIN_TIME, DEFAULT_REPEAT, DEFAULT_THRESHOLD, compare, load, print_comparison, run_all, save, select,
+)
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m bench', description="エンジンのベンチマークを実行する")
+    parser.add_argument('-k', '--filter', nargs='+', default=None, help="名前にいずれかを含むベンチマークだけを実行する")
+    parser.add_argument('--group', choices=('micro', 'scenario'), default=None)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--min-time', type=float, default=DEFAULT_MIN_TIME, help="1回の計測の最低秒数 (マイクロベンチマーク)")
+    parser.add_argument('--save', metavar='PATH', default=None, help="結果を基準値の JSON として保存する")
+    parser.add_argument('--compare', metavar='PATH', default=None, help="基準値の JSON と比較する")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="リグレッションとみなす悪化の割合")
+    parser.add_argument('--list', action='store_true', help="ベンチマークの一覧を表示する")
+    args = parser.parse_args()
+
+    benchmarks = select(args.filter, args.group)
+    if args.list:
+        for item in benchmarks:
+            print(f"{item.group:<9} {item.name}")
+        return 0
+    if not benchmarks:
+        print("Error: 該当するベンチマークがありません。")
+        return 1
+
+    report = run_all(benchmarks, args.repeat, args.min_time)
+    if args.save:
+        save(report, args.save)
+        print(f"保存: {args.save}", file=sys.stderr)
+    if args.compare:
+        regressions = print_comparison(compare(load(args.compare), report), args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+# bench/harness.py
+# ベンチマークの登録・計測・JSON への保存・基準値との比較を行うモジュール
+#
+# ベンチマークは loops を受け取り、処理を loops 回実行した経過秒数を返す関数として書く。
+# 準備 (モンスターの生成など) は計測の開始前に済ませ、計測したい処理だけを time.perf_counter() で囲む。
+
+import json
+import platform
+import statistics
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+FORMAT_VERSION = 1
+DEFAULT_MIN_TIME = 0.1 # loops を決めるときの、1回の計測の最低秒数
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.10 # 基準値からの悪化をリグレッションとみなす割合
+
+@dataclass(frozen=True)
+class Benchmark:
+    name: str       # 'monster.from_json' のような ドット区切りの名前
+    group: str      # 'micro' または 'scenario'
+    func: object    # func(loops) -> 経過秒数
+    loops: int      # 1回の計測の実行回数 (0 なら min_time から自動で決める)
+    repeat: int     # 計測の回数 (0 なら実行時の指定に従う)
+
+BENCHMARKS = {} # 名前 -> Benchmark (登録順)
+
+def benchmark(name, group='micro', loops=0, repeat=0):
+    """
+    ベンチマーク関数を登録するデコレータ
+    :param loops: 1回の計測の実行回数 (シナリオのように1回が十分に長いものは 1 を指定する)
+    :param repeat: 計測の回数 (省略時は実行時の指定に従う)
+    """
+    def register(func):
+        if name in BENCHMARKS:
+            raise ValueError(f"Error: ベンチマーク {name} はすでに登録されています。")
+        BENCHMARKS[name] = Benchmark(name, group, func, loops, repeat)
+        return func
+    return register
+
+def _calibrate(bench, min_time):
+    # 1回の計測が min_time 以上になるまで loops を倍にしていく
+    loops = 1
+    while True:
+        if bench.func(loops) >= min_time or loops >= 1 << 20:
+            return loops
+        loops *= 2
+
+def run_benchmark(bench, repeat=DEFAULT_REPEAT, min_time=DEFAULT_MIN_TIME):
+    """
+    ベンチマークを1つ実行し、1回あたりの秒数の統計を辞書で返す
+    """
+    loops = bench.loops or _calibrate(bench, min_time)
+    repeat = bench.repeat or repeat
+    times = [bench.func(loops) / loops for _ in range(repeat)]
+    return {
+        'group': bench.group,
+        'loops': loops,
+        'times': times,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.fmean(times),
+        'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+def select(patterns=None, group=None):
+    """
+    名前に patterns のいずれかを含み、group に属するベンチマークを登録順に返す
+    """
+    return [bench for bench in BENCHMARKS.values()
+            if (group is None or bench.group == group)
+            and (not patterns or any(pattern in bench.name for pattern in patterns))]
+
+def run_all(benchmarks, repeat=DEFAULT_REPEAT, min_time=DEFAULT_MIN_TIME, file=None):
+    """
+    ベンチマークをまとめて実行し、結果を JSON に保存できる辞書で返す (進捗は file に出力する)
+    """
+    file = file or sys.stderr
+    results = {}
+    for bench in benchmarks:
+        result = results[bench.name] = run_benchmark(bench, repeat, min_time)
+        print(f"{bench.name:<36} {format_time(result['median']):>10}  (x{result['loops']}, ±{format_time(result['stdev'])})",
+              file=file)
+    return {
+        'version': FORMAT_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+
+def format_time(seconds):
+    for unit, scale in (('s', 1.0), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+# --- 保存と比較 ---
+def save(report, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+
+def load(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    except FileNotFoundError:
+        print(f"Error: 基準値のファイル {path} が見つかりません。")
+        sys.exit(1)
+    except json.JSONDecodeError:
+        print(f"Error: 基準値のファイル {path} のフォーマットが不正です。")
+        sys.exit(1)
+    if report.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Error: 基準値のファイル {path} の形式のバージョンが違います。（{report.get('version')!r}）")
+    return report
+
+@dataclass
+class Comparison:
+    name: str
+    baseline: float # 基準値の中央値 (秒)
+    current: float  # 今回の中央値 (秒)
+
+    @property
+    def ratio(self):
+        return self.current / self.baseline if self.baseline else float('inf')
+
+    def status(self, threshold):
+        if self.ratio > 1 + threshold:
+            return 'regression'
+        if self.ratio < 1 / (1 + threshold):
+            return 'improved'
+        return 'same'
+
+def compare(baseline, current):
+    """
+    両方に含まれるベンチマークの中央値を比較する
+    :return: Comparison のリスト (current の順)
+    """
+    base_results = baseline['results']
+    return [Comparison(name, base_results[name]['median'], result['median'])
+            for name, result in current['results'].items() if name in base_results]
+
+def print_comparison(comparisons, threshold=DEFAULT_THRESHOLD, file=None):
+    """
+    比較結果を表形式で出力し、リグレッションの数を返す
+    """
+    file = file or sys.stdout
+    marks = {'regression': '!! 悪化', 'improved': '   改善', 'same': ''}
+    regressions = 0
+    for item in comparisons:
+        status = item.status(threshold)
+        regressions += status == 'regression'
+        print(f"{item.name:<36} {format_time(item.baseline):>10} -> {format_time(item.current):>10}  "
+              f"x{item.ratio:5.2f} {marks[status]}", file=file)
+    print(f"リグレッション: {regressions} 件 (しきい値 {threshold:.0%})", file=file)
+    return regressions
@@ -0,0 +1,113 @@
+# bench/micro.py
+# エンジンの個々のメソッドのマイクロベンチマーク
+# 状態を変える処理 (経験値・スキル習得) は、計測の前に loops 体分の新しいモンスターを用意しておく
+
+import time
+
+from Battle import Battle
+from Monster import Monster
+from Player import Player
+from RandomStream import RandomStream
+from bench.harness import benchmark
+from simulate import build_monster
+
+SEED = 0
+ENDLESS = 10 ** 12 # 計測中に戦闘不能・効果切れにならないための大きな値
+
+def _party(species, level):
+    player = Player()
+    for slot, name in enumerate(species):
+        player.add_monster(build_monster(name, level, rng=RandomStream(SEED, ('party', slot))))
+    return player
+
+def _endless_battle(attacker='オオカミ', level=10):
+    # HP を大きくして、何回攻撃しても決着しないバトルを作る
+    player = _party((attacker,), level)
+    enemy = Monster.from_json('ゴブリン', RandomStream(SEED, 'enemy'))
+    enemy.current_hp = ENDLESS
+    player.monsters[0].current_hp = ENDLESS
+    return Battle(player, enemy, rng=RandomStream(SEED, 'battle'))
+
+def _skill(monster, name):
+    for state in monster.skill_trees:
+        if name in state.nodes:
+            return state.nodes[name].skill
+    raise ValueError(f"Error: {monster.name} のスキルツリーに {name} がありません。")
+
+@benchmark('monster.from_json')
+def from_json(loops):
+    rng = RandomStream(SEED, 'from_json')
+    Monster.from_json('スライム', rng) # カタログの読み込みは計測に含めない
+    start = time.perf_counter()
+    for _ in range(loops):
+        Monster.from_json('スライム', rng)
+    return time.perf_counter() - start
+
+@benchmark('battle.init')
+def battle_init(loops):
+    # リーダーシップ (バトル開始時のパッシブ) を持つゴブリンを含む6体のパーティ
+    player = _party(('ゴブリン', 'スライム', 'オオカミ', 'コウモリ', 'ゴブリン', 'オオカミ'), 10)
+    enemy = Monster.from_json('オオカミ', RandomStream(SEED, 'enemy'))
+    rng = RandomStream(SEED, 'battle')
+    start = time.perf_counter()
+    for _ in range(loops):
+        Battle(player, enemy, rng=rng)
+    return time.perf_counter() - start
+
+@benchmark('battle.apply_skill_effect.damage')
+def apply_damage_skill(loops):
+    battle = _endless_battle('オオカミ')
+    user = battle.current_monster
+    skill = _skill(user, '三連牙')
+    apply = battle.apply_skill_effect
+    start = time.perf_counter()
+    for _ in range(loops):
+        apply(user, skill)
+    return time.perf_counter() - start
+
+@benchmark('battle.apply_skill_effect.ailment')
+def apply_ailment_skill(loops):
+    battle = _endless_battle('ゴブリン')
+    user = battle.current_monster
+    skill = _skill(user, 'いたずら')
+    apply = battle.apply_skill_effect
+    start = time.perf_counter()
+    for _ in range(loops):
+        apply(user, skill)
+    return time.perf_counter() - start
+
+@benchmark('battle.process_turn_end_effects')
+def turn_end_effects(loops):
+    # 敵は毒と火傷、味方はバフ2つとデバフ1つ (いずれも計測中に切れない)
+    battle = _endless_battle('オオカミ')
+    rng = RandomStream(SEED, 'effects')
+    battle.enemy.apply_ailment('poison', 1.0, ENDLESS, {'damage_percent': 0.1}, rng)
+    battle.enemy.apply_ailment('burn', 1.0, ENDLESS, {'damage': 5}, rng)
+    battle.current_monster.apply_stat_effect('buff', [('physical_attack', 10), ('speed', 5)], ENDLESS)
+    battle.current_monster.apply_stat_effect('debuff', [('physical_defense', 3)], ENDLESS)
+    process = battle.process_turn_end_effects
+    start = time.perf_counter()
+    for _ in range(loops):
+        process()
+    return time.perf_counter() - start
+
+@benchmark('monster.gain_experience')
+def gain_experience(loops):
+    # 1回で数レベル上がる量の経験値
+    prototype = Monster.from_json('スライム', RandomStream(SEED, 'exp'))
+    monsters = [prototype.clone() for _ in range(loops)]
+    start = time.perf_counter()
+    for monster in monsters:
+        monster.gain_experience(500)
+    return time.perf_counter() - start
+
+@benchmark('skilltree.learn_skill')
+def learn_skill(loops):
+    tree = Monster.from_json('スライム').skill_trees[0].tree
+    states = [tree.new_state() for _ in range(loops)]
+    names = list(tree.nodes)[:3] # 前提スキルを順に満たす3つ
+    start = time.perf_counter()
+    for state in states:
+        for name in names:
+            tree.learn_skill(name, 999, state)
+    return time.perf_counter() - start
@@ -0,0 +1,67 @@
+# bench/scenarios.py
+# 実際の遊び方に近い、エンドツーエンドのシナリオのベンチマーク
+
+import time
+
+from Battle import Battle
+from EncounterGenerator import EncounterGenerator
+from Monster import Monster
+from Player import Player
+from RandomStream import RandomStream
+from bench.harness import benchmark
+from simulate import build_monster, greedy_skill, play_battle
+
+SEED = 0
+GRIND_PARTY = ('スライム', 'ゴブリン', 'オオカミ', 'コウモリ', 'スライム', 'オオカミ')
+GRIND_ENCOUNTERS = 30
+
+@benchmark('scenario.duel_1v1', group='scenario', loops=200)
+def duel_1v1(loops):
+    # スライム (Lv5・スキル習得済み) とゴブリンの1対1を決着まで (1回あたり1バトル)
+    battles = []
+    for index in range(loops):
+        stream = RandomStream(SEED, ('duel', index))
+        player = Player()
+        player.add_monster(build_monster('スライム', 5, rng=stream.substream('party')))
+        enemy = Monster.from_json('ゴブリン', stream.substream('enemy'))
+        battles.append(Battle(player, enemy, rng=stream.substream('battle')))
+    start = time.perf_counter()
+    for battle in battles:
+        play_battle(battle, greedy_skill)
+    return time.perf_counter() - start
+
+def _grind(player, enemies, stream):
+    # 出現した敵と順に戦い、勝てば報酬を分配し、バトルごとに全員を全回復させる
+    for index, enemy in enumerate(enemies):
+        battle = Battle(player, enemy, rng=stream.substream(('battle', index)))
+        if play_battle(battle, greedy_skill).result == 'win':
+            player.distribute_rewards(enemy.enemy_exp, enemy.enemy_gold)
+        for monster in player.monsters:
+            monster.current_hp = monster.max_hp
+            monster.current_mp = monster.max_mp
+            monster.is_alive = True
+
+@benchmark('scenario.party_grind', group='scenario', loops=10)
+def party_grind(loops):
+    # 6体のパーティでフィールドの敵と GRIND_ENCOUNTERS 回戦う (1回あたり1周)
+    generator = EncounterGenerator(pool_size=0, seed=SEED)
+    runs = []
+    for index in range(loops):
+        stream = RandomStream(SEED, ('grind', index))
+        player = Player()
+        for slot, species in enumerate(GRIND_PARTY):
+            player.add_monster(build_monster(species, 3, rng=stream.substream(('party', slot))))
+        runs.append((player, generator.generate(GRIND_ENCOUNTERS, stream.substream('encounters')), stream))
+    start = time.perf_counter()
+    for player, enemies, stream in runs:
+        _grind(player, enemies, stream)
+    return time.perf_counter() - start
+
+@benchmark('scenario.encounters_10k', group='scenario', loops=1)
+def encounters_10k(loops):
+    # 出現テーブルから敵を1万体生成する (1回あたり1万体)
+    generator = EncounterGenerator(pool_size=0, seed=SEED)
+    start = time.perf_counter()
+    for index in range(loops):
+        generator.generate(10_000, RandomStream(SEED, ('encounters', index)))
+    return time.perf_counter() - start
@@ -0,0 +1,209 @@
+# montecarlo.py
+# 「こうげき」と敵の通常攻撃の応酬 (Battle.process_attack / process_enemy_turn) を
+# NumPy で多数の組み合わせについて一括でモンテカルロ計算するモジュール
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from RuleSet import RuleSet
+
+DEFAULT_BLOCK_TURNS = 16 # 乱数をまとめて生成するターン数
+CHUNK_ELEMENTS = 1 << 22 # 一度に生成する乱数の数の上限 (約32MB)
+
+@dataclass
+class ExchangeResult:
+    """
+    組み合わせ (matchup) ごとの集計結果。配列の先頭の次元が組み合わせに対応する。
+    """
+    trials: int
+    wins: np.ndarray            # (M,) 勝利回数
+    losses: np.ndarray          # (M,) 敗北回数
+    timeouts: np.ndarray        # (M,) max_turns 以内に決着しなかった回数
+    turn_histogram: np.ndarray  # (M, max_turns + 1) 決着したターン数ごとの回数
+
+    @property
+    def win_probability(self):
+        return self.wins / self.trials
+
+    @property
+    def lose_probability(self):
+        return self.losses / self.trials
+
+    @property
+    def mean_turns(self):
+        """決着したバトルの平均ターン数 (決着が1回もない組み合わせは nan)"""
+        turns = np.arange(self.turn_histogram.shape[1])
+        finished = self.turn_histogram.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (self.turn_histogram * turns).sum(axis=1) / finished
+
+def matchup_arrays(pairs):
+    """
+    (プレイヤー側モンスター, 敵モンスター) のリストから resolve_exchanges 用の配列を作成する
+    """
+    columns = {
+        'player_attack': [], 'player_defense': [], 'player_hp': [], 'player_dodge': [], 'player_guarding': [],
+        'enemy_attack': [], 'enemy_defense': [], 'enemy_hp': [], 'enemy_dodge': [],
+    }
+    for player, enemy in pairs:
+        columns['player_attack'].append(player.physical_attack)
+        columns['player_defense'].append(player.physical_defense)
+        columns['player_hp'].append(player.current_hp)
+        columns['player_dodge'].append(player.dodge_rate)
+        columns['player_guarding'].append(player.is_guarding)
+        columns['enemy_attack'].append(enemy.physical_attack)
+        columns['enemy_defense'].append(enemy.physical_defense)
+        columns['enemy_hp'].append(enemy.current_hp)
+        columns['enemy_dodge'].append(enemy.dodge_rate)
+    return {key: np.asarray(values) for key, values in columns.items()}
+
+def _matchup_generators(seed, count):
+    # 組み合わせごとに独立した乱数列を割り当てる (同じ seed なら一括計算でも個別計算でも同じ列になる)
+    return [np.random.Generator(np.random.PCG64(child)) for child in np.random.SeedSequence(seed).spawn(count)]
+
+def _damage_arrays(attack, defense, rules):
+    # RuleSet.damage のベクトル版: max(1, attack - floor(defense * DAMAGE_REDUCTION_DEFENSE_RATE))
+    rate = rules.config["DAMAGE_REDUCTION_DEFENSE_RATE"]
+    return np.maximum(1, attack - np.floor(defense * rate)).astype(np.int64)
+
+def _guard_arrays(damage, rules):
+    multiplier = rules.config["DEFEND_DAMAGE_MULTIPLIER"]
+    return np.maximum(1, np.floor(damage * multiplier)).astype(np.int64)
+
+def resolve_exchanges(player_attack, player_defense, player_hp, player_dodge,
+                      enemy_attack, enemy_defense, enemy_hp, enemy_dodge,
+                      player_guarding=False, trials=1000, max_turns=100, seed=0,
+                      rules=None, block_turns=DEFAULT_BLOCK_TURNS, chunk_elements=CHUNK_ELEMENTS):
+    """
+    プレイヤーが毎ターン「こうげき」し、敵が通常攻撃を返す応酬を組み合わせごとに trials 回実行する。
+    各ターンはプレイヤーの攻撃 → (敵が生存していれば) 敵の攻撃の順で、回避判定とぼうぎょ中の軽減は Battle と同じ。
+    乱数は組み合わせごとに (trials, block_turns, 2) の塊で生成し、[..., 0] をプレイヤー攻撃、[..., 1] を敵攻撃の回避判定に使う。
+    :param player_guarding: True の場合、最初の敵の攻撃がぼうぎょ中として軽減される
+    :param seed: 乱数シード (resolve_exchange_scalar と同じ値を使えば同じ結果になる)
+    :param rules: 使用するRuleSet (省略時は共有RuleSet)
+    :param chunk_elements: 一度に生成する乱数の上限 (メモリ使用量の目安、組み合わせ単位で分割する)
+    :return: ExchangeResult
+    """
+    rules = rules if rules is not None else RuleSet.shared()
+    arrays = np.broadcast_arrays(*(np.atleast_1d(np.asarray(a)) for a in (
+        player_attack, player_defense, player_hp, player_dodge,
+        enemy_attack, enemy_defense, enemy_hp, enemy_dodge, player_guarding)))
+    count = arrays[0].shape[0]
+
+    result = ExchangeResult(
+        trials,
+        np.zeros(count, dtype=np.int64),
+        np.zeros(count, dtype=np.int64),
+        np.zeros(count, dtype=np.int64),
+        np.zeros((count, max_turns + 1), dtype=np.int64),
+    )
+    generators = _matchup_generators(seed, count)
+    step = max(1, chunk_elements // (trials * block_turns * 2))
+    for start in range(0, count, step):
+        chunk = slice(start, min(count, start + step))
+        _resolve_chunk([a[chunk] for a in arrays], generators[chunk], result, chunk,
+                       trials, max_turns, rules, block_turns)
+    return result
+
+def _resolve_chunk(arrays, generators, result, chunk, trials, max_turns, rules, block_turns):
+    (p_atk, p_def, p_hp, p_dodge, e_atk, e_def, e_hp, e_dodge, guarding) = arrays
+    count = p_atk.shape[0]
+
+    player_damage = _damage_arrays(p_atk, e_def, rules)[:, None, None].astype(np.int32)
+    enemy_damage = _damage_arrays(e_atk, p_def, rules)[:, None, None].astype(np.int32)
+    guard_damage = _guard_arrays(enemy_damage, rules)[:, :, 0].astype(np.int32)
+    e_dodge = e_dodge.astype(np.float64)[:, None, None]
+    p_dodge = p_dodge.astype(np.float64)[:, None, None]
+
+    # 試行ごとの状態
+    player_left = np.repeat(p_hp.astype(np.int64)[:, None], trials, axis=1)
+    enemy_left = np.repeat(e_hp.astype(np.int64)[:, None], trials, axis=1)
+    guard_pending = np.repeat(guarding.astype(bool)[:, None], trials, axis=1)
+    active = np.ones((count, trials), dtype=bool)
+
+    wins = result.wins[chunk]
+    losses = result.losses[chunk]
+    histogram = result.turn_histogram[chunk]
+    rows = np.arange(count)[:, None]
+    turn = 0
+    while turn < max_turns and active.any():
+        block = min(block_turns, max_turns - turn)
+        rolls = np.stack([g.random((trials, block, 2)) for g in generators])
+
+        # プレイヤーの攻撃: 敵の回避率以上の乱数で命中
+        dealt = (rolls[..., 0] >= e_dodge) * player_damage
+        # 敵の攻撃: 最初の攻撃のみ、ぼうぎょ中なら軽減 (命中・回避に関わらずフラグは消費される)
+        taken = (rolls[..., 1] >= p_dodge) * enemy_damage
+        taken[:, :, 0] = np.where(guard_pending, np.minimum(taken[:, :, 0], guard_damage), taken[:, :, 0])
+        guard_pending[:] = False
+
+        dealt_total = np.cumsum(dealt, axis=2, dtype=np.int32)
+        taken_total = np.cumsum(taken, axis=2, dtype=np.int32)
+        enemy_dead = dealt_total >= enemy_left[..., None]
+        player_dead = taken_total >= player_left[..., None]
+        win_turn = np.where(enemy_dead.any(axis=2), enemy_dead.argmax(axis=2), block)
+        lose_turn = np.where(player_dead.any(axis=2), player_dead.argmax(axis=2), block)
+
+        # 同じターンに両方が倒れる場合は、先に行動するプレイヤーの勝ち
+        won = active & (win_turn < block) & (win_turn <= lose_turn)
+        lost = active & (lose_turn < block) & (lose_turn < win_turn)
+        wins += won.sum(axis=1)
+        losses += lost.sum(axis=1)
+        finished = won | lost
+        finish_turn = turn + 1 + np.where(won, win_turn, lose_turn)
+        np.add.at(histogram, (np.broadcast_to(rows, finished.shape)[finished], finish_turn[finished]), 1)
+
+        active &= ~finished
+        enemy_left -= dealt_total[:, :, -1]
+        player_left -= taken_total[:, :, -1]
+        turn += block
+
+    result.timeouts[chunk] = active.sum(axis=1)
+
+def resolve_exchange_scalar(player_attack, player_defense, player_hp, player_dodge,
+                            enemy_attack, enemy_defense, enemy_hp, enemy_dodge,
+                            player_guarding=False, trials=1000, max_turns=100, seed=0,
+                            rules=None, block_turns=DEFAULT_BLOCK_TURNS, matchup_index=0, matchup_count=1):
+    """
+    resolve_exchanges の1組み合わせ分を Python のループで計算する参照実装。
+    ダメージは RuleSet の計算式を直接使い、同じ seed・組み合わせ番号なら resolve_exchanges と同じ結果になる。
+    :return: (勝利回数, 敗北回数, タイムアウト回数, {ターン数: 回数})
+    """
+    rules = rules if rules is not None else RuleSet.shared()
+    generator = _matchup_generators(seed, matchup_count)[matchup_index]
+    player_damage = rules.damage(player_attack, enemy_defense)
+    enemy_damage = rules.damage(enemy_attack, player_defense)
+
+    blocks = []
+    turn = 0
+    while turn < max_turns:
+        block = min(block_turns, max_turns - turn)
+        blocks.append(generator.random((trials, block, 2)))
+        turn += block
+    rolls = np.concatenate(blocks, axis=1).tolist()
+
+    wins = losses = timeouts = 0
+    histogram = {}
+    for trial in range(trials):
+        player_left, enemy_left, guarding = player_hp, enemy_hp, player_guarding
+        for turn, (player_roll, enemy_roll) in enumerate(rolls[trial], start=1):
+            if player_roll >= enemy_dodge:
+                enemy_left -= player_damage
+                if enemy_left <= 0:
+                    wins += 1
+                    histogram[turn] = histogram.get(turn, 0) + 1
+                    break
+            damage = enemy_damage
+            if guarding:
+                damage = rules.guard_damage(damage)
+                guarding = False
+            if enemy_roll >= player_dodge:
+                player_left -= damage
+                if player_left <= 0:
+                    losses += 1
+                    histogram[turn] = histogram.get(turn, 0) + 1
+                    break
+        else:
+            timeouts += 1
+    return wins, losses, timeouts, histogram
@@ -0,0 +1,320 @@
+# simulate.py
+# UIを使わずに Battle を直接進行させ、大量のバトルを並列に実行するためのモジュール
+#
+# 使い方: python simulate.py -n 100000 --policy greedy_skill --workers 8
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from Battle import Battle
+from Monster import Monster
+from Player import Player
+from RandomStream import RandomStream
+
+RESULTS = ('win', 'lose', 'escape', 'scout_success', 'timeout')
+
+# ==================================
+# 1. プレイヤーの行動方針 (ポリシー)
+# ==================================
+# ポリシーは battle を受け取り、行動のタプルを返す呼び出し可能オブジェクト
+# ('attack',) / ('skill', skill) / ('guard',) / ('scout',) / ('escape',)
+# プロセスプールへ渡せるように、モジュールレベルの関数か pickle 可能なオブジェクトで定義する
+
+def always_attack(battle):
+    """常に「こうげき」を選ぶ"""
+    return ('attack',)
+
+def _estimated_skill_damage(monster, skill):
+    effect = skill.effect
+    if 'damage_multiplier' not in effect:
+        return 0
+    if effect.get('damage_type') == 'magic':
+        attack = monster.magic_attack
+    else:
+        attack = monster.physical_attack
+    return int(attack * effect['damage_multiplier']) * effect.get('hits', 1)
+
+def greedy_skill(battle):
+    """使えるスキルの中で最も期待ダメージの高いものを選び、HPが減っていれば回復を優先する"""
+    monster = battle.current_monster
+    skills = battle.get_available_active_skills()
+    if not skills:
+        return ('attack',)
+
+    if monster.current_hp < monster.max_hp * 0.5:
+        heals = [skill for skill in skills if 'heal' in skill.effect]
+        if heals:
+            return ('skill', max(heals, key=lambda skill: skill.effect['heal']))
+
+    best = max(skills, key=lambda skill: _estimated_skill_damage(monster, skill))
+    if _estimated_skill_damage(monster, best) > monster.physical_attack:
+        return ('skill', best)
+    return ('attack',)
+
+class ScoutAtLowHp:
+    def __init__(self, threshold=0.3, fallback=always_attack):
+        """
+        敵のHP割合が threshold 以下になったらスカウトし、それまでは fallback の行動を取る
+        :param threshold: スカウトを始める敵HPの割合
+        :param fallback: スカウトしない間に使うポリシー
+        """
+        self.threshold = threshold
+        self.fallback = fallback
+
+    def __call__(self, battle):
+        enemy = battle.enemy
+        if enemy.current_hp <= enemy.max_hp * self.threshold:
+            return ('scout',)
+        return self.fallback(battle)
+
+scout_at_low_hp = ScoutAtLowHp()
+
+POLICIES = {
+    'always_attack': always_attack,
+    'greedy_skill': greedy_skill,
+    'scout_at_low_hp': scout_at_low_hp,
+}
+
+def choose_switch_target(battle):
+    """交代先として、生存している控えのうち残りHPが最も多いモンスターを選ぶ"""
+    candidates = [m for m in battle.player.monsters if m.is_alive and m is not battle.current_monster]
+    return max(candidates, key=lambda m: m.current_hp) if candidates else None
+
+# ==================================
+# 2. 1バトル分の進行
+# ==================================
+
+@dataclass
+class BattleOutcome:
+    result: str
+    turns: int
+    damage_dealt: int
+    damage_taken: int
+
+def _party_hp(player):
+    return sum(m.current_hp for m in player.monsters)
+
+def execute_action(battle, action):
+    """
+    プレイヤーの行動を1つ実行し、バトル結果 (None ならバトル継続) を返す
+    app.py の player_turn_gui と同じ Battle のメソッドを呼び出す
+    """
+    kind = action[0]
+    if kind == 'attack':
+        _, result = battle.process_attack()
+    elif kind == 'skill':
+        _, result = battle.process_skill_use(action[1])
+    elif kind == 'guard':
+        battle.process_guard()
+        result = None
+    elif kind == 'scout':
+        _, result = battle.process_scout()
+    elif kind == 'escape':
+        _, result = battle.process_escape()
+    elif kind == 'switch':
+        battle.process_switch(action[1])
+        result = None
+    else:
+        raise ValueError(f"Error: 不明な行動です。（{action!r}）")
+    return result
+
+def play_battle(battle, policy, max_turns=200):
+    """
+    バトルを決着まで進め、BattleOutcome を返す。
+    ターンの流れは app.py の状態遷移と同じ (プレイヤー → 敵 → ターン終了効果)。
+    強制交代は交代先を自動で選び、app.py と同様に交代後は敵のターンになる。
+    """
+    player = battle.player
+    enemy_start_hp = battle.enemy.current_hp
+    damage_taken = 0
+
+    result = None
+    turns = 0
+    enemy_turn = False
+    while turns < max_turns:
+        party_hp = _party_hp(player)
+        if not enemy_turn:
+            turns += 1
+            result = execute_action(battle, policy(battle))
+            if result not in (None, 'switch_needed'):
+                break
+        enemy_turn = False
+
+        if result is None:
+            _, result = battle.process_enemy_turn()
+            if result is None:
+                _, result = battle.process_turn_end_effects()
+        damage_taken += max(0, party_hp - _party_hp(player))
+
+        if result == 'switch_needed':
+            new_monster = choose_switch_target(battle)
+            if new_monster is None:
+                result = 'lose'
+                break
+            battle.process_switch(new_monster)
+            result = None
+            enemy_turn = True # 交代はターンを消費し、敵が行動する
+        elif result is not None:
+            break
+    else:
+        result = 'timeout'
+
+    damage_dealt = enemy_start_hp - battle.enemy.current_hp
+    return BattleOutcome(result, turns, damage_dealt, damage_taken)
+
+# ==================================
+# 3. 集計と並列実行
+# ==================================
+
+@dataclass
+class SimulationReport:
+    battles: int = 0
+    counts: dict = field(default_factory=lambda: dict.fromkeys(RESULTS, 0))
+    total_turns: int = 0
+    damage_dealt: int = 0
+    damage_taken: int = 0
+
+    def add(self, outcome):
+        self.battles += 1
+        self.counts[outcome.result] += 1
+        self.total_turns += outcome.turns
+        self.damage_dealt += outcome.damage_dealt
+        self.damage_taken += outcome.damage_taken
+
+    def merge(self, other):
+        self.battles += other.battles
+        for key, value in other.counts.items():
+            self.counts[key] += value
+        self.total_turns += other.total_turns
+        self.damage_dealt += other.damage_dealt
+        self.damage_taken += other.damage_taken
+        return self
+
+    @property
+    def rates(self):
+        """結果ごとの割合 (win/lose/escape/scout_success/timeout)"""
+        if not self.battles:
+            return dict.fromkeys(self.counts, 0.0)
+        return {key: value / self.battles for key, value in self.counts.items()}
+
+    @property
+    def mean_turns(self):
+        return self.total_turns / self.battles if self.battles else 0.0
+
+    def summary(self):
+        lines = [f"バトル数: {self.battles}"]
+        for key, rate in self.rates.items():
+            lines.append(f"  {key:<14} {rate:7.2%} ({self.counts[key]})")
+        lines.append(f"平均ターン数: {self.mean_turns:.2f}")
+        lines.append(f"与ダメージ合計: {self.damage_dealt} / 被ダメージ合計: {self.damage_taken}")
+        return "\n".join(lines)
+
+@dataclass(frozen=True)
+class SimulationSpec:
+    """ワーカープロセスへ渡すバトル条件 (pickle 可能な値のみを持つ)"""
+    party: tuple = ('スライム', 'オオカミ')
+    enemies: tuple = ('ゴブリン', 'コウモリ', 'オオカミ')
+    policy: object = always_attack
+    level: int = 1
+    learn_skills: bool = True
+    max_turns: int = 200
+    seed: int = 0
+
+def build_monster(species, level=1, learn_skills=True, rng=None):
+    """
+    指定レベルまで育成したモンスターを作成する
+    :param learn_skills: True の場合、獲得したスキルポイントでツリー順に習得できるスキルを全て習得する
+    :param rng: モンスターに持たせる乱数列 (レベルアップの成長量に使われる)
+    """
+    monster = Monster.from_json(species, rng)
+    monster.level_up(level - 1)
+    if learn_skills:
+        learned = True
+        while learned:
+            learned = False
+            for state in monster.skill_trees:
+                for skill in state.learnable_skills():
+                    if skill.sp_cost <= monster.skill_points and monster.learn_skill(skill.name) is not None:
+                        learned = True
+    return monster
+
+def build_battle(spec, index):
+    """
+    spec と通し番号からバトルを作成する。
+    全ての乱数は RandomStream(seed, index) から派生するため、どのワーカーでも同じ番号は同じバトルになる。
+    """
+    stream = RandomStream(spec.seed, index)
+    player = Player()
+    for slot, species in enumerate(spec.party):
+        player.add_monster(build_monster(species, spec.level, spec.learn_skills, stream.substream(('party', slot))))
+    enemy = Monster.from_json(stream.choice(spec.enemies), stream.substream('enemy'))
+    return Battle(player, enemy, rng=stream.substream('battle'))
+
+def run_range(spec, start, stop):
+    """
+    通し番号 start〜stop-1 のバトルを実行し、SimulationReport を返す (ワーカープロセスの処理単位)
+    """
+    policy = POLICIES.get(spec.policy, spec.policy) if isinstance(spec.policy, str) else spec.policy
+    report = SimulationReport()
+    # エンジンの通知 (EventBus) は購読者がいなければ発行されないため、出力を捨てる必要はない
+    for index in range(start, stop):
+        battle = build_battle(spec, index)
+        report.add(play_battle(battle, policy, spec.max_turns))
+    return report
+
+def simulate(n, party=('スライム', 'オオカミ'), enemies=('ゴブリン', 'コウモリ', 'オオカミ'),
+             policy='always_attack', level=1, learn_skills=True, max_turns=200, seed=0,
+             workers=None, chunk_size=None):
+    """
+    N回のバトルをプロセスプールで並列に実行し、集計結果を返す
+    :param n: バトル数
+    :param party: プレイヤー側モンスターの種族名
+    :param enemies: 敵の種族名の候補 (一様に選ばれる)
+    :param policy: ポリシー名 (POLICIES のキー) またはポリシーオブジェクト
+    :param level: プレイヤー側モンスターのレベル
+    :param workers: ワーカープロセス数 (None で CPU 数、0 または 1 で現在のプロセスのみ)
+    :param chunk_size: 1タスクあたりのバトル数 (None でワーカー数から自動決定)
+    :return: SimulationReport
+    """
+    if isinstance(policy, str) and policy not in POLICIES:
+        raise ValueError(f"Error: 不明なポリシーです。（{policy}） 候補: {', '.join(POLICIES)}")
+    spec = SimulationSpec(tuple(party), tuple(enemies), policy, level, learn_skills, max_turns, seed)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or n <= 1:
+        return run_range(spec, 0, n)
+
+    if chunk_size is None:
+        # ワーカー間の負荷の偏りを抑えるため、ワーカー数の数倍のタスクに分割する
+        chunk_size = max(1, -(-n // (workers * 8)))
+    starts = range(0, n, chunk_size)
+    stops = [min(n, start + chunk_size) for start in starts]
+
+    report = SimulationReport()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for partial in executor.map(run_range, [spec] * len(starts), starts, stops):
+            report.merge(partial)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="UIなしでバトルを大量に実行して結果を集計する")
+    parser.add_argument('-n', '--battles', type=int, default=1000)
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='always_attack')
+    parser.add_argument('--party', nargs='+', default=['スライム', 'オオカミ'])
+    parser.add_argument('--enemies', nargs='+', default=['ゴブリン', 'コウモリ', 'オオカミ'])
+    parser.add_argument('--level', type=int, default=1)
+    parser.add_argument('--no-skills', action='store_true', help="スキルを習得させない")
+    parser.add_argument('--max-turns', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    report = simulate(args.battles, args.party, args.enemies, args.policy, args.level,
+                      not args.no_skills, args.max_turns, args.seed, args.workers)
+    print(report.summary())
+
+if __name__ == '__main__':
+    main()